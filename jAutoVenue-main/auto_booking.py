@@ -1,11 +1,26 @@
-import schedule
-import time
 from datetime import datetime, timedelta
+import sys
+import time
 import logging
-from sport import SJTUSport
-import os
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+import threading
 from config import account
+from release_clock import wait_until, ReleaseScheduler
+from retry import RetryController, LoginFailed, classify, backoff, CHART, LOGIN, RESTART, BAD_CREDENTIALS, BROWSER_DEAD, SESSION_EXPIRED
+from jobs import JobFile, JobConfigError, load_jobs, jobsPath
+from preferences import describe
+# 浏览器 (sport)、OCR (captcha) 与 HTTP (orchestrator, notify) 相关模块在首次预约时才导入，
+# 查看场馆、校验任务文件等命令不加载它们
+
+USAGE = """auto_booking.py [命令]
+  run (默认)            启动定时预约服务
+  venues                列出场馆索引中的场馆与项目
+  validate [任务文件]   校验任务文件并列出各任务
+  next [任务文件]       显示各任务下一次开放与预热开始时刻"""
+WEEKDAY_NAMES = '一二三四五六日'
+
+RELOAD_INTERVAL = 10  # 等待期间每隔多少秒检查一次任务文件是否修改
+CATCH_UP_MINUTES = 5  # 启动时若开放时刻刚过去不超过这么多分钟，立即补做预约
+SYNC_LEAD_SECONDS = 15  # 在预热开始前预留给服务器时钟同步与 http 任务登录的时间
 
 # 设置日志
 logging.basicConfig(
@@ -15,200 +30,310 @@ logging.basicConfig(
     datefmt='%Y-%m-%d %A %H:%M:%S',
 )
 
-def book_venue(max_retries=3, retry_interval=50):  # 最多重试3次，每次间隔300秒（5分钟）
-    """预约下周场地"""
-    print("=== 开始预约流程 ===")
-    
-    # 获取当前日期
-    current_day = datetime.now().weekday()
-    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"当前时间: {current_time}")
+def target_date(job, release):
+    """release 这一开放时刻放出的日期；预热可能跨过零点，不能按创建会话时的当前日期计算"""
+    return release + timedelta(days=job.leadDays)
+
+def new_sport(job, release):
+    """按任务创建新的浏览器会话，启用浏览器池时借用池中已启动的浏览器"""
+    from sport import SJTUSport
+    from browser import get_browser_pool
+    pool = get_browser_pool()
+    first = job.preferences[0]
+    sport = SJTUSport(
+        deltaDays=job.leadDays,
+        venue=first.venue,
+        venueItem=first.venueItem,
+        startTime=first.startTime,
+        sckey=account['sckey'],
+        preferences=job.preferences,
+        browser=pool.lease() if pool else None
+    )
+    sport.targetDate = target_date(job, release)
+    return sport
+
+def book_venue(job, release, sport=None, level=RESTART):
+    """执行一个预约任务；传入已登录的 sport 时从 level 层级开始复用，不重启浏览器"""
+    print(f"=== 开始预约流程: {job.name} ===")
+    print(f"当前时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    date = target_date(job, release).strftime("%Y-%m-%d")
+    print(f"准备预约日期: {date}")
     
-    # 计算距离下周相应日期的天数
-    booking_days = {
-        0: 7,  # 周一预约下周一
-        1: 7,  # 周二预约下周二
-        2: 7,  # 周三预约下周三
-        4: 7,  # 周五预约下周五
-    }
+    # 失败时按类型在最低代价的层级恢复，退避时间在 1 秒以内
+    controller = RetryController(lambda: new_sport(job, release), sport=sport, level=level, **job.retry)
+    try:
+        if controller.run() == 1:
+            booked = controller.sport
+            msg = f"预约成功! 场地: {booked.venue}{booked.venueItem}, 日期: {date}, 时间: {booked.startTime}:00"
+            logging.info(msg)
+            print(msg)
+        else:
+            msg = f"{job.name} 预约失败，请检查日志获取详细信息"
+            logging.error(msg)
+            print(msg)
+            from notify import notify
+            failures = '\n'.join(f"- 第 {n} 次：{kind}" for n, level, kind in controller.history)
+            notify(account['sckey'], f"{job.name} 预约失败", f"- 日期：{date}\n{failures}", msg)
+    finally:
+        if controller.sport:
+            controller.sport.waiter.report()
+        controller.shutDown()
     
-    if current_day not in booking_days:
-        msg = f"今天不是预约日 (当前是周{current_day + 1})"
-        logging.info(msg)
-        print(msg)
-        return
+    print("=== 预约流程结束 ===\n")
 
-    for attempt in range(max_retries):
-        print(f"\n=== 第 {attempt + 1} 次尝试预约 ===")
-        sport = None
+def prestage(job, release, clock):
+    """
+    开放前登录并进入场馆页面，失败时退避后重试直到开放时刻；账号密码错误时不再重试。
+    返回 (sport, 是否预热完成)，sport 可能为 None（浏览器启动失败或已崩溃）
+    """
+    sport, failures, signedIn = None, 0, False
+    while clock.server_now() < release.timestamp():
         try:
-            delta_days = booking_days[current_day]
-            target_date = (datetime.now() + timedelta(days=delta_days)).strftime("%Y-%m-%d")
-            print(f"准备预约日期: {target_date}")
-            
-            sport = None
-            try:
-                print("正在初始化预约系统...")
-                # sport = SJTUSport(
-                #     deltaDays=delta_days,
-                #     venue='子衿街学生活动中心',
-                #     venueItem='桌游室',
-                #     startTime=19,
-                #     sckey=account['sckey']
-                # )
-                sport = SJTUSport(
-                    deltaDays=delta_days,
-                    venue='学生服务中心',
-                    venueItem='学生中心健身房',
-                    startTime=17,
-                    sckey=account['sckey']
-                )
-                
-                
-                print("正在登录...")
-                # 登录
-                if sport.login() == 1:
-                    logging.info("登录成功")
-                    print("登录成功!")
-                else:
-                    msg = "登录失败，请检查账号密码是否正确"
-                    logging.error(msg)
-                    print(msg)
-                    raise Exception(msg)
-                
-                print("正在搜索场馆...")
-                try:
-                    sport.searchAndEnterVenue()
-                    print("已找到学生活动中心")
-                except TimeoutException:
-                    msg = "搜索场馆超时，可能是网络问题"
-                    logging.error(msg)
-                    print(msg)
-                    raise Exception(msg)
-                except NoSuchElementException:
-                    msg = "未找到场馆，可能是页面结构已变更"
-                    logging.error(msg)
-                    print(msg)
-                    raise Exception(msg)
-                    
-                print("正在选择场地类型...")
-                try:
-                    sport.chooseVenueItemTab()
-                    print("已选择桌游室")
-                except Exception as e:
-                    msg = f"选择场地类型失败: {str(e)}"
-                    logging.error(msg)
-                    print(msg)
-                    raise Exception(msg)
-                    
-                print("正在选择日期...")
-                try:
-                    sport.chooseDateTab()
-                    print(f"已选择日期: {target_date}")
-                except Exception as e:
-                    msg = f"选择日期失败: {str(e)}"
-                    logging.error(msg)
-                    print(msg)
-                    raise Exception(msg)
-                    
-                print("正在选择时间段...")
-                try:
-                    sport.chooseStartTime()
-                    print("已选择17:00时间段")
-                except AssertionError:
-                    msg = "没有可用场地"
-                    logging.error(msg)
-                    print(msg)
-                    raise Exception(msg)
-                except Exception as e:
-                    msg = f"选择时间失败: {str(e)}"
-                    logging.error(msg)
-                    print(msg)
-                    raise Exception(msg)
-                    
-                print("正在提交预约...")
-                # 预约
-                if sport.order() == 1:
-                    msg = f"预约成功! 场地: 子衿街学生活动中心桌游室, 日期: {target_date}, 时间: 17:00"
-                    logging.info(msg)
-                    print(msg)
-                    return  # 预约成功，直接返回
-                else:
-                    msg = "预约失败，请检查日志获取详细信息"
-                    logging.error(msg)
-                    print(msg)
-                    raise Exception(msg)
-                    
-            except Exception as e:
-                raise e  # 向上传递异常，让外层处理重试逻辑
-                
+            if sport is None:
+                sport, signedIn = new_sport(job, release), False
+            if not signedIn:
+                if sport.login() != 1:
+                    raise LoginFailed(sport.loginFailure or 'other')
+                signedIn = True
+            sport.prestage()
+            return sport, True
         except Exception as e:
-            msg = f"第 {attempt + 1} 次预约尝试失败: {str(e)}"
+            failures += 1
+            kind = classify(e, sport)
+            msg = f"{job.name} 预热失败 [{kind}]: {str(e).strip()[:200]}"
             logging.error(msg)
             print(msg)
-            
-            if sport:
-                sport.shutDown()
-                
-            if attempt < max_retries - 1:  # 如果不是最后一次尝试
-                print(f"等待 {retry_interval} 秒后重试...")
-                time.sleep(retry_interval)
-            else:
-                print("已达到最大重试次数，预约失败")
-                
-        finally:
-            if sport:
-                sport.shutDown()
-    
-    print("=== 预约流程结束 ===\n")
+            if kind == BAD_CREDENTIALS:
+                break
+            if kind == BROWSER_DEAD and sport is not None:
+                sport.shutDown(discard=True)
+                sport = None
+            elif kind == SESSION_EXPIRED:
+                signedIn = False
+            left = release.timestamp() - clock.server_now()
+            time.sleep(max(0, min(backoff(failures, base=1.0, cap=10), left)))
+    return sport, False
 
-def should_run_today():
-    """检查今天是否需要运行预约程序"""
-    weekday = datetime.now().weekday()
-    return weekday in [0, 1, 2, 4]  # 周一、二、三、五
+def prestage_booking(job, release, clock):
+    """
+    提前登录并进入场馆页面，在开放时刻（以已同步的 clock 为准）只刷新座位表并下单
 
-def schedule_booking():
-    """定时任务调度函数"""
-    if should_run_today():
-        print("今天是预约日，开始执行预约...")
-        book_venue()
+    预热一直失败时也等到开放时刻才交给 book_venue，不让重试控制器的次数与期限耗在尚未开放的座位表上
+    """
+    print(f"=== 开始预热预约流程: {job.name} ===")
+    sport, ready = prestage(job, release, clock)
+    result = 0
+    if ready:
+        print(f"{job.name} 等待开放时间: {release.strftime('%H:%M:%S')}")
+        result = clock.fire(release.timestamp(), sport.strike, keepalive=sport.keepAlive)
+        if result == 1:
+            msg = f"预约成功! 场地: {sport.venue}{sport.venueItem}, 时间: {sport.startTime}:00"
+            logging.info(msg)
+            print(msg)
+            sport.waiter.report()
+            # 成功时在这里归还浏览器；失败时交给 book_venue，由它负责唯一一次 shutDown()
+            sport.shutDown()
+            return
+        msg = f"{job.name} 开放时刻下单失败，在当前会话中重试"
+        level = CHART
     else:
-        print("今天不是预约日，跳过执行")
+        clock.wait_until(release.timestamp())
+        msg = f"{job.name} 开放前未能完成预热，开始常规预约"
+        level = RESTART if sport is None else LOGIN
+    logging.error(msg)
+    print(msg)
+    book_venue(job, release, sport=sport, level=level)
+
+def timed_booking(job, release, clock):
+    """未配置预热时到点再启动浏览器预约"""
+    clock.wait_until(release.timestamp())
+    book_venue(job, release)
+
+def http_booking(jobs, release, clock, concurrency=None):
+    """同一开放时刻的 http 任务：提前登录，到点后并发下单；concurrency 为 None 时使用 config.http_engine"""
+    from orchestrator import Orchestrator, BookingJob, report
+    orchestrator = Orchestrator(
+        [BookingJob(job.name, job.leadDays, job.preferences) for job in jobs],
+        concurrency=concurrency,
+        max_attempts=max(job.retry['max_attempts'] for job in jobs),
+        deadline=max(job.retry['deadline'] for job in jobs),
+    )
+    if orchestrator.login() != 1:
+        print("登录失败，跳过本次 http 任务")
+        return
+    start = time.perf_counter()
+    results = clock.fire(release.timestamp(), orchestrator.run)
+    report(results, time.perf_counter() - start)
+
+def start_of(config, release):
+    """release 这一开放时刻的任务开始执行的时刻：预热时间之前再留出时钟同步的时间"""
+    return release - timedelta(minutes=config.prestageMinutes, seconds=SYNC_LEAD_SECONDS)
+
+def browser_jobs_at(plan, release):
+    return sum(1 for r, job in plan if r == release and job.engine == 'browser')
+
+def guarded(target, name, *args):
+    """线程入口：单个任务出错不影响同一时刻的其他任务"""
+    try:
+        target(*args)
+    except Exception as e:
+        msg = f"{name} 执行出错: {str(e)}"
+        logging.error(msg)
+        print(msg)
+
+def run_due(config, release, jobs):
+    """
+    执行在 release 这一开放时刻到期的任务
+
+    服务器时钟只同步一次并在开放前完成；http 任务组与每个浏览器任务各占一个线程，同时登录预热、
+    同时在开放时刻下单，不必等前一个任务结束。在预热时间内才启动（例如服务重启）时立即开始，
+    用剩下的时间预热；离开放不足 SYNC_LEAD_SECONDS 时不再同步时钟，以免同步本身错过开放时刻
+    """
+    clock = ReleaseScheduler()
+    if datetime.now() + timedelta(seconds=SYNC_LEAD_SECONDS) < release:
+        clock.sync()
+    workers = []
+    http_jobs = [job for job in jobs if job.engine == 'http']
+    if http_jobs:
+        workers.append(('http', http_booking, http_jobs, release, clock, config.maxConcurrency))
+    for job in jobs:
+        if job.engine != 'browser':
+            continue
+        if config.prestageMinutes > 0 and datetime.now() < release:
+            workers.append((job.name, prestage_booking, job, release, clock))
+        else:
+            workers.append((job.name, timed_booking, job, release, clock))
+    threads = [threading.Thread(target=guarded, args=(target, name) + tuple(args), name=name)
+               for name, target, *args in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if clock.metrics['jitter']:
+        logging.info(f"Clock offset {clock.metrics['offset'] * 1000:+.1f}ms, jitter "
+                     + ', '.join(f"{j * 1000:.3f}ms" for j in clock.metrics['jitter']))
+
+def catch_up(config):
+    """启动时补做开放时刻刚过去不久的任务"""
+    now = datetime.now()
+    release = datetime.combine(now.date(), config.releaseTime)
+    if release <= now <= release + timedelta(minutes=CATCH_UP_MINUTES):
+        due = [job for job in config.jobs if job.runs_on(now.date())]
+        if due:
+            print(f"当前时间接近{config.releaseTime.strftime('%H:%M')}，立即执行预约...")
+            run_due(config, release, due)
 
 def main():
     print("自动预约服务已启动")
-    print("将在每天12:00检查并执行预约")
-    
-    # 设置在每天12:00运行预约程序
-    schedule.every().day.at("12:00").do(schedule_booking)
-    
-    # 设置当前时间为 11:59 进行测试
-    current_time = datetime.now()
-    current_time = current_time.replace(hour=11, minute=59)  # 使用 replace 方法正确设置时间
-    print(f"当前时间设置为: {current_time.strftime('%H:%M')}")
+    jobFile = JobFile()
+    try:
+        config = jobFile.get()
+    except (OSError, JobConfigError) as e:
+        print(f"无法加载任务文件 {jobFile.path}: {str(e)}")
+        return
+    print(f"已加载 {len(config.jobs)} 个预约任务，开放时间 {config.releaseTime.strftime('%H:%M')}")
     
-    if (current_time.hour == 11 and current_time.minute >= 59) or \
-       (current_time.hour == 12 and current_time.minute <= 5):
-        if should_run_today():
-            print("当前时间接近12:00，立即执行预约...")
-            book_venue()
+    # 启动时预加载 OCR 模型，避免在开放时刻的关键路径上加载
+    import captcha
+    captcha.warmup()
+    # 启动通知线程，补发上次退出前未送达的通知
+    from notify import get_notifier
+    get_notifier()
+    # 在后台预先启动浏览器，开放时刻直接借用
+    from browser import get_browser_pool
+    pool = get_browser_pool()
+    if pool:
+        pool.fill_async()
+    catch_up(config)
     
     logging.info("Auto booking service started")
     print("\n定时服务已启动，等待下一次执行...")
-    print("预约时间：每周一、二、三、五 12:00")
     
     try:
+        plan, planned = None, None
         while True:
-            # 为了测试，这里也使用设置的时间
-            schedule.run_pending()
-            time.sleep(30)  # 每30秒检查一次是否需要执行任务
+            # 任务文件修改后自动重新加载，只在加载或执行之后重新计算各任务的下一次开放时刻
+            config = jobFile.get()
+            if pool:
+                pool.maintain()
+            if plan is None or config is not planned:
+                plan, planned = config.schedule(), config
+                for release, job in plan:
+                    print(f"{job.name}: 下一次开放 {release.strftime('%Y-%m-%d %H:%M')}")
+                # 同一开放时刻的浏览器任务同时预热，每个任务需要一个预先启动的浏览器
+                if pool and plan:
+                    pool.resize(max(pool.baseSize, browser_jobs_at(plan, plan[0][0])))
+            if not plan:
+                wait_until(time.time() + RELOAD_INTERVAL)
+                continue
+            
+            release = plan[0][0]
+            start = start_of(config, release)
+            if (start - datetime.now()).total_seconds() > RELOAD_INTERVAL:
+                wait_until(time.time() + RELOAD_INTERVAL)
+                continue
+            
+            # 精确等待到预热开始时刻
+            wait_until(start.timestamp())
+            run_due(config, release, [job for r, job in plan if r == release])
+            plan = None
     except KeyboardInterrupt:
         print("\n程序被用户中断")
     except Exception as e:
         print(f"\n程序发生错误: {str(e)}")
         logging.error(f"Program error: {str(e)}")
     finally:
+        if pool:
+            pool.close()
         print("程序结束")
 
+def list_venues():
+    from venue_index import main as show_index
+    show_index([])
+
+def validate_jobs(path=jobsPath):
+    """校验任务文件，有误时返回 False"""
+    try:
+        config = load_jobs(path)
+    except (OSError, JobConfigError) as e:
+        print(f"任务文件 {path} 有误: {str(e)}")
+        return False
+    print(f"{path}: {len(config.jobs)} 个任务，开放时间 {config.releaseTime.strftime('%H:%M')}，提前 {config.prestageMinutes} 分钟预热")
+    for job in config.jobs:
+        weekdays = '、'.join('周' + WEEKDAY_NAMES[w] for w in job.weekdays)
+        print(f"{job.name} [{job.engine}] 提前 {job.leadDays} 天，{weekdays}: {', '.join(describe(p) for p in job.preferences)}")
+    return True
+
+def show_next(path=jobsPath, now=None):
+    """与 main() 使用相同的调度计算，只打印不执行"""
+    try:
+        config = load_jobs(path)
+    except (OSError, JobConfigError) as e:
+        print(f"任务文件 {path} 有误: {str(e)}")
+        return False
+    now = now or datetime.now()
+    plan = config.schedule(now)
+    if not plan:
+        print("没有需要执行的任务")
+    for release, job in plan:
+        start = start_of(config, release)
+        print(f"{job.name}: 开放 {release.strftime('%Y-%m-%d %H:%M')}，{start.strftime('%H:%M:%S')} 开始执行，"
+              f"还有 {max(0, (start - now).total_seconds()) / 3600:.1f} 小时")
+    return True
+
+def cli(argv):
+    """除 run 外的命令只需要任务文件与场馆索引，不加载浏览器与 OCR"""
+    command, args = (argv[0], argv[1:]) if argv else ('run', [])
+    if command == 'run' and not args:
+        main()
+    elif command == 'venues' and not args:
+        list_venues()
+    elif command in ('validate', 'next') and len(args) <= 1:
+        ok = (validate_jobs if command == 'validate' else show_next)(*args)
+        sys.exit(0 if ok else 1)
+    else:
+        print(USAGE)
+        sys.exit(0 if command in ('-h', '--help') else 2)
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    cli(sys.argv[1:])
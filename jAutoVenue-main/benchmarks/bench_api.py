@@ -0,0 +1,44 @@
+"""
+在本地替身服务器上测量 HTTP 预约引擎的下单延迟
+
+python3 benchmarks/bench_api.py [下单次数] [每请求额外延迟毫秒]
+"""
+import os
+import sys
+import tempfile
+import statistics
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_platform import start_mock_platform, mock_cookies
+from sport_api import SJTUSportAPI
+from tracing import Tracer
+from venue_index import VenueIndex
+from bench_captcha import report
+
+
+def main(argv):
+    runs = int(argv[0]) if argv else 50
+    latency = float(argv[1]) / 1000 if len(argv) > 1 else 0.0
+    server, platform, base_url = start_mock_platform(courts=runs, taken_ratio=0.0, latency=latency)
+    traces = tempfile.mkdtemp()
+    # 替身站点的 venueId 不能写入真实的场馆索引
+    venueIndex = VenueIndex(os.path.join(traces, 'venue_index.json'))
+    samples = []
+    for i in range(runs):
+        api = SJTUSportAPI(venue='学生服务中心', venueItem='学生中心健身房', startTime=17,
+                           sessionStore=False, baseUrl=base_url, cookies=mock_cookies(),
+                           tracer=Tracer(directory=traces), venueIndex=venueIndex)
+        start = perf_counter()
+        ok = api.order()
+        samples.append(perf_counter() - start)
+        api.shutDown()
+        assert ok == 1, "替身服务器上下单失败"
+    report("order", samples)
+    print(f"成功订单: {len(platform.orders)}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,92 @@
+"""
+默认与精简浏览器配置的启动耗时、页面加载耗时与峰值内存对比（仅 Linux，内存读取 /proc），
+以及从浏览器池借用已启动浏览器与冷启动的耗时对比
+
+python3 benchmarks/bench_browser.py [运行次数] [URL]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+import statistics
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from selenium import webdriver
+from browser import build_options, tree_rss, BrowserPool
+
+
+class PeakRSS(threading.Thread):
+    def __init__(self, pid, interval=0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, tree_rss(self.pid))
+            time.sleep(self.interval)
+
+
+def measure(profile, url, profileDir=None):
+    options = build_options(profile, profileDir)
+    start = perf_counter()
+    driver = webdriver.Firefox(options=options)
+    started = perf_counter() - start
+    sampler = PeakRSS(driver.service.process.pid)
+    sampler.start()
+    try:
+        start = perf_counter()
+        driver.get(url)
+        loaded = perf_counter() - start
+    finally:
+        time.sleep(0.2)
+        sampler.running = False
+        sampler.join()
+        driver.quit()
+    return started, loaded, sampler.peak
+
+
+def main(argv):
+    runs = int(argv[0]) if argv else 3
+    url = argv[1] if len(argv) > 1 else 'https://sports.sjtu.edu.cn'
+    profileDir = tempfile.mkdtemp(prefix='lean-profile-')
+    for label, profile, directory in (('default', 'default', None),
+                                      ('lean', 'lean', None),
+                                      ('lean+profile', 'lean', profileDir)):
+        results = [measure(profile, url, directory) for _ in range(runs)]
+        starts, loads, peaks = zip(*results)
+        print(f"{label:<14} start p50={statistics.median(starts) * 1000:.0f}ms "
+              f"load p50={statistics.median(loads) * 1000:.0f}ms "
+              f"peak RSS={max(peaks) / 2 ** 20:.0f}MB")
+    pooled(runs, url)
+
+
+def pooled(runs, url):
+    """
+    池中已有空闲浏览器时，借用 + 打开页面 + 归还（含重置）的耗时
+    """
+    pool = BrowserPool(size=1, profile='lean')
+    pool.fill()
+    leases, resets = [], []
+    try:
+        for _ in range(runs):
+            start = perf_counter()
+            browser = pool.lease()
+            leases.append(perf_counter() - start)
+            browser.driver.get(url)
+            start = perf_counter()
+            browser.release()
+            resets.append(perf_counter() - start)
+    finally:
+        pool.close()
+    print(f"{'lean pooled':<14} lease p50={statistics.median(leases) * 1000:.0f}ms "
+          f"reset p50={statistics.median(resets) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,65 @@
+"""
+验证码识别冷/热启动延迟对比
+
+python3 benchmarks/bench_captcha.py <保存的验证码 PNG 目录>
+"""
+import os
+import sys
+import statistics
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ddddocr
+from captcha import CaptchaRecognizer
+from tracing import percentile
+
+
+def load_images(folder):
+    images = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith('.png'):
+            with open(os.path.join(folder, name), 'rb') as f:
+                images.append(f.read())
+    return images
+
+
+def report(label, samples):
+    print(f"{label}: n={len(samples)} mean={statistics.mean(samples) * 1000:.1f}ms "
+          f"p50={percentile(samples, 50) * 1000:.1f}ms p95={percentile(samples, 95) * 1000:.1f}ms")
+
+
+def main(argv):
+    if len(argv) != 1:
+        print(__doc__.strip())
+        sys.exit(1)
+    images = load_images(argv[0])
+    if not images:
+        print("目录中没有 PNG 图片")
+        sys.exit(1)
+
+    # 冷启动：与旧版 captcha_rec 相同，每次识别都重新加载模型
+    cold = []
+    for img in images:
+        start = perf_counter()
+        ddddocr.DdddOcr(show_ad=False).classification(img)
+        cold.append(perf_counter() - start)
+
+    # 热启动：共享识别器，预热后只做推理
+    recognizer = CaptchaRecognizer()
+    start = perf_counter()
+    recognizer.warmup()
+    warmup_time = perf_counter() - start
+    warm = []
+    for img in images:
+        start = perf_counter()
+        recognizer.classification(img)
+        warm.append(perf_counter() - start)
+
+    print(f"预热耗时: {warmup_time * 1000:.1f}ms")
+    report("cold", cold)
+    report("warm", warm)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
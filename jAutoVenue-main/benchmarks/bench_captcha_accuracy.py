@@ -0,0 +1,133 @@
+"""
+在标注好的验证码目录上网格搜索预处理参数，报告每组参数的准确率、平均尝试次数与识别延迟
+
+python3 benchmarks/bench_captcha_accuracy.py [-s] [-b 进程数] [标注目录，默认 captchaRecord/]
+
+文件名即答案：abcd.png 或 abcd_1700000000.png。
+-s 把准确率最高（相同时延迟最低）的参数写入 captcha_params.json，captcha_rec() 运行时自动加载。
+-b 另外评估以最佳参数为中心的多候选识别 (BatchRecognizer)：提交率、提交答案的正确率与延迟。
+"""
+import os
+import sys
+import getopt
+import itertools
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from captcha import CaptchaPreprocessor, BatchRecognizer, variants_of, get_recognizer, label_of, save_tuned_params, tunedParamsPath
+
+CONTRASTS = (None, 1.5, 2.0, 2.5, 3.0)
+THRESHOLDS = (None, 100, 120, 140, 160, 180)
+DENOISE = (0, 1, 2)
+
+
+def load_corpus(folder):
+    corpus = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith('.png') and len(label_of(name)) == 4:
+            with open(os.path.join(folder, name), 'rb') as f:
+                corpus.append((label_of(name), f.read()))
+    return corpus
+
+
+def grid():
+    for contrast, threshold, denoise in itertools.product(CONTRASTS, THRESHOLDS, DENOISE):
+        # 去噪只作用于二值化后的图片
+        if denoise and threshold is None:
+            continue
+        yield {'contrast': contrast, 'threshold': threshold, 'denoise': denoise}
+
+
+def evaluate(params, corpus, recognizer):
+    """
+    与 captcha_rec() 相同的判定：结果不是 4 位时登录流程直接刷新验证码，不提交
+    """
+    preprocessor = CaptchaPreprocessor(**params)
+    correct = rejected = 0
+    elapsed = 0.0
+    for label, png in corpus:
+        start = perf_counter()
+        result = recognizer.classification(preprocessor.process(png))
+        elapsed += perf_counter() - start
+        if not result or len(result) != 4:
+            rejected += 1
+            continue
+        correct += ''.join(c for c in result if c.isalnum()).lower() == label
+    accuracy = correct / len(corpus)
+    return {
+        'accuracy': accuracy,
+        'rejected': rejected / len(corpus),
+        # 每张验证码独立，成功前的尝试次数服从几何分布
+        'attempts': 1 / accuracy if accuracy else float('inf'),
+        'latency_ms': elapsed / len(corpus) * 1000,
+        'samples': len(corpus),
+    }
+
+
+def evaluate_batch(params, corpus, workers):
+    """
+    置信度不足时登录流程刷新验证码而不提交，因此分别统计提交率与提交答案的正确率
+    """
+    batch = BatchRecognizer(variants_of(params), workers=workers).start()
+    batch.recognize(corpus[0][1])
+    submitted = correct = 0
+    elapsed = 0.0
+    for label, png in corpus:
+        start = perf_counter()
+        answer = batch.recognize(png)
+        elapsed += perf_counter() - start
+        if answer.text and answer.confidence >= batch.min_confidence:
+            submitted += 1
+            correct += answer.text.lower() == label
+    batch.close()
+    return {
+        'submitted': submitted / len(corpus),
+        'precision': correct / submitted if submitted else 0.0,
+        'attempts': len(corpus) / correct if correct else float('inf'),
+        'latency_ms': elapsed / len(corpus) * 1000,
+    }
+
+
+def describe(params):
+    return ' '.join(f"{key}={params[key]}" for key in ('contrast', 'threshold', 'denoise'))
+
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv, "sb:")
+    except getopt.GetoptError:
+        print(__doc__.strip())
+        sys.exit(2)
+    save = ('-s', '') in opts
+    workers = next((int(arg) for opt, arg in opts if opt == '-b'), None)
+    folder = args[0] if args else os.path.join(os.path.dirname(tunedParamsPath), 'captchaRecord')
+    corpus = load_corpus(folder) if os.path.isdir(folder) else []
+    if not corpus:
+        print(f"{folder} 中没有标注好的验证码图片")
+        sys.exit(1)
+
+    recognizer = get_recognizer()
+    recognizer.warmup()
+    results = []
+    print(f"{'参数':<40}{'准确率':>8}{'拒识率':>8}{'尝试次数':>10}{'延迟(ms)':>10}")
+    for params in grid():
+        metrics = evaluate(params, corpus, recognizer)
+        results.append((params, metrics))
+        print(f"{describe(params):<40}{metrics['accuracy']:>8.1%}{metrics['rejected']:>8.1%}"
+              f"{metrics['attempts']:>10.2f}{metrics['latency_ms']:>10.1f}")
+
+    params, metrics = max(results, key=lambda r: (r[1]['accuracy'], -r[1]['latency_ms']))
+    print(f"最佳参数 ({len(corpus)} 张): {describe(params)}，准确率 {metrics['accuracy']:.1%}，"
+          f"平均尝试 {metrics['attempts']:.2f} 次，延迟 {metrics['latency_ms']:.1f}ms")
+    if workers is not None:
+        batch = evaluate_batch(params, corpus, workers)
+        print(f"多候选识别 ({len(variants_of(params))} 个变体, {workers} 进程): 提交率 {batch['submitted']:.1%}，"
+              f"提交正确率 {batch['precision']:.1%}，平均尝试 {batch['attempts']:.2f} 次，延迟 {batch['latency_ms']:.1f}ms")
+    if save:
+        save_tuned_params(params, metrics)
+        print(f"已写入 {tunedParamsPath}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
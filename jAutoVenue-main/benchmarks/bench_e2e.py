@@ -0,0 +1,122 @@
+"""
+在本地替身服务器上回放完整的浏览器流程 login() -> order()，报告端到端延迟分布与各阶段 p50/p95
+
+python3 benchmarks/bench_e2e.py [-n 次数] [-l 每请求额外延迟毫秒] [-c 抢占概率] [-s 保存标签] [-b 对比标签]
+
+-s 把本次结果保存为 benchmarks/results/<标签>.json，-b 与之前保存的结果逐项对比，
+用于衡量代码改动前后的端到端延迟变化。需要 Firefox 与 geckodriver。
+"""
+import os
+import sys
+import json
+import getopt
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_platform import start_mock_platform, mock_jaccount_host
+from sport import SJTUSport
+from tracing import Tracer, summarize, percentile
+from captcha import warmup
+from captcha_cache import CaptchaCache
+from venue_index import VenueIndex
+from bench_captcha import report
+
+resultsPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def run_once(base_url, traces, cache, venueIndex):
+    start = perf_counter()
+    sport = SJTUSport(venue='学生服务中心', venueItem='学生中心健身房', startTime=17,
+                      sessionStore=False, browserProfile='lean', tracer=Tracer(directory=traces),
+                      homeUrl=base_url, jaccountHost=mock_jaccount_host(base_url), captchaCache=cache,
+                      venueIndex=venueIndex)
+    try:
+        started = perf_counter()
+        ok = sport.login() == 1 and sport.order() == 1
+        finished = perf_counter()
+    finally:
+        sport.shutDown()
+    return ok, finished - start, finished - started
+
+
+def run(runs, latency, contention):
+    server, platform, base_url = start_mock_platform(courts=runs, taken_ratio=0.3, contention=contention,
+                                                     latency=latency, captcha_strict=True)
+    traces = tempfile.mkdtemp()
+    # 替身站点的验证码不能进入真实的缓存与标注语料
+    cache = CaptchaCache(path=os.path.join(traces, 'captcha_cache.bin'), record_dir=None)
+    # 场馆索引同理，否则会记下 127.0.0.1 的详情页地址
+    venueIndex = VenueIndex(os.path.join(traces, 'venue_index.json'))
+    total, flow, failures = [], [], 0
+    for i in range(runs):
+        ok, wall, booking = run_once(base_url, traces, cache, venueIndex)
+        total.append(wall)
+        flow.append(booking)
+        failures += not ok
+    server.shutdown()
+    steps = summarize(traces)
+    return {
+        'runs': runs,
+        'failures': failures,
+        'orders': len(platform.orders),
+        'logins': platform.logins,
+        'total': {'p50': percentile(total, 50) * 1000, 'p95': percentile(total, 95) * 1000},
+        'login+order': {'p50': percentile(flow, 50) * 1000, 'p95': percentile(flow, 95) * 1000},
+        'steps': {name: {'n': n, 'p50': p50, 'p95': p95} for name, (n, p50, p95) in steps.items()},
+    }, total, flow
+
+
+def compare(current, baseline):
+    print(f"{'step':<20}{'p50 前(ms)':>12}{'p50 后(ms)':>12}{'变化':>10}")
+    rows = [('total', baseline['total'], current['total']),
+            ('login+order', baseline['login+order'], current['login+order'])]
+    rows += [(name, baseline['steps'][name], step) for name, step in sorted(current['steps'].items())
+             if name in baseline['steps']]
+    for name, before, after in rows:
+        change = (after['p50'] - before['p50']) / before['p50'] * 100 if before['p50'] else 0.0
+        print(f"{name:<20}{before['p50']:>12.1f}{after['p50']:>12.1f}{change:>+9.1f}%")
+
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv, "n:l:c:s:b:")
+    except getopt.GetoptError:
+        print(__doc__.strip())
+        sys.exit(2)
+    runs, latency, contention, save, baseline = 5, 0.0, 0.0, None, None
+    for opt, arg in opts:
+        if opt == '-n':
+            runs = int(arg)
+        elif opt == '-l':
+            latency = float(arg) / 1000
+        elif opt == '-c':
+            contention = float(arg)
+        elif opt == '-s':
+            save = arg
+        elif opt == '-b':
+            baseline = arg
+
+    # 模型加载不计入单次流程
+    warmup()
+    result, total, flow = run(runs, latency, contention)
+    report("total (含浏览器启动)", total)
+    report("login+order", flow)
+    print(f"失败 {result['failures']}/{runs}，成功订单 {result['orders']}，jaccount 登录 {result['logins']} 次")
+    print(f"{'step':<20}{'n':>6}{'p50(ms)':>12}{'p95(ms)':>12}")
+    for name, step in sorted(result['steps'].items(), key=lambda kv: -kv[1]['p50']):
+        print(f"{name:<20}{step['n']:>6}{step['p50']:>12.1f}{step['p95']:>12.1f}")
+
+    if baseline:
+        with open(os.path.join(resultsPath, baseline + '.json'), encoding='utf-8') as f:
+            compare(result, json.load(f))
+    if save:
+        os.makedirs(resultsPath, exist_ok=True)
+        with open(os.path.join(resultsPath, save + '.json'), 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存为 {save}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
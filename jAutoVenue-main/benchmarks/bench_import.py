@@ -0,0 +1,98 @@
+"""
+导入耗时回归检查：在独立进程中以 python -X importtime 运行各入口，报告模块导入耗时中位数与最重的依赖，
+并检查轻量命令没有加载浏览器、OCR 与 HTTP 相关的库。超出预算或加载了禁止的库时以状态码 1 退出
+
+python3 benchmarks/bench_import.py [每项运行次数，默认 5]
+"""
+import os
+import sys
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 浏览器 / OCR / HTTP 栈，只有真正预约时才应加载；retry 用到的 selenium.common 只是异常类，不在此列
+HEAVY = ('selenium.webdriver', 'ddddocr', 'onnxruntime', 'numpy', 'PIL', 'requests', 'cryptography')
+
+# (名称, 命令行参数, 导入耗时预算 ms, 不允许加载的包)
+TARGETS = [
+    ('import auto_booking', ['-c', 'import auto_booking'], 150, HEAVY),
+    ('import jobs', ['-c', 'import jobs'], 100, HEAVY),
+    ('import venue_index', ['-c', 'import venue_index'], 50, HEAVY),
+    ('import watch', ['-c', 'import watch'], 100, HEAVY),
+    # 浏览器、OCR 与通知相关的模块在 SJTUSport 与 captcha_rec 内部导入
+    ('import sport', ['-c', 'import sport'], 100, HEAVY),
+    # 识别子进程会导入 captcha，模型与浏览器相关的库应推迟到首次使用
+    ('import captcha', ['-c', 'import captcha'], 400, ('selenium.webdriver', 'ddddocr', 'onnxruntime', 'requests')),
+    ('auto_booking.py venues', ['auto_booking.py', 'venues'], 200, HEAVY),
+    ('auto_booking.py validate', ['auto_booking.py', 'validate'], 200, HEAVY),
+    ('auto_booking.py next', ['auto_booking.py', 'next'], 200, HEAVY),
+    ('sport.py -h', ['sport.py', '-h'], 200, HEAVY),
+]
+
+
+def importtime(args):
+    """
+    运行一次，返回 [(模块名, 累计耗时 us, 缩进层级)]，子模块排在导入它的模块之前
+    """
+    proc = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|', 2)
+        name = name[1:]
+        modules.append((name.strip(), int(cumulative), (len(name) - len(name.lstrip())) // 2))
+    return modules
+
+
+def loads(modules, package):
+    return any(name == package or name.startswith(package + '.') for name, us, depth in modules)
+
+
+def measure(args, runs):
+    """
+    项目内模块（ROOT 下的 .py）在顶层的累计耗时之和取多次运行的中位数，
+    以及最后一次运行中这些模块直接导入的依赖，不计 site 等解释器启动时的导入
+    """
+    local = {name[:-3] for name in os.listdir(ROOT) if name.endswith('.py')}
+    totals = []
+    for _ in range(runs):
+        modules = importtime(args)
+        totals.append(sum(us for name, us, depth in modules if depth == 0 and name in local) / 1000)
+    children, pending = [], []
+    for name, us, depth in modules:
+        if depth == 1:
+            pending.append((name, us))
+        elif depth == 0:
+            if name in local:
+                children.extend(pending)
+            pending = []
+    return statistics.median(totals), modules, children
+
+
+def main(argv):
+    runs = int(argv[0]) if argv else 5
+    failed = False
+    print(f"{'入口':<28}{'导入(ms)':>10}{'预算':>8}  最重的依赖")
+    for name, args, budget, forbidden in TARGETS:
+        elapsed, modules, children = measure(args, runs)
+        loaded = [package for package in forbidden if loads(modules, package)]
+        heaviest = sorted(children, key=lambda m: -m[1])[:3]
+        status = ''
+        if elapsed > budget:
+            status += ' 超出预算'
+        if loaded:
+            status += f" 加载了 {', '.join(loaded)}"
+        failed = failed or bool(status)
+        print(f"{name:<28}{elapsed:>10.1f}{budget:>8}  "
+              f"{', '.join(f'{m} {us / 1000:.0f}ms' for m, us in heaviest)}{status}")
+    if failed:
+        print("导入耗时回归检查未通过")
+        sys.exit(1)
+    print("导入耗时回归检查通过")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
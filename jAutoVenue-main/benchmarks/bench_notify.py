@@ -0,0 +1,66 @@
+"""
+在本地 Server酱替身上对比同步发送与后台通知队列：调用方阻塞时间、失败重试与落盘补发
+
+python3 benchmarks/bench_notify.py [消息数] [每请求额外延迟毫秒]
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from mock_platform import start_mock_platform, mock_notify_url
+from notify import Notifier
+from bench_captcha import report
+
+
+def blocking(url, n):
+    samples = []
+    for i in range(n):
+        start = perf_counter()
+        requests.post(url.format(sckey='bench'), data={'title': f'sync {i}', 'desp': '', 'noip': 1})
+        samples.append(perf_counter() - start)
+    return samples
+
+
+def queued(notifier, n):
+    samples = []
+    for i in range(n):
+        start = perf_counter()
+        notifier.send('bench', f'queued {i}', '')
+        samples.append(perf_counter() - start)
+    return samples
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 20
+    latency = float(argv[1]) / 1000 if len(argv) > 1 else 50 / 1000
+    outbox = os.path.join(tempfile.mkdtemp(), 'outbox.jsonl')
+
+    server, platform, base_url = start_mock_platform(latency=latency)
+    url = mock_notify_url(base_url)
+    report("同步 requests.post", blocking(url, n))
+    notifier = Notifier(url, outbox=outbox, backoff=0.05).start()
+    start = perf_counter()
+    report("通知队列 send()", queued(notifier, n))
+    notifier.flush(60)
+    print(f"队列发完 {notifier.sent} 条用时 {(perf_counter() - start) * 1000:.0f}ms")
+
+    # 替身连续返回 503：重试耗尽后落盘，重新启动的通知器补发
+    platform.notify_failures = 100
+    failing = Notifier(url, outbox=outbox, retries=2, backoff=0.05).start()
+    failing.send('bench', 'spill', '')
+    failing.flush(10)
+    print(f"重试耗尽后落盘 {failing.spilled} 条")
+    platform.notify_failures = 0
+    received = len(platform.notifications)
+    recovered = Notifier(url, outbox=outbox).start()
+    recovered.flush(10)
+    print(f"重新启动后补发 {len(platform.notifications) - received} 条，outbox 剩余: {os.path.exists(outbox)}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
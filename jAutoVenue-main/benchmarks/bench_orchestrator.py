@@ -0,0 +1,50 @@
+"""
+在本地替身服务器上对比顺序与并发执行 N 个预约任务的总耗时
+
+python3 benchmarks/bench_orchestrator.py [任务数] [每请求额外延迟毫秒]
+"""
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_platform import start_mock_platform, mock_cookies
+from orchestrator import Orchestrator, BookingJob, report
+from preferences import Preference
+from tracing import Tracer
+from venue_index import VenueIndex
+
+
+def jobs(n):
+    return [BookingJob(f"job{i + 1}", 7, [Preference('学生服务中心', '学生中心健身房', 7 + i % 15)]) for i in range(n)]
+
+
+def run(n, latency, concurrency):
+    server, platform, base_url = start_mock_platform(courts=n, taken_ratio=0.0, latency=latency)
+    traces = tempfile.mkdtemp()
+    # 替身站点的 venueId 不能写入真实的场馆索引
+    venueIndex = VenueIndex(os.path.join(traces, 'venue_index.json'))
+    orchestrator = Orchestrator(jobs(n), concurrency=concurrency, sckey='',
+                                engineOptions={'baseUrl': base_url, 'sessionStore': False,
+                                               'tracer': Tracer(directory=traces), 'venueIndex': venueIndex})
+    orchestrator.cookies = mock_cookies()
+    start = perf_counter()
+    results = orchestrator.run()
+    wall = perf_counter() - start
+    server.shutdown()
+    return results, wall
+
+
+def main(argv):
+    n = int(argv[0]) if argv else 3
+    latency = float(argv[1]) / 1000 if len(argv) > 1 else 50 / 1000
+    for label, concurrency in (('顺序', 1), ('并发', n)):
+        results, wall = run(n, latency, concurrency)
+        print(f"--- {label} (并发数 {concurrency}) ---")
+        report(results, wall)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
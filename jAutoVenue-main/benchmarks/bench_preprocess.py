@@ -0,0 +1,69 @@
+"""
+验证码预处理新旧流水线对比（不含 OCR 推理）
+
+python3 benchmarks/bench_preprocess.py <保存的验证码 PNG 目录> [重复次数]
+"""
+import os
+import sys
+import tempfile
+import statistics
+from io import BytesIO
+from time import perf_counter
+from PIL import Image, ImageEnhance
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from captcha import CaptchaPreprocessor
+from bench_captcha import load_images, report
+
+
+def legacy_pipeline(raw, workdir):
+    """
+    与旧版 captcha_rec 相同：每次重建阈值表、落盘调试图片、再编码为 PNG bytes
+    """
+    captcha = Image.open(BytesIO(raw))
+    captcha = captcha.convert('L')
+    captcha = ImageEnhance.Contrast(captcha).enhance(2.0)
+    threshold = 140
+    table = []
+    for i in range(256):
+        if i < threshold:
+            table.append(0)
+        else:
+            table.append(1)
+    captcha = captcha.point(table, '1')
+    captcha.save(os.path.join(workdir, 'last_captcha_processed.png'))
+    buf = BytesIO()
+    captcha.save(buf, format='png')
+    return buf.getvalue()
+
+
+def main(argv):
+    if not 1 <= len(argv) <= 2:
+        print(__doc__.strip())
+        sys.exit(1)
+    images = load_images(argv[0])
+    repeat = int(argv[1]) if len(argv) == 2 else 20
+    if not images:
+        print("目录中没有 PNG 图片")
+        sys.exit(1)
+
+    preprocessor = CaptchaPreprocessor(contrast=2.0, threshold=140)
+    old, new = [], []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(repeat):
+            for raw in images:
+                start = perf_counter()
+                legacy_pipeline(raw, workdir)
+                old.append(perf_counter() - start)
+
+                start = perf_counter()
+                preprocessor.process(raw)
+                new.append(perf_counter() - start)
+
+    report("legacy", old)
+    report("pipeline", new)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,41 @@
+"""
+在本地时钟偏移的替身服务器上验证时钟偏差估计与触发精度
+
+python3 benchmarks/bench_release_clock.py [偏移秒数] [触发次数]
+"""
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from release_clock import ClockSync, ReleaseScheduler
+from mock_platform import start_mock_platform
+
+
+def main(argv):
+    skew = float(argv[0]) if argv else 3.37
+    fires = int(argv[1]) if len(argv) > 1 else 10
+    server, platform, base_url = start_mock_platform(clock_skew=skew)
+    clock = ClockSync(base_url + '/', samples=10)
+    scheduler = ReleaseScheduler(clock)
+    scheduler.sync()
+    error = scheduler.metrics['offset'] - skew
+    print(f"真实偏移 {skew * 1000:+.1f}ms，估计误差 {error * 1000:+.1f}ms")
+
+    # 以真实服务器时间衡量触发时刻
+    lateness = []
+    for _ in range(fires):
+        target = time.time() + skew + 0.2
+        scheduler.wait_until(target)
+        lateness.append(time.time() + skew - target)
+    lateness = [abs(x) * 1000 for x in lateness]
+    print(f"触发误差: mean={statistics.mean(lateness):.2f}ms max={max(lateness):.2f}ms")
+    jitter = [abs(x) * 1000 for x in scheduler.metrics['jitter']]
+    print(f"自报抖动: mean={statistics.mean(jitter):.3f}ms max={max(jitter):.3f}ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
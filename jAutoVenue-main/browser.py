@@ -0,0 +1,358 @@
+import os
+import atexit
+import threading
+import config
+from selenium import webdriver
+from selenium.webdriver.firefox.options import Options
+
+currentPath = os.path.dirname(os.path.abspath(__file__))
+defaultProfileDir = os.path.join(currentPath, 'firefox-profile')
+
+# 精简配置：无界面、不加载图片/字体/媒体、关闭内置扩展与后台服务
+# 验证码由 CaptchaFetcher 通过 HTTP 直接下载，不依赖页面上的 <img>
+LEAN_PREFS = {
+    'permissions.default.image': 2,
+    'browser.display.use_document_fonts': 0,
+    'gfx.downloadable_fonts.enabled': False,
+    'media.autoplay.default': 5,
+    'media.hardware-video-decoding.enabled': False,
+    'extensions.enabledScopes': 1,
+    'extensions.pocket.enabled': False,
+    'extensions.screenshots.disabled': True,
+    'network.prefetch-next': False,
+    'network.dns.disablePrefetch': True,
+    'browser.safebrowsing.malware.enabled': False,
+    'browser.safebrowsing.phishing.enabled': False,
+    'toolkit.telemetry.enabled': False,
+    'datareporting.policy.dataSubmissionEnabled': False,
+    'app.update.auto': False,
+    'dom.ipc.processCount': 1,
+    'browser.cache.disk.enable': True,
+}
+
+
+def build_options(profile='default', profileDir=None):
+    """
+    profile 为 'default'（有界面、完整加载）或 'lean'；
+    profileDir 指定持久化的 Firefox 配置目录，以便跨运行复用磁盘缓存
+    """
+    options = Options()
+    options.add_argument("--window-size=1920,1080")
+    if profile == 'lean':
+        options.add_argument('-headless')
+        options.add_argument('--width=1920')
+        options.add_argument('--height=1080')
+        for key, value in LEAN_PREFS.items():
+            options.set_preference(key, value)
+    elif profile != 'default':
+        raise ValueError("未知的浏览器配置: " + str(profile))
+    if profileDir:
+        os.makedirs(profileDir, exist_ok=True)
+        options.add_argument('-profile')
+        options.add_argument(profileDir)
+    return options
+
+
+def browser_settings():
+    """
+    config.browser_options 中的 (profile, profileDir)，未配置时为原来的默认浏览器
+    """
+    settings = getattr(config, 'browser_options', {})
+    return settings.get('profile', 'default'), settings.get('profile_dir')
+
+
+def start_browser(profile=None, profileDir=None):
+    if profile is None:
+        profile, configured = browser_settings()
+        profileDir = profileDir or configured
+    options = build_options(profile, profileDir)
+    return webdriver.Firefox(options=options), options
+
+
+def process_tree(pid):
+    """
+    pid 及其全部子孙进程（仅 Linux，读取 /proc）
+    """
+    pids = [pid]
+    for p in pids:
+        for task in os.listdir(f'/proc/{p}/task') if os.path.exists(f'/proc/{p}/task') else []:
+            try:
+                with open(f'/proc/{p}/task/{task}/children') as f:
+                    pids.extend(int(c) for c in f.read().split())
+            except OSError:
+                pass
+    return pids
+
+
+def tree_rss(pid):
+    """
+    进程树的常驻内存总量（字节），无法读取 /proc 时为 0
+    """
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+
+class PooledBrowser(object):
+    """
+    从 BrowserPool 借出的浏览器；用完调用 release()，discard 为 True 时直接关闭而不归还
+    """
+    def __init__(self, pool, slot, driver, options):
+        self.pool = pool
+        self.slot = slot
+        self.driver = driver
+        self.options = options
+        self.handle = driver.current_window_handle
+        self.uses = 0
+        self.leased = False
+
+    def rss(self):
+        try:
+            return tree_rss(self.driver.service.process.pid)
+        except AttributeError:
+            return 0
+
+    def release(self, discard=False):
+        self.pool.release(self, discard)
+
+
+class BrowserPool(object):
+    """
+    守护进程持有的 WebDriver 池，预约任务借用已启动的浏览器，避免在开放时刻冷启动
+
+    借出前检查浏览器是否存活，死掉的直接替换；归还时关闭多余标签页、清空 sessionStorage 并回到 about:blank，
+    保留 cookie 以便下一次借用时沿用登录状态。使用满 max_uses 次或进程树 RSS 超过 max_rss_mb 时关闭，
+    并在后台启动替补。配置了 profileDir 时第 n 个浏览器 (n > 0) 使用 profileDir-n，避免同一配置目录被同时打开。
+    """
+    def __init__(self, size=1, max_uses=20, max_rss_mb=1500, profile=None, profileDir=None, timeout=120):
+        self.size = self.baseSize = size
+        self.max_uses = max_uses
+        self.max_rss = max_rss_mb * 2 ** 20 if max_rss_mb else None
+        self.profile = profile
+        self.profileDir = profileDir
+        self.timeout = timeout
+        self.slots = {}
+        self.idle = []
+        self.started = self.recycled = 0
+        self.closed = False
+        self._cond = threading.Condition()
+        self._filling = None
+
+    def _reserve(self):
+        slot = next(i for i in range(self.size + 1) if i not in self.slots)
+        self.slots[slot] = None
+        return slot
+
+    def _start(self, slot):
+        profileDir = self.profileDir
+        if profileDir and slot:
+            profileDir = f"{profileDir}-{slot}"
+        try:
+            driver, options = start_browser(self.profile, profileDir)
+        except Exception:
+            with self._cond:
+                self.slots.pop(slot, None)
+                self._cond.notify()
+            raise
+        browser = PooledBrowser(self, slot, driver, options)
+        with self._cond:
+            self.slots[slot] = browser
+            self.started += 1
+        return browser
+
+    def _quit(self, browser, reason):
+        print(f"回收浏览器 #{browser.slot}: {reason}")
+        with self._cond:
+            if self.slots.get(browser.slot) is browser:
+                del self.slots[browser.slot]
+            self.recycled += 1
+            self._cond.notify()
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            print(f"关闭浏览器出错: {str(e)}")
+
+    def alive(self, browser):
+        try:
+            return browser.driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    def overweight(self, browser):
+        """
+        进程树内存超过上限时返回回收原因
+        """
+        if self.max_rss:
+            rss = browser.rss()
+            if rss > self.max_rss:
+                return f"内存 {rss / 2 ** 20:.0f}MB 超过上限"
+        return None
+
+    def reset(self, browser):
+        """
+        关闭借用期间打开的其他标签页并回到空白页，cookie 保持不变
+        """
+        driver = browser.driver
+        try:
+            for handle in driver.window_handles:
+                if handle != browser.handle:
+                    driver.switch_to.window(handle)
+                    driver.close()
+            driver.switch_to.window(browser.handle)
+            driver.execute_script('try { window.sessionStorage.clear(); } catch (e) {}')
+            driver.get('about:blank')
+            return True
+        except Exception as e:
+            print(f"重置浏览器失败: {str(e)}")
+            return False
+
+    def fill(self):
+        """
+        启动浏览器直到池满，返回新启动的数量
+        """
+        count = 0
+        while True:
+            with self._cond:
+                if self.closed or len(self.slots) >= self.size:
+                    return count
+                slot = self._reserve()
+            try:
+                browser = self._start(slot)
+            except Exception as e:
+                print(f"预启动浏览器失败: {str(e)}")
+                return count
+            with self._cond:
+                self.idle.append(browser)
+                self._cond.notify()
+            count += 1
+
+    def fill_async(self):
+        """
+        在后台线程补足浏览器，不阻塞调用方；同一时间只有一个补足线程
+        """
+        with self._cond:
+            if self._filling and self._filling.is_alive():
+                return self._filling
+            self._filling = threading.Thread(target=self.fill, name='browser-pool', daemon=True)
+            self._filling.start()
+        return self._filling
+
+    def lease(self):
+        """
+        借出一个存活的浏览器；池中没有空闲浏览器且未满时当场启动，已满时最多等待 timeout 秒
+        """
+        while True:
+            slot = None
+            with self._cond:
+                if self.closed:
+                    raise RuntimeError("浏览器池已关闭")
+                if not self.idle and len(self.slots) >= self.size:
+                    if not self._cond.wait_for(lambda: self.idle or len(self.slots) < self.size, self.timeout):
+                        raise TimeoutError(f"{self.timeout} 秒内没有可用的浏览器")
+                if self.idle:
+                    browser = self.idle.pop()
+                else:
+                    slot = self._reserve()
+            if slot is not None:
+                browser = self._start(slot)
+            elif not self.alive(browser):
+                self._quit(browser, '已失去响应')
+                continue
+            browser.uses += 1
+            browser.leased = True
+            return browser
+
+    def release(self, browser, discard=False):
+        """
+        归还借出的浏览器，重复归还会被忽略
+        """
+        if not browser.leased:
+            return
+        browser.leased = False
+        if self.closed or discard:
+            reason = '已关闭' if self.closed else '调用方要求重启'
+        elif len(self.slots) > self.size:
+            reason = '超出池容量'
+        elif browser.uses >= self.max_uses:
+            reason = f"已使用 {browser.uses} 次"
+        elif not self.reset(browser):
+            reason = '重置失败'
+        else:
+            reason = self.overweight(browser)
+        if reason is None:
+            with self._cond:
+                self.idle.append(browser)
+                self._cond.notify()
+            return
+        self._quit(browser, reason)
+        if not self.closed:
+            self.fill_async()
+
+    def maintain(self):
+        """
+        检查空闲的浏览器，回收失去响应或内存超限的并在后台补足；由守护进程在等待期间定期调用
+        """
+        with self._cond:
+            idle, self.idle = self.idle, []
+        for browser in idle:
+            if len(self.slots) > self.size:
+                reason = '超出池容量'
+            else:
+                reason = '已失去响应' if not self.alive(browser) else self.overweight(browser)
+            if reason:
+                self._quit(browser, reason)
+            else:
+                with self._cond:
+                    self.idle.append(browser)
+                    self._cond.notify()
+        if len(self.slots) < self.size:
+            self.fill_async()
+
+    def resize(self, size=None):
+        """
+        调整容量，size 为 None 时恢复为构造时的大小；增大时在后台补足，减小时多出的浏览器在归还或 maintain() 时关闭
+        """
+        with self._cond:
+            self.size = max(1, self.baseSize if size is None else size)
+            self._cond.notify_all()
+        self.fill_async()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            idle, self.idle = self.idle, []
+            self._cond.notify_all()
+        for browser in idle:
+            try:
+                browser.driver.quit()
+            except Exception as e:
+                print(f"关闭浏览器出错: {str(e)}")
+            with self._cond:
+                self.slots.pop(browser.slot, None)
+
+
+_pool = None
+_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """
+    按 config.browser_pool 构造的共享浏览器池，未启用时返回 None；退出时关闭全部空闲浏览器
+    """
+    global _pool
+    options = dict(getattr(config, 'browser_pool', {}))
+    if not options.pop('enabled', False):
+        return None
+    with _lock:
+        if _pool is None:
+            profile, profileDir = browser_settings()
+            _pool = BrowserPool(profile=profile, profileDir=profileDir, **options)
+            atexit.register(_pool.close)
+    return _pool
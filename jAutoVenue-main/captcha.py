@@ -0,0 +1,430 @@
+import os
+import json
+import queue
+import string
+import threading
+import multiprocessing
+from io import BytesIO
+from time import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from PIL import Image
+import config
+
+currentPath = os.path.dirname(os.path.abspath(__file__))
+# benchmarks/bench_captcha_accuracy.py 网格搜索得到的最佳预处理参数
+tunedParamsPath = os.path.join(currentPath, 'captcha_params.json')
+TUNED_KEYS = ('contrast', 'threshold', 'denoise')
+
+
+class CaptchaRecognizer(object):
+    """
+    进程内共享的 ddddocr 识别器，ONNX 模型只加载一次
+
+    ddddocr 与 onnxruntime 在首次 load() 时才导入，只查看任务或场馆的命令不必承担这部分开销
+    """
+    def __init__(self):
+        self._ocr = None
+        self._lock = threading.Lock()
+        # 旧版 ddddocr 只接受 bytes，首次失败后改为编码 PNG
+        self._accepts_image = True
+
+    @property
+    def loaded(self):
+        return self._ocr is not None
+
+    def load(self):
+        if self._ocr is None:
+            with self._lock:
+                if self._ocr is None:
+                    import ddddocr
+                    self._ocr = ddddocr.DdddOcr(show_ad=False)
+        return self._ocr
+
+    def warmup(self):
+        """
+        加载模型并用空白图片跑一次推理，避免首次识别时的额外开销
+        """
+        self.classification(Image.new('L', (100, 40), 255))
+
+    def classification(self, img, **kwargs):
+        """
+        img 可以是 PNG/JPEG bytes 或 PIL Image，Image 直接交给 ddddocr 不再编码
+        """
+        ocr = self.load()
+        if isinstance(img, Image.Image):
+            if self._accepts_image:
+                try:
+                    return ocr.classification(img, **kwargs)
+                except (TypeError, AttributeError):
+                    self._accepts_image = False
+            img = to_png(img)
+        return ocr.classification(img, **kwargs)
+
+    def scored(self, img, charset):
+        """
+        返回 (text, 每个字符的置信度)，只在 charset 内解码
+        """
+        return decode(self.classification(img, probability=True), charset)
+
+
+def to_png(img):
+    buf = BytesIO()
+    img.save(buf, format='png')
+    return buf.getvalue()
+
+
+_columns = {}
+
+
+def decode(result, charset):
+    """
+    对 ddddocr 的逐帧概率做受限的 CTC 贪心解码：每帧只在空白符与 charset 中的字符里取最大，
+    合并相邻重复帧，字符置信度取其所占各帧的最大概率
+    """
+    key = (len(result['charset']), charset)
+    if key not in _columns:
+        allowed = set(charset)
+        _columns[key] = np.array([0] + [i for i, c in enumerate(result['charset']) if c and c in allowed])
+    columns = _columns[key]
+    probs = np.asarray(result['probabilities'], dtype=np.float32).reshape(-1, len(result['charset']))[:, columns]
+    best = probs.argmax(axis=1)
+    text, confidences, previous = [], [], 0
+    for frame, index in enumerate(best):
+        p = float(probs[frame, index])
+        if index and index == previous:
+            confidences[-1] = max(confidences[-1], p)
+        elif index:
+            text.append(result['charset'][columns[index]])
+            confidences.append(p)
+        previous = index
+    return ''.join(text), confidences
+
+
+class DebugDumper(object):
+    """
+    后台线程异步保存调试图片，不阻塞识别流程
+    """
+    def __init__(self, directory, maxsize=32):
+        self.directory = directory
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+
+    def dump(self, img, tag='processed'):
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait((img, tag))
+        except queue.Full:
+            pass  # 调试图片宁可丢弃也不能拖慢登录
+
+    def _run(self):
+        while True:
+            img, tag = self._queue.get()
+            try:
+                img.save(os.path.join(self.directory, f"{int(time() * 1000)}_{tag}.png"))
+            except Exception as e:
+                print(f"保存调试图片失败: {str(e)}")
+
+
+class CaptchaPreprocessor(object):
+    """
+    验证码预处理：灰度 -> 对比度增强 -> 二值化 -> 去噪
+
+    对比度与阈值合并为一张按图片均值索引的查找表，只在构造时计算一次，
+    每次处理只需一次 NumPy 索引。contrast / threshold 为 None 或 denoise 为 0 时跳过对应步骤。
+    """
+    def __init__(self, contrast=2.0, threshold=140, denoise=0, debug_dir=None):
+        self.contrast = contrast
+        self.threshold = threshold
+        self.denoise = denoise
+        self.dumper = DebugDumper(debug_dir) if debug_dir else None
+        self._lut = self._build_lut(contrast, threshold)
+
+    @staticmethod
+    def _build_lut(contrast, threshold):
+        # lut[mean, pixel]，与 ImageEnhance.Contrast 相同：mean + (pixel - mean) * contrast
+        mean = np.arange(256, dtype=np.float32)[:, None]
+        pixel = np.arange(256, dtype=np.float32)[None, :]
+        if contrast is None:
+            value = np.broadcast_to(pixel, (256, 256))
+        else:
+            value = np.clip(mean + (pixel - mean) * contrast, 0, 255)
+        if threshold is None:
+            return value.astype(np.uint8)
+        return np.where(value < threshold, 0, 255).astype(np.uint8)
+
+    def _denoise(self, arr):
+        # 去掉周围 8 邻域中黑点数少于 denoise 的孤立黑点
+        dark = np.pad(arr == 0, 1).astype(np.uint8)
+        h, w = arr.shape
+        neighbours = sum(
+            dark[1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+            for dy in (-1, 0, 1) for dx in (-1, 0, 1) if dy or dx
+        )
+        arr = arr.copy()
+        arr[(arr == 0) & (neighbours < self.denoise)] = 255
+        return arr
+
+    def process_array(self, img):
+        if not isinstance(img, Image.Image):
+            img = Image.open(BytesIO(img))
+        gray = np.asarray(img.convert('L'))
+        mean = int(gray.mean() + 0.5)
+        arr = self._lut[mean][gray]
+        if self.denoise and self.threshold is not None:
+            arr = self._denoise(arr)
+        return arr
+
+    def process(self, img):
+        """
+        返回可直接交给识别器的 'L' 模式 Image
+        """
+        out = Image.fromarray(self.process_array(img), 'L')
+        if self.dumper:
+            self.dumper.dump(out)
+        return out
+
+
+_recognizer = CaptchaRecognizer()
+_preprocessor = None
+
+
+def get_recognizer():
+    return _recognizer
+
+
+Candidate = namedtuple('Candidate', ['params', 'text', 'confidences', 'score'])
+Answer = namedtuple('Answer', ['text', 'confidence', 'candidates'])
+
+DEFAULT_CHARSET = string.ascii_letters + string.digits
+
+
+def variants_of(params):
+    """
+    以当前参数为中心的几组预处理变体：原参数、阈值上下浮动 20、不做预处理的原图
+    """
+    base = {key: params[key] for key in TUNED_KEYS}
+    variants = [base]
+    if base['threshold'] is not None:
+        for delta in (-20, 20):
+            variants.append(dict(base, threshold=min(255, max(1, base['threshold'] + delta))))
+    raw = {'contrast': None, 'threshold': None, 'denoise': 0}
+    if raw not in variants:
+        variants.append(raw)
+    return variants
+
+
+_worker_preprocessors = {}
+
+
+def _worker_init():
+    _recognizer.warmup()
+
+
+def _worker_recognize(png, params, charset):
+    key = tuple(params[k] for k in TUNED_KEYS)
+    if key not in _worker_preprocessors:
+        _worker_preprocessors[key] = CaptchaPreprocessor(**params)
+    return _recognizer.scored(_worker_preprocessors[key].process(png), charset)
+
+
+class BatchRecognizer(object):
+    """
+    把同一张验证码的多个预处理变体作为一批，在小进程池中并行识别，
+    按逐字符置信度与字符集约束给候选打分并加权投票，只返回最可信的答案
+
+    候选分数为其最弱字符的置信度（长度不符时为 0）；得分之和最高的文本胜出，
+    其置信度为该文本候选的最高分乘以它在总分中的占比，变体之间意见分歧越大越低。
+    workers 为 0 时在当前进程中依次识别。
+    """
+    def __init__(self, variants, workers=2, charset=DEFAULT_CHARSET, length=4, min_confidence=0.6):
+        self.variants = list(variants)
+        self.workers = workers
+        self.charset = charset
+        self.length = length
+        self.min_confidence = min_confidence
+        self._pool = None
+        self._preprocessors = [CaptchaPreprocessor(**params) for params in self.variants]
+
+    def start(self):
+        """
+        启动进程池并让每个进程在后台加载模型，不等待加载完成
+        """
+        if self.workers and self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_worker_init)
+            for _ in range(self.workers):
+                self._pool.submit(len, '')
+        return self
+
+    def candidates(self, img):
+        png = to_png(img) if isinstance(img, Image.Image) else img
+        if self.workers:
+            try:
+                self.start()
+                futures = [self._pool.submit(_worker_recognize, png, params, self.charset) for params in self.variants]
+                results = [future.result() for future in futures]
+            except BrokenProcessPool:
+                print("验证码识别进程池异常，改为在当前进程识别")
+                self._pool = None
+                self.workers = 0
+                return self.candidates(png)
+        else:
+            results = [_recognizer.scored(preprocessor.process(png), self.charset)
+                       for preprocessor in self._preprocessors]
+        return [
+            Candidate(params, text, confidences,
+                      min(confidences) if len(text) == self.length else 0.0)
+            for params, (text, confidences) in zip(self.variants, results)
+        ]
+
+    def recognize(self, img):
+        candidates = self.candidates(img)
+        votes = {}
+        for candidate in candidates:
+            if candidate.score:
+                votes[candidate.text] = votes.get(candidate.text, 0.0) + candidate.score
+        if not votes:
+            return Answer(None, 0.0, candidates)
+        text = max(votes, key=votes.get)
+        best = max(c.score for c in candidates if c.text == text)
+        return Answer(text, best * votes[text] / sum(votes.values()), candidates)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def label_of(filename):
+    """
+    标注语料的文件名约定：<答案>.png 或 <答案>_<任意后缀>.png
+    """
+    return os.path.basename(filename).rsplit('.', 1)[0].split('_')[0].lower()
+
+
+def load_tuned_params(path=tunedParamsPath):
+    """
+    读取保存的最佳预处理参数，文件不存在或损坏时返回空字典
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            params = json.load(f)['params']
+        return {key: params[key] for key in TUNED_KEYS if key in params}
+    except FileNotFoundError:
+        return {}
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"读取验证码参数 {path} 失败，使用 config 中的设置: {str(e)}")
+        return {}
+
+
+def save_tuned_params(params, metrics=None, path=tunedParamsPath):
+    data = {'params': {key: params[key] for key in TUNED_KEYS}, 'metrics': metrics or {}}
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def get_preprocessor():
+    """
+    按 config.captcha_options 构造的默认预处理流水线，
+    存在 captcha_params.json 时其中的 contrast / threshold / denoise 优先
+    """
+    global _preprocessor
+    if _preprocessor is None:
+        options = dict(getattr(config, 'captcha_options', {}))
+        tuned = load_tuned_params()
+        if tuned:
+            print(f"使用调优后的验证码参数: {tuned}")
+            options.update(tuned)
+        _preprocessor = CaptchaPreprocessor(**options)
+    return _preprocessor
+
+
+_batch = None
+
+
+def get_batch_recognizer():
+    """
+    按 config.captcha_batch 构造的共享多候选识别器，未启用时返回 None
+    """
+    global _batch
+    options = dict(getattr(config, 'captcha_batch', {}))
+    if not options.pop('enabled', False):
+        return None
+    if _batch is None:
+        preprocessor = get_preprocessor()
+        variants = options.pop('variants', None) or variants_of({key: getattr(preprocessor, key) for key in TUNED_KEYS})
+        _batch = BatchRecognizer(variants, **options).start()
+    return _batch
+
+
+def warmup():
+    print("预加载验证码识别模型...")
+    _recognizer.warmup()
+    get_batch_recognizer()
+    print("验证码识别模型已就绪")
+
+
+class CaptchaFetcher(object):
+    """
+    直接通过 HTTP 下载验证码原图，代替元素截图
+
+    使用与浏览器共享 cookie 的 session，下载得到的就是服务器当前会话对应的验证码；
+    刷新时点击图片并轮询 src 变化，而不是固定 sleep。
+    """
+    def __init__(self, driver, waiter=None, element_id='captcha-img', timeout=5, poll=0.05):
+        # 识别进程池中的子进程也会导入本模块，只有浏览器流程才需要 selenium 与 requests
+        from http_session import session_from_driver
+        from waits import Waiter
+        self.driver = driver
+        self.waiter = waiter or Waiter(driver, timeout, poll)
+        self.element_id = element_id
+        self.timeout = timeout
+        self.poll = poll
+        self.session = session_from_driver(driver)
+
+    def element(self):
+        # 'id' 即 By.ID，导入 By 会连带加载整个 selenium.webdriver
+        return self.driver.find_element('id', self.element_id)
+
+    def current_src(self):
+        return self.element().get_attribute('src') or ''
+
+    def wait_for_src(self, old_src=None):
+        """
+        等待 src 出现（old_src 为 None）或变为与 old_src 不同的值
+        """
+        return self.waiter.src_changes(
+            ('id', self.element_id), old_src, 'captcha src', timeout=self.timeout, poll=self.poll
+        )
+
+    def fetch(self):
+        """
+        返回验证码原始图片 bytes，HTTP 下载失败时退回元素截图
+        """
+        from http_session import sync_cookies
+        src = self.wait_for_src()
+        try:
+            sync_cookies(self.driver, self.session)
+            response = self.session.get(src, headers={'Referer': self.driver.current_url}, timeout=self.timeout)
+            response.raise_for_status()
+            return response.content
+        except Exception as e:
+            print(f"下载验证码失败，改用截图: {str(e)}")
+            return self.element().screenshot_as_png
+
+    def refresh(self):
+        """
+        点击验证码刷新，等待 src 变化后返回新的图片 bytes
+        """
+        old_src = self.current_src()
+        self.element().click()
+        self.wait_for_src(old_src)
+        return self.fetch()
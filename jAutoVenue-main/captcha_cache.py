@@ -0,0 +1,175 @@
+import os
+import struct
+import threading
+from io import BytesIO
+from time import time
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+import config
+
+currentPath = os.path.dirname(os.path.abspath(__file__))
+captchaCachePath = os.path.join(currentPath, 'captcha_cache.bin')
+captchaRecordPath = os.path.join(currentPath, 'captchaRecord')
+
+MAGIC = b'SJC1'
+# 与验证码长宽比相近的 32x16 网格，512 位
+HASH_WIDTH, HASH_HEIGHT = 32, 16
+HASH_BYTES = HASH_WIDTH * HASH_HEIGHT // 8
+# 服务器是否接受该答案：未知 / 接受 / 拒绝
+PENDING, ACCEPTED, REJECTED = 0, 1, 2
+
+
+def perceptual_hash(img):
+    """
+    均值哈希 (aHash)：按面积平均缩放为 32x16 灰度图，每位表示该格是否比整图均值暗。
+    大片白底在重新编码后也保持稳定，同一张验证码以 JPEG 60 重新压缩后相差不超过约 20 位，
+    不同验证码之间通常相差 50 位以上
+    """
+    if not isinstance(img, Image.Image):
+        img = Image.open(BytesIO(img))
+    gray = np.asarray(img.convert('L').resize((HASH_WIDTH, HASH_HEIGHT), Image.BOX), dtype=np.float32)
+    return np.packbits(gray < gray.mean()).tobytes()
+
+
+class CaptchaCache(object):
+    """
+    验证码原图感知哈希 -> (答案, 服务器是否接受) 的持久化缓存，按 LRU 淘汰
+
+    被接受过的答案命中时直接使用，跳过 OCR；被拒绝过的答案用来否决相同的识别结果。
+    汉明距离不超过 max_distance 视为同一张图。文件格式为 MAGIC + 记录数，
+    每条记录为 64 字节哈希 + 1 字节状态 + 1 字节长度 + UTF-8 答案，按从旧到新的顺序排列。
+    record_dir 不为 None 时，被接受的验证码原图以 <答案>_<毫秒时间戳>.png 存入标注语料目录。
+    """
+    def __init__(self, path=captchaCachePath, capacity=2048, max_distance=12, record_dir=captchaRecordPath):
+        self.path = path
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.record_dir = record_dir
+        self.entries = OrderedDict()
+        self._matrix = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.load()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            if not data.startswith(MAGIC):
+                return
+            (count,), offset = struct.unpack_from('>I', data, len(MAGIC)), len(MAGIC) + 4
+            for _ in range(count):
+                key = data[offset:offset + HASH_BYTES]
+                state, size = data[offset + HASH_BYTES], data[offset + HASH_BYTES + 1]
+                offset += HASH_BYTES + 2
+                self.entries[key] = (data[offset:offset + size].decode('utf-8'), state)
+                offset += size
+        except Exception as e:
+            print(f"读取验证码缓存失败: {str(e) or type(e).__name__}")
+            self.entries.clear()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            records = [MAGIC, struct.pack('>I', len(self.entries))]
+            for key, (answer, state) in self.entries.items():
+                encoded = answer.encode('utf-8')
+                records.append(key + bytes((state, len(encoded))) + encoded)
+        try:
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(b''.join(records))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"保存验证码缓存失败: {str(e)}")
+
+    def _find(self, key):
+        if key in self.entries:
+            return key
+        if not self.max_distance or not self.entries:
+            return None
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            self._matrix = np.frombuffer(b''.join(self._keys), dtype=np.uint8).reshape(-1, HASH_BYTES)
+        target = np.frombuffer(key, dtype=np.uint8)
+        distances = np.unpackbits(self._matrix ^ target, axis=1).sum(axis=1)
+        best = int(distances.argmin())
+        return self._keys[best] if distances[best] <= self.max_distance else None
+
+    def lookup(self, img):
+        """
+        返回 (answer, state)，未命中时返回 (None, None)
+        """
+        key = perceptual_hash(img)
+        with self._lock:
+            found = self._find(key)
+            if found is None:
+                self.misses += 1
+                return None, None
+            self.hits += 1
+            self.entries.move_to_end(found)
+            return self.entries[found]
+
+    def _put(self, key, answer, state):
+        """
+        写入并返回原有的 (answer, state)，没有时返回 None
+        """
+        with self._lock:
+            found = self._find(key) or key
+            if found not in self.entries:
+                self._matrix = None
+            previous = self.entries.get(found)
+            # 缓存命中后重新提交同一答案时，结果已知，不降级为 PENDING
+            if state == PENDING and previous == (answer, ACCEPTED):
+                state = ACCEPTED
+            self.entries[found] = (answer, state)
+            self.entries.move_to_end(found)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self._matrix = None
+            return previous
+
+    def submitted(self, img, answer):
+        """
+        记录即将提交的答案，结果未知
+        """
+        self._put(perceptual_hash(img), answer, PENDING)
+
+    def accepted(self, img, answer):
+        previous = self._put(perceptual_hash(img), answer, ACCEPTED)
+        self.save()
+        # 答案来自缓存命中时这张图已在语料中，不重复保存
+        if self.record_dir and previous != (answer, ACCEPTED) and not isinstance(img, Image.Image):
+            try:
+                os.makedirs(self.record_dir, exist_ok=True)
+                with open(os.path.join(self.record_dir, f"{answer.lower()}_{int(time() * 1000)}.png"), 'wb') as f:
+                    f.write(img)
+            except OSError as e:
+                print(f"保存标注验证码失败: {str(e)}")
+
+    def rejected(self, img, answer):
+        self._put(perceptual_hash(img), answer, REJECTED)
+        self.save()
+
+
+_cache = None
+
+
+def get_captcha_cache():
+    """
+    按 config.captcha_cache 构造的共享缓存，未启用时返回 None
+    """
+    global _cache
+    options = dict(getattr(config, 'captcha_cache', {}))
+    if not options.pop('enabled', False):
+        return None
+    if _cache is None:
+        record = options.pop('record', True)
+        _cache = CaptchaCache(**{key: value for key, value in options.items() if value is not None})
+        if not record:
+            _cache.record_dir = None
+    return _cache
@@ -3,3 +3,52 @@ account = {
     'password': '',
     'sckey': ''
 }
+
+# 验证码预处理参数，debug_dir 设为目录路径时异步保存预处理后的图片
+captcha_options = {
+    'contrast': 2.0,
+    'threshold': 140,
+    'denoise': 0,
+    'debug_dir': None
+}
+
+# 多候选验证码识别：同一张图的几种预处理变体在 workers 个进程中并行识别，
+# 置信度低于 min_confidence 时直接刷新验证码而不提交；variants 为 None 时围绕上面的参数自动生成。
+# 每个进程各加载一份 ONNX 模型，单核机器上反而比单次识别慢，默认关闭，多核机器上可按需开启
+captcha_batch = {
+    'enabled': False,
+    'workers': 2,
+    'variants': None,
+    'min_confidence': 0.6
+}
+
+# 验证码缓存：按原图感知哈希记住答案及服务器是否接受，命中已接受的答案时跳过识别；
+# record 为 True 时被接受的验证码存入 captchaRecord/ 作为标注语料
+captcha_cache = {
+    'enabled': True,
+    'capacity': 2048,
+    'max_distance': 12,
+    'record': True
+}
+
+# HTTP 引擎 (orchestrator.py) 用同一账号同时进行的预约数上限，过高可能被平台限流；
+# jobs.yaml 中的 max_concurrency 优先于这里的设置
+http_engine = {
+    'max_concurrency': 3
+}
+
+# 浏览器配置：profile 为 'default'（有界面）或 'lean'（无界面、不加载图片字体），
+# profile_dir 为持久化 Firefox 配置目录（复用缓存），None 表示每次使用临时目录
+browser_options = {
+    'profile': 'default',
+    'profile_dir': None
+}
+
+# auto_booking.py 守护进程的浏览器池：启动时预先打开 size 个浏览器供预约任务借用，
+# 每个浏览器使用 max_uses 次或进程树内存超过 max_rss_mb 后关闭并在后台换新
+browser_pool = {
+    'enabled': True,
+    'size': 1,
+    'max_uses': 20,
+    'max_rss_mb': 1500
+}
@@ -0,0 +1,29 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def session_from_driver(driver, pool_size=4):
+    """
+    构造与 WebDriver 共享 cookie 和 User-Agent 的 requests.Session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    try:
+        session.headers['User-Agent'] = driver.execute_script('return navigator.userAgent')
+    except Exception:
+        pass
+    sync_cookies(driver, session)
+    return session
+
+
+def sync_cookies(driver, session):
+    """
+    把浏览器当前域名下的 cookie 同步到 session
+    """
+    for cookie in driver.get_cookies():
+        session.cookies.set(
+            cookie['name'], cookie['value'],
+            domain=cookie.get('domain'), path=cookie.get('path', '/')
+        )
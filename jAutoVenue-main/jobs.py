@@ -0,0 +1,212 @@
+import os
+import datetime
+import logging
+import yaml
+from venue_index import get_venue_index
+from preferences import Preference, describe
+
+currentPath = os.path.dirname(os.path.abspath(__file__))
+jobsPath = os.path.join(currentPath, 'jobs.yaml')
+
+WEEKDAYS = {
+    'mon': 0, 'tue': 1, 'wed': 2, 'thu': 3, 'fri': 4, 'sat': 5, 'sun': 6,
+    '周一': 0, '周二': 1, '周三': 2, '周四': 3, '周五': 4, '周六': 5, '周日': 6,
+}
+FIRST_HOUR = 7
+LAST_HOUR = 21
+
+
+class JobConfigError(ValueError):
+    pass
+
+
+def _weekday(value, where):
+    if isinstance(value, int) and 1 <= value <= 7:
+        return value - 1
+    if isinstance(value, str) and value.strip().lower() in WEEKDAYS:
+        return WEEKDAYS[value.strip().lower()]
+    raise JobConfigError(f"{where}: 无法识别的星期 {value!r}，可用 1-7、mon-sun 或 周一-周日")
+
+
+def _hours(value, where):
+    hours = value if isinstance(value, list) else [value]
+    for hour in hours:
+        if not isinstance(hour, int) or not FIRST_HOUR <= hour <= LAST_HOUR:
+            raise JobConfigError(f"{where}: 开始时间应为 {FIRST_HOUR}-{LAST_HOUR} 的整数，而不是 {hour!r}")
+    if not hours:
+        raise JobConfigError(f"{where}: 至少需要一个开始时间")
+    return hours
+
+
+def _retry(value, where):
+    if value is None:
+        value = {}
+    if not isinstance(value, dict):
+        raise JobConfigError(f"{where}: retry 应为映射")
+    maxAttempts, deadline = value.get('max_attempts', 10), value.get('deadline', 180)
+    if not isinstance(maxAttempts, int) or isinstance(maxAttempts, bool) or maxAttempts < 1:
+        raise JobConfigError(f"{where}: retry.max_attempts 应为正整数，而不是 {maxAttempts!r}")
+    if not isinstance(deadline, (int, float)) or isinstance(deadline, bool) or deadline <= 0:
+        raise JobConfigError(f"{where}: retry.deadline 应为正数（秒），而不是 {deadline!r}")
+    return {'max_attempts': maxAttempts, 'deadline': float(deadline)}
+
+
+def _target(entry, where):
+    if not isinstance(entry, dict):
+        raise JobConfigError(f"{where}: 应为映射")
+    venue, item = entry.get('venue'), entry.get('item')
+    venues = get_venue_index().venues
+    if venue not in venues:
+        raise JobConfigError(f"{where}: 未知场馆 {venue!r}，可选: {', '.join(venues)}")
+    if item not in venues[venue]['items']:
+        raise JobConfigError(f"{where}: {venue} 没有项目 {item!r}，可选: {', '.join(venues[venue]['items'])}")
+    court = entry.get('court')
+    if court is not None and (not isinstance(court, int) or court < 1):
+        raise JobConfigError(f"{where}: court 应为从 1 开始的场地序号")
+    return venue, item, _hours(entry.get('hours'), where), None if court is None else court - 1
+
+
+class Job(object):
+    """
+    一个预约任务：在目标日期前 lead_days 天的开放时刻，按偏好顺序预约
+    """
+    def __init__(self, name, weekdays, leadDays, preferences, retry, engine):
+        self.name = name
+        self.weekdays = weekdays
+        self.leadDays = leadDays
+        self.preferences = preferences
+        self.retry = retry
+        self.engine = engine
+
+    def runs_on(self, date):
+        """
+        date 这天开放的（即 date + leadDays）是否为需要预约的星期
+        """
+        return (date + datetime.timedelta(days=self.leadDays)).weekday() in self.weekdays
+
+    def next_fire(self, now, releaseTime):
+        """
+        now 之后第一个需要执行的开放时刻。已进入预热时间但尚未开放时仍返回今天的开放时刻，
+        由调用方用剩余的时间预热，而不是跳过这一次开放
+        """
+        release = datetime.datetime.combine(now.date(), releaseTime)
+        for _ in range(8):
+            if release > now and self.runs_on(release.date()):
+                return release
+            release += datetime.timedelta(days=1)
+        return None
+
+    def __repr__(self):
+        return f"Job({self.name}: {', '.join(describe(p) for p in self.preferences)})"
+
+
+class JobConfig(object):
+    def __init__(self, releaseTime, prestageMinutes, jobs, maxConcurrency=None):
+        self.releaseTime = releaseTime
+        self.prestageMinutes = prestageMinutes
+        self.jobs = jobs
+        # http 任务的并发上限，None 表示使用 config.http_engine
+        self.maxConcurrency = maxConcurrency
+
+    def schedule(self, now=None):
+        """
+        预先计算每个任务的下一次开放时刻，按时间排序返回 [(release, job)]
+        """
+        now = now or datetime.datetime.now()
+        fires = [(job.next_fire(now, self.releaseTime), job) for job in self.jobs]
+        return sorted(((release, job) for release, job in fires if release), key=lambda x: x[0])
+
+
+def parse_jobs(data):
+    if not isinstance(data, dict) or not isinstance(data.get('jobs'), list) or not data['jobs']:
+        raise JobConfigError("任务文件需要包含非空的 jobs 列表")
+    try:
+        releaseTime = datetime.datetime.strptime(str(data.get('release_time', '12:00')), '%H:%M').time()
+    except ValueError:
+        raise JobConfigError(f"release_time 格式应为 HH:MM，而不是 {data.get('release_time')!r}")
+    prestageMinutes = data.get('prestage_minutes', 0)
+    if not isinstance(prestageMinutes, int) or prestageMinutes < 0:
+        raise JobConfigError("prestage_minutes 应为非负整数")
+    maxConcurrency = data.get('max_concurrency')
+    if maxConcurrency is not None and (not isinstance(maxConcurrency, int) or isinstance(maxConcurrency, bool)
+                                       or maxConcurrency < 1):
+        raise JobConfigError("max_concurrency 应为正整数")
+
+    jobs, names = [], set()
+    for i, entry in enumerate(data['jobs']):
+        where = f"jobs[{i}]"
+        if not isinstance(entry, dict):
+            raise JobConfigError(f"{where}: 应为映射")
+        name = str(entry.get('name') or f"job{i + 1}")
+        where = f"jobs[{i}] ({name})"
+        if name in names:
+            raise JobConfigError(f"{where}: 任务名重复")
+        names.add(name)
+        if not isinstance(entry.get('weekdays') or [], list):
+            raise JobConfigError(f"{where}: weekdays 应为列表")
+        weekdays = sorted({_weekday(w, where) for w in entry.get('weekdays') or []})
+        if not weekdays:
+            raise JobConfigError(f"{where}: weekdays 不能为空")
+        leadDays = entry.get('lead_days', 7)
+        if not isinstance(leadDays, int) or not 0 <= leadDays <= 7:
+            raise JobConfigError(f"{where}: lead_days 应为 0-7 的整数")
+
+        # 主目标的各个时间在前，fallbacks 中的其他场馆/项目依次在后
+        preferences = []
+        fallbacks = entry.get('fallbacks') or []
+        if not isinstance(fallbacks, list):
+            raise JobConfigError(f"{where}: fallbacks 应为列表")
+        for j, target in enumerate([entry] + fallbacks):
+            venue, item, hours, court = _target(target, where if j == 0 else f"{where}.fallbacks[{j - 1}]")
+            preferences.extend(Preference(venue, item, hour, court) for hour in hours)
+
+        retry = _retry(entry.get('retry'), where)
+        engine = entry.get('engine', data.get('engine', 'browser'))
+        if engine not in ('browser', 'http'):
+            raise JobConfigError(f"{where}: engine 应为 browser 或 http")
+        jobs.append(Job(name, weekdays, leadDays, preferences, retry, engine))
+    return JobConfig(releaseTime, prestageMinutes, jobs, maxConcurrency)
+
+
+def load_jobs(path=jobsPath):
+    with open(path, encoding='utf-8') as f:
+        try:
+            data = yaml.safe_load(f)
+        except yaml.YAMLError as e:
+            raise JobConfigError(f"{path}: YAML 格式错误: {e}")
+    return parse_jobs(data)
+
+
+class JobFile(object):
+    """
+    任务文件只在修改时间变化时重新加载；新文件校验失败时保留上一份有效配置
+    """
+    def __init__(self, path=jobsPath):
+        self.path = path
+        self.mtime = None
+        self.config = None
+
+    def changed(self):
+        try:
+            return os.stat(self.path).st_mtime_ns != self.mtime
+        except OSError:
+            return False
+
+    def get(self):
+        if self.config is None or self.changed():
+            mtime = os.stat(self.path).st_mtime_ns
+            try:
+                config = load_jobs(self.path)
+            except JobConfigError as e:
+                if self.config is None:
+                    raise
+                msg = f"任务文件有误，继续使用上一份配置: {e}"
+                logging.error(msg)
+                print(msg)
+            else:
+                if self.config is not None:
+                    logging.info("Job file reloaded")
+                    print("任务文件已重新加载")
+                self.config = config
+            self.mtime = mtime
+        return self.config
@@ -0,0 +1,441 @@
+import io
+import sys
+import json
+import time
+import uuid
+import random
+import string
+import datetime
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from SJTUVenueTabLists import venueTabLists
+
+SESSION_COOKIE = 'JSESSIONID'
+SESSION_VALUE = 'mock-session'
+FIRST_HOUR = 7
+LAST_HOUR = 21
+JACCOUNT_PATH = '/jaccount'
+CAPTCHA_CHARS = string.ascii_lowercase
+
+HOME_TITLE = '上海交通大学体育场馆预约平台'
+
+# 与真实平台相同的元素结构（class / id），供 sport.py 的选择器在本地回放
+HOME_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>.seat {{display: inline-block; width: 24px; height: 16px; margin: 1px; border: 1px solid #ccc}}
+.sold-seat {{background: #ccc}} .selected-seat {{background: #409eff}}
+.el-checkbox__inner {{display: inline-block; width: 14px; height: 14px; border: 1px solid #999}}
+.el-tabs__item {{display: inline-block; padding: 4px 8px; cursor: pointer}} .is-active {{color: #409eff}}</style></head>
+<body><div id="app">{body}</div>
+<script>
+async function api(path, body) {{
+  const r = await fetch(path, {{method: 'POST', headers: {{'Content-Type': 'application/json'}}, body: JSON.stringify(body)}});
+  return r.json();
+}}
+{script}
+</script></body></html>'''
+
+LOGIN_BUTTON = '<div id="logoin"><button class="el-button" onclick="location.href=\'{login}\'">登录</button></div>'
+
+SEARCH_BODY = '''<div class="search"><input class="el-input__inner" placeholder="搜索场馆">
+<button class="el-button el-button--default">搜索</button></div>
+<div id="results"></div>'''
+
+SEARCH_SCRIPT = '''
+document.querySelector('.el-button--default').onclick = async () => {
+  const name = document.querySelector('.el-input__inner').value;
+  const r = await api('/manage/venue/listOrderCount', {venueName: name});
+  const results = document.getElementById('results');
+  results.innerHTML = r.data.map(v =>
+    `<div class="el-card"><div class="el-card__body" data-id="${v.id}">${v.venueName}</div></div>`).join('');
+  results.querySelectorAll('.el-card__body').forEach(c => c.onclick = () => location.href = '/venue/' + c.dataset.id);
+};
+'''
+
+VENUE_BODY = '''<div class="el-tabs item-tabs">{tabs}</div>
+<div class="el-tabs date-tabs" style="display:none">{dates}</div>
+<div class="chart" style="display:none"></div>
+<div class="drawerStyle" style="display:none"><div class="butMoney"><button class="el-button is-round">立即预约</button></div></div>
+<div class="el-dialog notice" style="display:none"><div class="dialog-footer">
+  <div class="tk"><label class="el-checkbox"><span class="el-checkbox__input"><span class="el-checkbox__inner"></span></span>我已阅读</label></div>
+  <div><button class="el-button el-button--primary">确定</button></div></div></div>
+<div class="placeAnOrder" style="display:none"><div class="right"><button class="el-button el-button--primary">提交订单</button></div></div>
+<div class="el-message-box" aria-label="提示" style="display:none"><div class="dialog-footer"><button class="el-button el-button--primary">确定</button></div></div>
+<div class="result"></div>'''
+
+VENUE_SCRIPT = '''
+const courts = {courts}, firstHour = {first}, lastHour = {last};
+let motionId = null, date = null, selected = null;
+const $ = s => document.querySelector(s);
+const show = (s, on) => $(s).style.display = on ? '' : 'none';
+document.querySelectorAll('.item-tabs .el-tabs__item').forEach(t => t.onclick = () => {{
+  document.querySelectorAll('.item-tabs .el-tabs__item').forEach(o => o.classList.remove('is-active'));
+  t.classList.add('is-active');
+  motionId = t.id.slice(4);
+  show('.date-tabs', true);
+  if (date) loadChart();
+}});
+document.querySelectorAll('.date-tabs .el-tabs__item').forEach(t => t.onclick = () => {{
+  document.querySelectorAll('.date-tabs .el-tabs__item').forEach(o => o.classList.remove('is-active'));
+  date = t.id.slice(4);
+  loadChart().then(() => t.classList.add('is-active'));
+}});
+async function loadChart() {{
+  const r = await api('/manage/fieldDetail/queryFieldSituation', {{motionId, date}});
+  const rows = [];
+  for (let h = firstHour; h <= lastHour; h++) {{
+    const seats = r.data.filter(s => s.hour === h).sort((a, b) => a.court - b.court).map(s =>
+      `<div class="seat ${{s.status ? 'sold-seat' : 'unselected-seat'}}" data-court="${{s.court}}" data-hour="${{h}}"></div>`);
+    rows.push(`<div class="clearfix">${{seats.join('')}}</div>`);
+  }}
+  $('.chart').innerHTML = `<div class="inner-seat-wrapper">${{rows.join('')}}</div>`;
+  show('.chart', true);
+  selected = null;
+  show('.drawerStyle', false);
+  document.querySelectorAll('.chart .unselected-seat').forEach(s => s.onclick = () => {{
+    document.querySelectorAll('.chart .selected-seat').forEach(o => o.className = 'seat unselected-seat');
+    s.className = 'seat selected-seat';
+    selected = {{court: +s.dataset.court, hour: +s.dataset.hour}};
+    show('.drawerStyle', true);
+  }});
+}}
+$('.drawerStyle .is-round').onclick = () => show('.notice', true);
+$('.notice .el-checkbox__inner').onclick = () => $('.notice .el-checkbox').classList.toggle('is-checked');
+$('.notice .el-button--primary').onclick = () => {{
+  if (!$('.notice .el-checkbox').classList.contains('is-checked')) return;
+  show('.notice', false);
+  show('.placeAnOrder', true);
+}};
+$('.placeAnOrder .el-button--primary').onclick = () => show('[aria-label="提示"]', true);
+$('[aria-label="提示"] .el-button--primary').onclick = async () => {{
+  show('[aria-label="提示"]', false);
+  const r = await api('/venue/personal/ConfirmOrder', Object.assign({{motionId, date}}, selected));
+  $('.result').innerHTML = r.code === 0
+    ? `<div class="el-message el-message--success">预约成功 ${{r.data.orderId}}</div>`
+    : `<div class="el-message el-message--error">${{r.msg}}</div>`;
+}};
+'''
+
+LOGIN_PAGE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>上海交通大学统一身份认证</title></head>
+<body><form method="post" action="{path}/login">
+<input id="input-login-user" name="user"><input id="input-login-pass" name="pass" type="password">
+<img id="captcha-img" src="{path}/captcha?uuid={uuid}&t={t}"
+  onclick="this.src='{path}/captcha?uuid={uuid}&t=' + Date.now()">
+<input id="input-login-captcha" name="captcha"><input type="hidden" name="uuid" value="{uuid}">
+<button id="submit-password-button" type="submit">登录</button>
+{error}</form></body></html>'''
+
+
+class MockPlatform(object):
+    """
+    体育场馆预约平台的本地替身，用于离线测试 sport_api 与回放 sport.py 的浏览器流程
+
+    场馆与项目取自 venueTabLists，每个 (场馆, 项目, 日期) 有 courts 片场地，
+    每片场地在 7-21 点各有一个时段。taken_ratio 为初始被占比例，
+    contention 为每次查询后随机空位被他人抢走的概率，latency 为每个请求的额外延迟（秒）。
+    jaccount 登录页的验证码 captcha_strict 为 True 时必须识别正确，否则任意 4 位都算对，
+    captcha_fail_rate 为验证码被随机判错的概率，password 不为 None 时校验密码。
+    /notify/<sckey>.send 是 Server酱的替身，前 notify_failures 次请求返回 503。
+    clock_skew 为服务器时钟相对本地时钟的偏差（秒），体现在每个响应的 Date 头上。
+    """
+    def __init__(self, courts=4, taken_ratio=0.5, contention=0.0, latency=0.0, seed=0,
+                 captcha_strict=False, captcha_fail_rate=0.0, password=None, notify_failures=0,
+                 clock_skew=0.0):
+        self.courts = courts
+        self.taken_ratio = taken_ratio
+        self.contention = contention
+        self.latency = latency
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.venues = []
+        for i, (venue, items) in enumerate(venueTabLists.items()):
+            self.venues.append({
+                'id': f'venue-{i}',
+                'venueName': venue,
+                'motionTypes': [{'id': tab[len('tab-'):], 'name': item} for item, tab in items.items()],
+            })
+        self.seats = {}
+        self.orders = []
+        self.captcha_strict = captcha_strict
+        self.captcha_fail_rate = captcha_fail_rate
+        self.password = password
+        self.captchas = {}
+        self.logins = 0
+        self.notify_failures = notify_failures
+        self.notifications = []
+        self.clock_skew = clock_skew
+
+    def receive_notification(self, sckey, form):
+        with self.lock:
+            if self.notify_failures > 0:
+                self.notify_failures -= 1
+                return False
+            self.notifications.append(dict(form, sckey=sckey))
+            return True
+
+    def venue(self, venue_id):
+        for v in self.venues:
+            if v['id'] == venue_id:
+                return v
+        return None
+
+    def new_captcha(self, key):
+        with self.lock:
+            text = ''.join(self.random.choice(CAPTCHA_CHARS) for _ in range(4))
+            self.captchas[key] = text
+        return text
+
+    def check_login(self, key, password, answer):
+        """
+        返回 None 表示登录成功，否则为 auth-error 中显示的错误信息
+        """
+        with self.lock:
+            expected = self.captchas.pop(key, None)
+            fail = self.random.random() < self.captcha_fail_rate
+        if self.password is not None and password != self.password:
+            return '用户名或密码错误'
+        if len(answer) != 4 or fail or (self.captcha_strict and answer.lower() != expected):
+            return '验证码错误'
+        self.logins += 1
+        return None
+
+    def seat_table(self, motion_id, date):
+        key = (motion_id, date)
+        if key not in self.seats:
+            self.seats[key] = {
+                (court, hour): self.random.random() < self.taken_ratio
+                for court in range(self.courts) for hour in range(FIRST_HOUR, LAST_HOUR + 1)
+            }
+        return self.seats[key]
+
+    def list_seats(self, motion_id, date):
+        with self.lock:
+            table = self.seat_table(motion_id, date)
+            result = [{
+                'fieldId': f'{motion_id}-{court}',
+                'fieldName': f'场地{court + 1}',
+                'court': court,
+                'hour': hour,
+                'scheduleTime': f'{hour:02d}:00-{hour + 1:02d}:00',
+                'status': 1 if taken else 0,
+            } for (court, hour), taken in sorted(table.items())]
+            # 模拟他人抢占：查询之后部分空位被占用
+            for key, taken in table.items():
+                if not taken and self.random.random() < self.contention:
+                    table[key] = True
+            return result
+
+    def place_order(self, motion_id, date, court, hour):
+        with self.lock:
+            table = self.seat_table(motion_id, date)
+            if table.get((court, hour), True):
+                return None
+            table[(court, hour)] = True
+            order_id = f'order-{len(self.orders) + 1}'
+            self.orders.append({'orderId': order_id, 'motionId': motion_id, 'date': date, 'court': court, 'hour': hour})
+            return order_id
+
+
+def make_handler(platform):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # 响应头与响应体一次写出，避免 Nagle 与延迟 ACK 叠加出 40ms 的假延迟
+        wbufsize = -1
+
+        def log_message(self, *args):
+            pass
+
+        def date_time_string(self, timestamp=None):
+            if timestamp is None:
+                timestamp = time.time() + platform.clock_skew
+            return super().date_time_string(timestamp)
+
+        def reply(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send(status, body, 'application/json;charset=UTF-8')
+
+        def send(self, status, body, content_type, headers=()):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def html(self, page, headers=()):
+            self.send(200, page.encode('utf-8'), 'text/html;charset=UTF-8', headers)
+
+        def redirect(self, location, headers=()):
+            self.send(302, b'', 'text/plain', [('Location', location)] + list(headers))
+
+        def home_page(self):
+            if not self.authorized():
+                body = LOGIN_BUTTON.format(login=JACCOUNT_PATH + '/login')
+                return self.html(HOME_PAGE.format(title=HOME_TITLE, body=body, script=''))
+            self.html(HOME_PAGE.format(title=HOME_TITLE, body=SEARCH_BODY, script=SEARCH_SCRIPT))
+
+        def venue_page(self, venue_id):
+            venue = platform.venue(venue_id)
+            if venue is None or not self.authorized():
+                return self.redirect('/')
+            tabs = ''.join(f'<div class="el-tabs__item" id="tab-{m["id"]}">{m["name"]}</div>' for m in venue['motionTypes'])
+            today = datetime.date.today()
+            dates = ''.join(
+                f'<div class="el-tabs__item" id="tab-{today + datetime.timedelta(i)}">{today + datetime.timedelta(i)}</div>'
+                for i in range(8)
+            )
+            script = VENUE_SCRIPT.format(courts=platform.courts, first=FIRST_HOUR, last=LAST_HOUR)
+            self.html(HOME_PAGE.format(title=HOME_TITLE, body=VENUE_BODY.format(tabs=tabs, dates=dates), script=script))
+
+        def login_page(self, error=''):
+            key = uuid.uuid4().hex
+            error = f'<div class="auth-error">{error}</div>' if error else ''
+            self.html(LOGIN_PAGE.format(path=JACCOUNT_PATH, uuid=key, t=int(time.time() * 1000), error=error))
+
+        def captcha_image(self, query):
+            text = platform.new_captcha(query.get('uuid', [''])[0])
+            self.send(200, render_captcha(text), 'image/png')
+
+        def read_form(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+
+        def notification(self, path):
+            sckey = path[len('/notify/'):].rsplit('.send', 1)[0]
+            if not platform.receive_notification(sckey, self.read_form()):
+                return self.reply(503, {'code': 503, 'message': 'busy'})
+            self.reply(200, {'code': 0, 'message': '', 'data': {'pushid': str(len(platform.notifications))}})
+
+        def login_submit(self):
+            form = self.read_form()
+            error = platform.check_login(form.get('uuid', ''), form.get('pass', ''), form.get('captcha', ''))
+            if error:
+                return self.login_page(error)
+            self.redirect('/', [('Set-Cookie', f'{SESSION_COOKIE}={SESSION_VALUE}; Path=/')])
+
+        def authorized(self):
+            return f'{SESSION_COOKIE}={SESSION_VALUE}' in (self.headers.get('Cookie') or '')
+
+        def read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def do_GET(self):
+            if platform.latency:
+                time.sleep(platform.latency)
+            url = urlparse(self.path)
+            path = url.path
+            if path == '/system/user/currentUser':
+                if not self.authorized():
+                    return self.redirect(JACCOUNT_PATH + '/login')
+                return self.reply(200, {'code': 0, 'data': {'name': 'mock'}})
+            if path == '/':
+                return self.home_page()
+            if path.startswith('/venue/'):
+                return self.venue_page(path[len('/venue/'):])
+            if path == JACCOUNT_PATH + '/login':
+                return self.login_page()
+            if path == JACCOUNT_PATH + '/captcha':
+                return self.captcha_image(parse_qs(url.query))
+            self.reply(404, {'code': 404, 'msg': 'not found'})
+
+        def do_HEAD(self):
+            # release_clock.ClockSync 只读取 Date 头
+            self.send(200, b'', 'text/html;charset=UTF-8')
+
+        def do_POST(self):
+            if platform.latency:
+                time.sleep(platform.latency)
+            path = urlparse(self.path).path
+            if path == JACCOUNT_PATH + '/login':
+                return self.login_submit()
+            if path.startswith('/notify/'):
+                return self.notification(path)
+            if not self.authorized():
+                return self.reply(401, {'code': 401, 'msg': '未登录'})
+            body = self.read_json()
+            if path == '/manage/venue/listOrderCount':
+                name = body.get('venueName', '')
+                data = [{'id': v['id'], 'venueName': v['venueName']} for v in platform.venues if name in v['venueName']]
+                return self.reply(200, {'code': 0, 'data': data})
+            if path == '/manage/venue/queryVenueById':
+                venue = platform.venue(body.get('id'))
+                if venue is not None:
+                    return self.reply(200, {'code': 0, 'data': venue})
+                return self.reply(200, {'code': 404, 'msg': '场馆不存在'})
+            if path == '/manage/fieldDetail/queryFieldSituation':
+                data = platform.list_seats(body.get('motionId'), body.get('date'))
+                return self.reply(200, {'code': 0, 'data': data})
+            if path == '/venue/personal/ConfirmOrder':
+                order_id = platform.place_order(body.get('motionId'), body.get('date'), body.get('court'), body.get('hour'))
+                if order_id is None:
+                    return self.reply(200, {'code': 1, 'msg': '该时段已被预约'})
+                return self.reply(200, {'code': 0, 'data': {'orderId': order_id}})
+            self.reply(404, {'code': 404, 'msg': 'not found'})
+
+    return Handler
+
+
+def render_captcha(text):
+    """
+    生成与 jaccount 尺寸相近的验证码 PNG，带少量噪点
+    """
+    from PIL import Image, ImageDraw, ImageFont
+    image = Image.new('RGB', (110, 40), 'white')
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=28)
+    except TypeError:
+        font = ImageFont.load_default()
+    draw.text((12, 4), text, fill=(40, 40, 120), font=font)
+    noise = random.Random(text)
+    for _ in range(60):
+        draw.point((noise.randrange(110), noise.randrange(40)), fill=(120, 120, 120))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def start_mock_platform(port=0, **kwargs):
+    """
+    在后台线程启动替身服务器，返回 (server, platform, base_url)
+    """
+    platform = MockPlatform(**kwargs)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(platform))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, platform, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def mock_jaccount_host(base_url):
+    """
+    替身服务器上 jaccount 登录页的地址片段，对应 SJTUSport 的 jaccountHost 参数
+    """
+    return urlparse(base_url).netloc + JACCOUNT_PATH
+
+
+def mock_notify_url(base_url):
+    """
+    Server酱替身地址，对应 notify.Notifier 的 url 参数
+    """
+    return base_url + '/notify/{sckey}.send'
+
+
+def mock_cookies():
+    return [{'name': SESSION_COOKIE, 'value': SESSION_VALUE, 'path': '/'}]
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8000
+    server, platform, base_url = start_mock_platform(port)
+    print(f"替身服务器运行于 {base_url}，登录 cookie: {SESSION_COOKIE}={SESSION_VALUE}")
+    print(f"浏览器回放: SJTUSport(homeUrl='{base_url}', jaccountHost='{mock_jaccount_host(base_url)}', "
+          f"captchaCache=False, venueIndex='<临时目录>/venue_index.json')")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
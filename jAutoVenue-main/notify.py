@@ -0,0 +1,197 @@
+import os
+import json
+import atexit
+import time
+import queue
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+currentPath = os.path.dirname(os.path.abspath(__file__))
+outboxPath = os.path.join(currentPath, 'notify_outbox.jsonl')
+SERVERCHAN_URL = 'https://sctapi.ftqq.com/{sckey}.send'
+
+# 这些状态码说明服务暂时不可用，值得重试；其他错误（如密钥无效）重试也不会成功
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class Notifier(object):
+    """
+    后台发送 Server酱通知：send() 只把消息放进有界队列立即返回，由一个工作线程用连接池化的
+    session 发送，超时后按指数退避重试。重试耗尽、队列已满或退出时仍未发出的消息
+    追加写入 outbox (JSON Lines)，下次启动时优先补发。
+    """
+    def __init__(self, url=SERVERCHAN_URL, maxsize=64, timeout=5, retries=3, backoff=0.5, outbox=outboxPath):
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.outbox = outbox
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.sent = self.spilled = self.dropped = 0
+        self._spillLock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='notifier', daemon=True)
+            self._thread.start()
+            self.replay()
+        return self
+
+    def send(self, sckey, title, desp, short=None):
+        """
+        放入发送队列后立即返回，不会阻塞调用方
+        """
+        if not sckey:
+            print("未配置Server酱密钥，跳过通知发送")
+            return False
+        message = {'sckey': sckey, 'title': title, 'desp': desp, 'short': short, 'created': time.time()}
+        self.start()
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            print("通知队列已满，消息暂存到磁盘")
+            self.spill([message])
+        return True
+
+    def deliver(self, message):
+        """
+        发送一条消息：成功返回 True，值得重试返回 None，永久失败返回 False
+        """
+        data = {'title': message['title'], 'desp': message['desp'], 'short': message.get('short') or None, 'noip': 1}
+        try:
+            response = self.session.post(self.url.format(sckey=message['sckey']), data=data, timeout=self.timeout)
+        except requests.RequestException as e:
+            print(f"发送通知时出错: {str(e)}")
+            return None
+        if response.status_code in RETRY_STATUS:
+            print(f"通知发送失败: HTTP {response.status_code}，稍后重试")
+            return None
+        if response.status_code != 200:
+            print(f"通知发送失败: HTTP {response.status_code}")
+            return False
+        try:
+            result = response.json()
+        except ValueError:
+            result = {}
+        if result.get('code') == 0:
+            print("Server酱推送成功")
+            return True
+        print(f"Server酱推送失败: {result.get('message')}")
+        return False
+
+    def _run(self):
+        while True:
+            message = self.queue.get()
+            try:
+                for attempt in range(self.retries + 1):
+                    outcome = self.deliver(message)
+                    if outcome is not None or self._stopping:
+                        break
+                    if attempt < self.retries:
+                        time.sleep(random.uniform(0.5, 1.0) * self.backoff * 2 ** attempt)
+                if outcome:
+                    self.sent += 1
+                elif outcome is None:
+                    self.spill([message])
+                else:
+                    self.dropped += 1
+                    logging.error("Notification dropped: " + message['title'])
+            except Exception as e:
+                print(f"通知发送线程出错: {str(e)}")
+                self.spill([message])
+            finally:
+                self.queue.task_done()
+
+    def spill(self, messages):
+        if not messages or not self.outbox:
+            return
+        with self._spillLock:
+            try:
+                with open(self.outbox, 'a', encoding='utf-8') as f:
+                    for message in messages:
+                        f.write(json.dumps(message, ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.spilled += len(messages)
+            except OSError as e:
+                print(f"保存未发送的通知失败: {str(e)}")
+
+    def replay(self):
+        """
+        把 outbox 中上次未发出的消息重新放入队列，放不下的留在文件中
+        """
+        if not self.outbox or not os.path.exists(self.outbox):
+            return 0
+        with self._spillLock:
+            try:
+                with open(self.outbox, encoding='utf-8') as f:
+                    messages = [json.loads(line) for line in f if line.strip()]
+                os.remove(self.outbox)
+            except (OSError, ValueError) as e:
+                print(f"读取未发送的通知失败: {str(e)}")
+                return 0
+        left = []
+        for message in messages:
+            try:
+                self.queue.put_nowait(message)
+            except queue.Full:
+                left.append(message)
+        self.spill(left)
+        if messages:
+            print(f"补发 {len(messages) - len(left)} 条未发送的通知")
+        return len(messages) - len(left)
+
+    def flush(self, timeout=10):
+        """
+        等待队列中的消息发完，超时返回 False
+        """
+        end = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() > end:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=5):
+        """
+        尽量发完剩余消息，仍未发出的写入 outbox
+        """
+        if not self.flush(timeout):
+            self._stopping = True
+            left = []
+            while True:
+                try:
+                    left.append(self.queue.get_nowait())
+                    self.queue.task_done()
+                except queue.Empty:
+                    break
+            self.spill(left)
+        self.session.close()
+
+
+_notifier = None
+_lock = threading.Lock()
+
+
+def get_notifier():
+    """
+    进程内共享的通知器，首次调用时启动工作线程并补发上次未发出的消息
+    """
+    global _notifier
+    with _lock:
+        if _notifier is None:
+            _notifier = Notifier().start()
+            atexit.register(_notifier.close)
+    return _notifier
+
+
+def notify(sckey, title, desp, short=None):
+    return get_notifier().send(sckey, title, desp, short)
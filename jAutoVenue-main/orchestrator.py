@@ -0,0 +1,121 @@
+import sys
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+import config
+from config import account
+from preferences import parse_preference, describe
+from sport_api import SJTUSportAPI
+from retry import RetryController, NAVIGATE
+from notify import notify
+
+# 未在 config.http_engine 中配置时，同一账号同时进行的预约数上限
+DEFAULT_MAX_CONCURRENCY = 3
+
+BookingJob = namedtuple('BookingJob', ['name', 'deltaDays', 'preferences'])
+JobResult = namedtuple('JobResult', ['name', 'ok', 'latency', 'booked', 'error'])
+
+
+class Orchestrator(object):
+    """
+    用同一个已登录账号并发执行多个预约任务
+
+    只登录一次（必要时启动一次浏览器），之后每个任务在线程池中使用 HTTP 引擎下单，
+    各自带 cookie 副本与独立连接池；WebDriver 不是线程安全的，因此不使用并行标签页。
+    """
+    def __init__(self, jobs, concurrency=None, engineOptions=None, sckey=None, max_attempts=5, deadline=60):
+        self.jobs = list(jobs)
+        # concurrency 为 None 时使用 config.http_engine['max_concurrency']
+        if concurrency is None:
+            concurrency = getattr(config, 'http_engine', {}).get('max_concurrency', DEFAULT_MAX_CONCURRENCY)
+        self.concurrency = max(1, int(concurrency))
+        self.engineOptions = engineOptions or {}
+        self.sckey = account['sckey'] if sckey is None else sckey
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.cookies = None
+        self.lock = threading.Lock()
+
+    def engine(self, job):
+        first = job.preferences[0]
+        return SJTUSportAPI(deltaDays=job.deltaDays, venue=first.venue, venueItem=first.venueItem,
+                            startTime=first.startTime, sckey=self.sckey, preferences=job.preferences,
+                            cookies=self.cookies, **self.engineOptions)
+
+    def login(self):
+        """
+        登录一次并保存 cookie 供所有任务共享
+        """
+        if self.cookies is not None:
+            return 1
+        api = SJTUSportAPI(sckey=self.sckey, **self.engineOptions)
+        if api.login() != 1:
+            return 0
+        self.cookies = [{'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path}
+                        for c in api.session.cookies]
+        api.shutDown()
+        return 1
+
+    def runJob(self, job):
+        start = perf_counter()
+        controller = RetryController(lambda: self.engine(job), sport=self.engine(job), level=NAVIGATE,
+                                     max_attempts=self.max_attempts, deadline=self.deadline)
+        try:
+            ok = controller.run() == 1
+            booked = None
+            if ok:
+                s = controller.sport
+                booked = f"{s.venue}-{s.venueItem} {s.startTime}:00 {s.targetDate.strftime('%Y-%m-%d')}"
+            error = None if ok else str(controller.history[-1][2] if controller.history else 'unknown')
+        except Exception as e:
+            ok, booked, error = False, None, str(e)
+        finally:
+            controller.shutDown()
+        if not ok:
+            notify(self.sckey, f"{job.name} 预约失败", f"- 偏好：{', '.join(describe(p) for p in job.preferences)}\n- 原因：{error}")
+        result = JobResult(job.name, ok, perf_counter() - start, booked, error)
+        with self.lock:
+            logging.info(f"Job {job.name}: {'ok' if ok else 'failed'} in {result.latency * 1000:.0f}ms {booked or error}")
+        return result
+
+    def run(self):
+        """
+        并发执行所有任务，按任务顺序返回 JobResult 列表
+        """
+        if self.login() != 1:
+            return [JobResult(job.name, False, 0.0, None, '登录失败') for job in self.jobs]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return list(pool.map(self.runJob, self.jobs))
+
+
+def report(results, wall):
+    for r in results:
+        status = '成功' if r.ok else '失败'
+        print(f"{r.name}: {status} {r.latency * 1000:.0f}ms {r.booked or r.error}")
+    print(f"共 {len(results)} 个任务，成功 {sum(r.ok for r in results)} 个，总耗时 {wall * 1000:.0f}ms")
+
+
+def parse_job(text, index=0):
+    """
+    解析 '天数@场馆/项目/小时[/场地],场馆/项目/小时...'
+    """
+    days, prefs = text.split('@', 1)
+    preferences = [parse_preference(p) for p in prefs.split(',')]
+    return BookingJob(f"job{index + 1}:{describe(preferences[0])}", int(days), preferences)
+
+
+def main(argv):
+    if not argv or argv[0] in ('-h', '--help'):
+        print("orchestrator.py <天数@场馆/项目/小时[/场地],备选...> [更多任务...]")
+        print("例: orchestrator.py 7@学生服务中心/台球/17,学生服务中心/台球/18 6@气膜体育中心/羽毛球/19")
+        sys.exit()
+    jobs = [parse_job(text, i) for i, text in enumerate(argv)]
+    start = perf_counter()
+    results = Orchestrator(jobs).run()
+    report(results, perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,39 @@
+from collections import namedtuple
+
+# 按优先级排列的预约偏好，court 为 None 表示该时段任意场地
+Preference = namedtuple('Preference', ['venue', 'venueItem', 'startTime', 'court'])
+Preference.__new__.__defaults__ = (None,)
+
+
+def describe(pref):
+    court = '' if pref.court is None else f" 场地{pref.court + 1}"
+    return f"{pref.venue}-{pref.venueItem} {pref.startTime}:00{court}"
+
+
+def parse_preference(text):
+    """
+    解析 '场馆/项目/开始小时[/场地序号]'，场地序号从 1 开始
+    """
+    parts = text.split('/')
+    if len(parts) not in (3, 4):
+        raise ValueError("偏好格式应为 场馆/项目/开始小时[/场地序号]: " + text)
+    court = int(parts[3]) - 1 if len(parts) == 4 else None
+    return Preference(parts[0], parts[1], int(parts[2]), court)
+
+
+def pages(preferences):
+    """
+    偏好涉及的 (场馆, 项目) 页面，保持首次出现的顺序
+    """
+    seen = []
+    for pref in preferences:
+        if (pref.venue, pref.venueItem) not in seen:
+            seen.append((pref.venue, pref.venueItem))
+    return seen
+
+
+def is_free(pref, freeCourts):
+    """
+    freeCourts 为该时段空闲场地序号列表
+    """
+    return bool(freeCourts) if pref.court is None else pref.court in freeCourts
@@ -0,0 +1,142 @@
+import math
+import time
+from time import sleep
+from email.utils import parsedate_to_datetime
+
+
+def now():
+    return time.time()
+
+
+def wait_until(target, keepalive=None, keepalive_interval=240, spin_margin=0.05, max_sleep=30):
+    """
+    等待到 Unix 时间戳 target：先粗粒度 sleep，最后 spin_margin 秒内忙等
+
+    keepalive 不为 None 时，在粗等待阶段每隔 keepalive_interval 秒调用一次，
+    但距目标不足 keepalive_interval 时不再调用，避免开放前一刻刷新页面。
+    """
+    last_keepalive = now()
+    while True:
+        remaining = target - now()
+        if remaining <= spin_margin:
+            break
+        if keepalive and now() - last_keepalive >= keepalive_interval and remaining > keepalive_interval:
+            keepalive()
+            last_keepalive = now()
+            continue
+        sleep(min(remaining - spin_margin, max_sleep))
+    while now() < target:
+        pass
+
+
+class ClockSync(object):
+    """
+    根据 HTTP Date 头估计服务器与本地时钟的偏差（服务器时间 = 本地时间 + offset）
+
+    Date 头只有秒级精度，因此每个样本给出一个区间约束：
+    date - t1 <= offset < date + 1 - t0（t0/t1 为请求发出与收到响应的本地时间）。
+    取所有样本区间的交集，交集宽度即估计误差上界。
+    """
+    def __init__(self, url='https://sports.sjtu.edu.cn', samples=8, timeout=3, session=None):
+        self.url = url
+        self.samples = samples
+        self.timeout = timeout
+        self.session = session
+        self.offset = 0.0
+        self.uncertainty = None
+        self.rtt = None
+
+    def _session(self):
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        return self.session
+
+    def sample(self):
+        t0 = now()
+        response = self._session().head(self.url, timeout=self.timeout, allow_redirects=False)
+        t1 = now()
+        date = parsedate_to_datetime(response.headers['Date']).timestamp()
+        return t0, t1, date
+
+    @staticmethod
+    def _bounds(records):
+        lo = max(date - t1 for t0, t1, date in records)
+        hi = min(date + 1 - t0 for t0, t1, date in records)
+        return lo, hi
+
+    def sync(self):
+        """
+        采样并更新 offset，返回 (offset, uncertainty, 中位 rtt)
+
+        第一个样本之后，每次都把请求安排在当前估计下服务器整秒跳变的时刻到达，
+        使每个新样本把区间缩小约一半，最终误差接近 rtt / 2。
+        """
+        records = []
+        for i in range(self.samples):
+            if records:
+                lo, hi = self._bounds(records)
+                if lo > hi:
+                    break
+                rtts = sorted(t1 - t0 for t0, t1, date in records)
+                half_rtt = rtts[len(rtts) // 2] / 2
+                mid = (lo + hi) / 2
+                send_at = math.ceil(now() + half_rtt + mid + 0.05) - mid - half_rtt
+                sleep(max(0.0, send_at - now()))
+            try:
+                records.append(self.sample())
+            except Exception as e:
+                print(f"时钟采样失败: {str(e)}")
+        if not records:
+            raise RuntimeError("无法从服务器获取时间")
+
+        lo, hi = self._bounds(records)
+        if lo <= hi:
+            self.offset = (lo + hi) / 2
+            self.uncertainty = (hi - lo) / 2
+        else:
+            # 区间不相交（服务器时钟跳变或取整方式不同），退回各样本中点估计的中位数
+            estimates = sorted(date + 0.5 - (t0 + t1) / 2 for t0, t1, date in records)
+            self.offset = estimates[len(estimates) // 2]
+            self.uncertainty = 0.5
+        rtts = sorted(t1 - t0 for t0, t1, date in records)
+        self.rtt = rtts[len(rtts) // 2]
+        return self.offset, self.uncertainty, self.rtt
+
+
+class ReleaseScheduler(object):
+    """
+    以服务器时间为准在目标时刻触发动作，并记录偏差与触发抖动
+
+    metrics 包含 offset / uncertainty / rtt（秒）与每次触发的 jitter（实际触发 - 目标，秒）。
+    """
+    def __init__(self, clock=None):
+        self.clock = clock or ClockSync()
+        self.metrics = {'offset': 0.0, 'uncertainty': None, 'rtt': None, 'jitter': []}
+
+    def sync(self):
+        try:
+            offset, uncertainty, rtt = self.clock.sync()
+            self.metrics.update(offset=offset, uncertainty=uncertainty, rtt=rtt)
+            print(f"服务器时钟偏差: {offset * 1000:+.1f}ms (±{uncertainty * 1000:.1f}ms, rtt {rtt * 1000:.1f}ms)")
+        except Exception as e:
+            print(f"时钟同步失败，使用本地时间: {str(e)}")
+        return self.metrics['offset']
+
+    def server_now(self):
+        return now() + self.metrics['offset']
+
+    def wait_until(self, target, **kwargs):
+        """
+        target 为服务器时间的 Unix 时间戳，返回本次触发抖动
+        """
+        wait_until(target - self.metrics['offset'], **kwargs)
+        jitter = self.server_now() - target
+        self.metrics['jitter'].append(jitter)
+        return jitter
+
+    def fire(self, target, action, **kwargs):
+        jitter = self.wait_until(target, **kwargs)
+        result = action()
+        print(f"触发抖动: {jitter * 1000:.3f}ms")
+        return result
@@ -0,0 +1,169 @@
+import random
+import logging
+from time import sleep, monotonic
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException,
+                                        StaleElementReferenceException, WebDriverException)
+
+# 失败类型
+SEAT_TAKEN = 'seat taken'
+DOM_TIMEOUT = 'dom timeout'
+SESSION_EXPIRED = 'session expired'
+CAPTCHA_EXHAUSTED = 'captcha exhausted'
+BAD_CREDENTIALS = 'bad credentials'
+BROWSER_DEAD = 'browser dead'
+UNKNOWN = 'unknown'
+
+# 恢复层级，数值越大代价越高
+CHART, NAVIGATE, LOGIN, RESTART = range(4)
+LEVEL_NAMES = {CHART: '重新读取座位表', NAVIGATE: '重新进入场馆页面', LOGIN: '重新登录', RESTART: '重启浏览器'}
+
+# 每类失败的 (起始恢复层级, 最高升级层级)；没有空位不是故障，最多重新进入场馆页面
+RECOVERY = {
+    SEAT_TAKEN: (CHART, NAVIGATE),
+    DOM_TIMEOUT: (NAVIGATE, RESTART),
+    SESSION_EXPIRED: (LOGIN, RESTART),
+    CAPTCHA_EXHAUSTED: (LOGIN, RESTART),
+    BROWSER_DEAD: (RESTART, RESTART),
+    UNKNOWN: (NAVIGATE, RESTART),
+}
+
+DEAD_BROWSER_MESSAGES = ('invalid session id', 'disconnected', 'without establishing a connection',
+                         'Failed to establish', 'Connection refused', 'Browsing context has been discarded')
+
+
+class LoginFailed(Exception):
+    def __init__(self, reason):
+        super().__init__("登录失败: " + str(reason))
+        self.reason = reason
+
+
+def classify(error, sport=None):
+    """
+    把异常归为上面的失败类型之一
+    """
+    if isinstance(error, LoginFailed):
+        return BAD_CREDENTIALS if error.reason == 'credentials' else CAPTCHA_EXHAUSTED
+    if isinstance(error, AssertionError):
+        return SEAT_TAKEN
+    if isinstance(error, WebDriverException) and not isinstance(
+            error, (TimeoutException, NoSuchElementException, StaleElementReferenceException)):
+        if any(m in str(error) for m in DEAD_BROWSER_MESSAGES):
+            return BROWSER_DEAD
+    if sport is not None and getattr(sport, 'driver', None) is not None:
+        try:
+            url = sport.driver.current_url
+        except Exception:
+            return BROWSER_DEAD
+        if getattr(sport, 'jaccountHost', 'jaccount.sjtu.edu.cn') in url:
+            return SESSION_EXPIRED
+    if '登录会话已失效' in str(error):
+        return SESSION_EXPIRED
+    if isinstance(error, (TimeoutException, NoSuchElementException, StaleElementReferenceException)):
+        return DOM_TIMEOUT
+    return UNKNOWN
+
+
+def backoff(failures, base=0.2, cap=1.0):
+    """
+    全抖动指数退避，始终在 1 秒以内
+    """
+    return random.uniform(0, min(cap, base * 2 ** failures))
+
+
+class RetryController(object):
+    """
+    失败后在代价最低的层级恢复，而不是每次都重启浏览器重新登录
+
+    层级从低到高：重新读取座位表 -> 重新进入场馆页面 -> 重新登录 -> 重启浏览器。
+    同类失败每连续出现 escalate_after 次升一级；账号密码错误不重试。
+    factory() 返回新的 SJTUSport（或接口相同的 SJTUSportAPI）；传入 sport 时从 level 层级开始复用它。
+    """
+    def __init__(self, factory, sport=None, level=RESTART, max_attempts=10, deadline=180, escalate_after=2):
+        self.factory = factory
+        self.sport = sport
+        self.level = level if sport is not None else RESTART
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.escalate_after = escalate_after
+        self.history = []
+
+    def _login(self):
+        if self.sport.login() != 1:
+            raise LoginFailed(getattr(self.sport, 'loginFailure', None) or 'other')
+
+    def _navigate(self, fresh):
+        first = self.sport.preferences[0]
+        self.sport.venue, self.sport.venueItem = first.venue, first.venueItem
+        if hasattr(self.sport, 'driver'):
+            # 直接重新打开场馆页面；刚登录时页面本来就是新的
+            self.sport.page = None
+            self.sport.searchAndEnterVenue(reload=not fresh)
+        else:
+            self.sport.searchAndEnterVenue()
+        self.sport.chooseVenueItemTab()
+        self.sport.chooseDateTab()
+
+    def _attempt(self, level):
+        fresh = False
+        if level >= RESTART:
+            if self.sport is not None:
+                # 浏览器来自浏览器池时不归还，由池关闭并换新
+                self.shutDown(discard=True)
+            self.sport = self.factory()
+            fresh = True
+        if level >= LOGIN:
+            self._login()
+            fresh = True
+        if level >= NAVIGATE:
+            self._navigate(fresh)
+        elif hasattr(self.sport, 'refreshSeatChart'):
+            self.sport.refreshSeatChart()
+        else:
+            self.sport.chooseDateTab()
+        self.sport.chooseStartTime()
+        self.sport.submitOrder()
+
+    def run(self):
+        """
+        成功返回 1，放弃返回 0；调用方负责最后的 shutDown()
+        """
+        start = monotonic()
+        level = self.level
+        streak = 0
+        previous = None
+        for attempt in range(self.max_attempts):
+            # factory() 失败（页面加载超时、借不到浏览器）后没有可复用的会话，只能从头开始
+            if self.sport is None:
+                level = RESTART
+            print(f"第 {attempt + 1} 次尝试（{LEVEL_NAMES[level]}）")
+            try:
+                self._attempt(level)
+                self.history.append((attempt + 1, level, None))
+                return 1
+            except Exception as e:
+                kind = classify(e, self.sport)
+                self.history.append((attempt + 1, level, kind))
+                msg = f"第 {attempt + 1} 次尝试失败 [{kind}]: {str(e).strip()[:200]}"
+                logging.error(msg)
+                print(msg)
+                if kind == BAD_CREDENTIALS:
+                    return 0
+                # 同类失败每连续出现 escalate_after 次，恢复层级升一级
+                streak = streak + 1 if kind == previous else 1
+                previous = kind
+                base, cap = RECOVERY[kind]
+                level = min(cap, base + (streak - 1) // self.escalate_after)
+            if monotonic() - start > self.deadline:
+                print("已超过重试时限，放弃预约")
+                return 0
+            sleep(backoff(attempt))
+        print("已达到最大重试次数，预约失败")
+        return 0
+
+    def shutDown(self, discard=False):
+        if self.sport is not None:
+            try:
+                self.sport.shutDown(discard)
+            except Exception as e:
+                print(f"关闭浏览器出错: {str(e)}")
+            self.sport = None
@@ -0,0 +1,82 @@
+FIRST_HOUR = 7
+
+FREE = 'free'
+TAKEN = 'taken'
+SELECTED = 'selected'
+
+# 一次 execute_script 读出整张座位表，并在同一次调用中按优先级点击第一个有空位的选项。
+# choices 为按优先级排列的 [行, 场地]，场地为 -1 表示该时段任意空位。
+# 每行是一个时段（第 0 行为 7 点），行内每个座位是一片场地。
+SEATMAP_JS = """
+const choices = arguments[0] || [];
+const chart = document.querySelector('.chart');
+if (!chart) return null;
+const isSeat = el => typeof el.className === 'string' && el.className.indexOf('seat') >= 0;
+const rows = chart.querySelectorAll('.inner-seat-wrapper .clearfix');
+const grid = [], elements = [];
+rows.forEach(row => {
+    const seats = Array.from(row.querySelectorAll('*')).filter(
+        el => isSeat(el) && !(el.parentElement && el.parentElement !== row && isSeat(el.parentElement)));
+    elements.push(seats);
+    grid.push(seats.map(el => {
+        const cls = el.classList;
+        return cls.contains('unselected-seat') ? 'free' : (cls.contains('selected-seat') ? 'selected' : 'taken');
+    }));
+});
+for (let i = 0; i < choices.length; i++) {
+    const [r, court] = choices[i];
+    const states = grid[r] || [];
+    const c = court < 0 ? states.indexOf('free') : (states[court] === 'free' ? court : -1);
+    if (c >= 0) {
+        elements[r][c].click();
+        return {grid: grid, choice: i, clicked: c};
+    }
+}
+return {grid: grid, choice: null, clicked: null};
+"""
+
+
+class SeatMap(object):
+    """
+    座位表快照：grid[时段][场地] 为 'free' / 'taken' / 'selected'
+    """
+    def __init__(self, grid, clicked=None, clickedHour=None, choice=None):
+        self.grid = grid
+        self.clicked = clicked
+        self.clickedHour = clickedHour
+        # 被点击的是 choices 中的第几项
+        self.choice = choice
+
+    @classmethod
+    def read(cls, driver, choices=()):
+        """
+        读取座位表；choices 为按优先级排列的 (hour, court)，court 为 None 表示任意场地，
+        在同一次脚本调用中点击其中第一个有空位的选项
+        """
+        choices = list(choices)
+        result = driver.execute_script(SEATMAP_JS, [[hour - FIRST_HOUR, -1 if court is None else court]
+                                                    for hour, court in choices])
+        if result is None:
+            raise LookupError("页面上没有座位表")
+        choice = result.get('choice')
+        if choice is None:
+            return cls(result['grid'])
+        return cls(result['grid'], result['clicked'], choices[choice][0], choice)
+
+    def hours(self):
+        return [FIRST_HOUR + i for i in range(len(self.grid))]
+
+    def state(self, hour, court):
+        return self.grid[hour - FIRST_HOUR][court]
+
+    def free_courts(self, hour):
+        row = hour - FIRST_HOUR
+        if not 0 <= row < len(self.grid):
+            return []
+        return [c for c, state in enumerate(self.grid[row]) if state == FREE]
+
+    def free_slots(self):
+        return [(hour, c) for hour in self.hours() for c in self.free_courts(hour)]
+
+    def __repr__(self):
+        return f"SeatMap({len(self.free_slots())} free of {sum(len(r) for r in self.grid)})"
@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+from config import account
+
+currentPath = os.path.dirname(os.path.abspath(__file__))
+sessionPath = os.path.join(currentPath, 'session.bin')
+
+MAGIC = b'SJS1'
+SALT_SIZE = 16
+KDF_ITERATIONS = 100000
+DEFAULT_BASE_URL = 'https://sports.sjtu.edu.cn'
+# 需要登录才能访问的轻量接口，未登录时会被重定向到 jaccount
+VALIDATE_PATH = '/system/user/currentUser'
+
+
+class SessionStore(object):
+    """
+    登录后的 cookie 加密保存在 config.py 旁边，下次运行直接注入浏览器以跳过 jaccount 登录
+
+    密钥由 jaccount 用户名与密码经 PBKDF2 派生，文件格式为 MAGIC + salt + Fernet token。
+    修改密码或文件损坏时解密失败，按无缓存处理。baseUrl 为引擎所用的平台地址，在它上面验证 cookie。
+    """
+    def __init__(self, path=sessionPath, username=None, password=None, baseUrl=DEFAULT_BASE_URL):
+        self.path = path
+        self.username = account['username'] if username is None else username
+        self.password = account['password'] if password is None else password
+        self.validate_url = baseUrl.rstrip('/') + VALIDATE_PATH
+
+    def _fernet(self, salt):
+        from cryptography.fernet import Fernet
+        secret = (self.username + '\0' + self.password).encode('utf-8')
+        key = hashlib.pbkdf2_hmac('sha256', secret, salt, KDF_ITERATIONS)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def save(self, driver):
+        try:
+            salt = os.urandom(SALT_SIZE)
+            payload = json.dumps({'saved_at': time.time(), 'cookies': driver.get_cookies()}).encode('utf-8')
+            token = self._fernet(salt).encrypt(payload)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(MAGIC + salt + token)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, self.path)
+            print("已保存登录会话")
+        except ImportError:
+            print("未安装 cryptography，跳过会话保存")
+        except Exception as e:
+            print(f"保存登录会话失败: {str(e)}")
+
+    def load(self):
+        """
+        返回未过期的 cookie 列表，无缓存或解密失败时返回 None
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+            if not data.startswith(MAGIC):
+                return None
+            salt = data[len(MAGIC):len(MAGIC) + SALT_SIZE]
+            payload = json.loads(self._fernet(salt).decrypt(data[len(MAGIC) + SALT_SIZE:]))
+        except ImportError:
+            print("未安装 cryptography，跳过会话恢复")
+            return None
+        except Exception as e:
+            print(f"读取登录会话失败: {str(e) or type(e).__name__}")
+            return None
+        now = time.time()
+        return [c for c in payload['cookies'] if c.get('expiry') is None or c['expiry'] > now]
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def validate(self, cookies):
+        """
+        用保存的 cookie 直接请求需要登录的接口，200 且未被重定向视为有效
+        """
+        import requests
+        session = requests.Session()
+        for c in cookies:
+            session.cookies.set(c['name'], c['value'], domain=c.get('domain', ''), path=c.get('path', '/'))
+        try:
+            response = session.get(self.validate_url, timeout=3, allow_redirects=False)
+        except Exception as e:
+            print(f"验证登录会话失败: {str(e)}")
+            return False
+        return response.status_code == 200
+
+    def restore(self, driver):
+        """
+        验证并把 cookie 注入当前页面所在域名，成功返回 True
+        """
+        cookies = self.load()
+        if not cookies:
+            return False
+        if not self.validate(cookies):
+            print("保存的登录会话已失效")
+            self.clear()
+            return False
+        for c in cookies:
+            cookie = {k: c[k] for k in ('name', 'value', 'path', 'secure', 'httpOnly', 'expiry') if k in c}
+            try:
+                driver.add_cookie(cookie)
+            except Exception as e:
+                logging.warning(f"注入 cookie {c['name']} 失败: {str(e)}")
+        driver.refresh()
+        logging.info("Session restored from " + self.path)
+        return True
@@ -1,13 +1,5 @@
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import *
 from config import account
-from SJTUVenueTabLists import venueTabLists
-from PIL import Image, ImageEnhance, ImageFilter
-import requests
 import shutil
 import os
 import datetime
@@ -15,64 +7,69 @@ import logging
 import json
 import sys
 import getopt
-from io import BytesIO
-from time import sleep
-import ddddocr
+from tracing import Tracer, traced
+from session_store import SessionStore
+from seatmap import SeatMap
+from venue_index import get_venue_index, open_venue_index, discover, TABS_JS
+from preferences import Preference, describe, is_free
+# 浏览器（selenium.webdriver）、验证码识别（numpy / PIL）与通知（requests）相关的模块在用到的函数内导入，
+# import sport 与 sport.py -h 不加载它们
 
 captchaFileName = 'captcha.png'
 currentPath = os.path.dirname(os.path.abspath(__file__))
 captPath = os.path.join(currentPath, captchaFileName)
 captRecordPath = os.path.join(currentPath,'captchaRecord/')
 logfilePath = os.path.join(currentPath, "sport.log")
+defaultHomeUrl = 'https://sports.sjtu.edu.cn'
+defaultJaccountHost = 'jaccount.sjtu.edu.cn'
 
 
-def captcha_rec(captcha: Image):
+def captcha_rec(captcha, recognizer=None, preprocessor=None, batch=None, cache=None):
     """
     使用 ddddocr 进行本地验证码识别，添加图片预处理
+    captcha 可以是 PIL Image 或原始图片 bytes
+    给出 batch (BatchRecognizer) 时多候选识别，置信度不足返回 None，由调用方刷新验证码
+    给出 cache (CaptchaCache) 时先按感知哈希查找，服务器接受过的答案直接返回，
+    与被拒绝过的答案相同的识别结果返回 None
     """
+    from captcha import get_recognizer, get_preprocessor
+    from captcha_cache import ACCEPTED, REJECTED
     try:
+        known, state = cache.lookup(captcha) if cache is not None else (None, None)
+        if state == ACCEPTED:
+            print(f"验证码缓存命中: {known}")
+            return known
+
         print("正在识别验证码...")
         
-        # 图片预处理
-        # 1. 转换为灰度图
-        captcha = captcha.convert('L')
-        
-        # 2. 增加对比度
-        enhancer = ImageEnhance.Contrast(captcha)
-        captcha = enhancer.enhance(2.0)
-        
-        # 3. 二值化处理
-        threshold = 140
-        table = []
-        for i in range(256):
-            if i < threshold:
-                table.append(0)
-            else:
-                table.append(1)
-        captcha = captcha.point(table, '1')
-        
-        # 保存处理后的验证码图片用于调试
-        captcha.save('last_captcha_processed.png')
-        
-        # 初始化 ddddocr
-        ocr = ddddocr.DdddOcr(show_ad=False)
-        
-        # 将图片转换为字节
-        imgByteArr = BytesIO()
-        captcha.save(imgByteArr, format='png')
-        imgByteArr = imgByteArr.getvalue()
-        
-        # 识别验证码
-        result = ocr.classification(imgByteArr)
-        
-        if result and len(result) == 4:  # 验证码通常是4位
+        if batch is not None:
+            answer = batch.recognize(captcha)
+            if not answer.text or answer.confidence < batch.min_confidence:
+                print(f"验证码置信度不足: {answer.text} ({answer.confidence:.2f})，刷新重试")
+                return None
+            result = answer.text
+            print(f"验证码识别结果: {result} (置信度 {answer.confidence:.2f})")
+        else:
+            # 图片预处理：灰度、对比度增强、二值化，全部在内存中完成
+            processed = (preprocessor or get_preprocessor()).process(captcha)
+            
+            # 共享的 ddddocr 识别器，模型只在首次使用时加载
+            ocr = recognizer or get_recognizer()
+            
+            # 识别验证码
+            result = ocr.classification(processed)
+            
+            if not result or len(result) != 4:  # 验证码通常是4位
+                print(f"验证码识别结果异常: {result}")
+                return None
             # 确保结果只包含字母和数字
             result = ''.join(c for c in result if c.isalnum())
             print(f"验证码识别结果: {result}")
-            return result
-        else:
-            print(f"验证码识别结果异常: {result}")
+
+        if state == REJECTED and result == known:
+            print("该答案曾被服务器拒绝，刷新重试")
             return None
+        return result
             
     except Exception as e:
         print(f"验证码识别出错: {str(e)}")
@@ -80,22 +77,28 @@ def captcha_rec(captcha: Image):
 
 
 class SJTUSport(object):
-    def __init__(self, deltaDays=7, venue='学生服务中心', venueItem='健身房', startTime=17, sckey=None):
+    def __init__(self, deltaDays=7, venue='学生服务中心', venueItem='健身房', startTime=17, sckey=None, tracer=None, sessionStore=True, browserProfile=None, chartScreenshot=False, preferences=None, homeUrl=None, jaccountHost=None, browser=None, captchaCache=True, venueIndex=None):
+        from waits import Waiter
+        from browser import start_browser, browser_settings
+        from captcha import get_recognizer, get_batch_recognizer
+        from captcha_cache import get_captcha_cache
+        self.tracer = tracer or Tracer()
+        # 离线回放时指向本地替身服务器，见 mock_platform.py
+        self.homeUrl = homeUrl or defaultHomeUrl
+        self.jaccountHost = jaccountHost or defaultJaccountHost
+        # sessionStore 为 True 时使用默认位置的会话缓存（在 homeUrl 上验证），False 则每次都完整登录
+        self.sessionStore = SessionStore(baseUrl=self.homeUrl) if sessionStore is True else (sessionStore or None)
         print("初始化浏览器...")
-        self.options = Options()
-        # 调试时完全禁用 headless 模式
-        # self.options.headless = True
-        
-        # 设置窗口大小
-        self.options.add_argument("--window-size=1920,1080")
-        
-        # 初始化浏览器
-        self.driver = webdriver.Firefox(options=self.options)
-        self.wait = WebDriverWait(self.driver, 20)  # 20秒超时
+        # browser 为从 BrowserPool 借出的浏览器时直接使用，shutDown() 时归还而不关闭
+        self.browser = browser
+        if browser is not None:
+            self.driver, self.options = browser.driver, browser.options
+        else:
+            # browserProfile 为 None 时使用 config.browser_options，调试时可传 'default' 显示界面
+            with self.tracer.span('browser start', profile=browserProfile or browser_settings()[0]):
+                self.driver, self.options = start_browser(browserProfile)
+        self.waiter = Waiter(self.driver, 20)  # 20秒超时，记录每次等待耗时
         
-        # 访问网站
-        print("正在访问预约网站...")
-        self.driver.get('https://sports.sjtu.edu.cn')
         
         self.usr = account['username']
         self.psw = account['password']
@@ -104,56 +107,142 @@ class SJTUSport(object):
         self.venueItem = venueItem
         self.startTime = startTime
         self.sckey = sckey
+        self.recognizer = get_recognizer()
+        self.batchRecognizer = get_batch_recognizer()
+        # captchaCache 为 True 时使用 config.captcha_cache 的共享缓存，False 不使用，也可传入 CaptchaCache 实例
+        self.captchaCache = get_captcha_cache() if captchaCache is True else (captchaCache or None)
+        # 为 True 时选座前保存座位表截图 chart.png，仅用于调试
+        self.chartScreenshot = chartScreenshot
+        self.seatMap = None
+        # 按优先级排列的 Preference 列表，默认只有 (venue, venueItem, startTime) 一项
+        self.preferences = list(preferences) if preferences else [Preference(venue, venueItem, startTime)]
+        self.venue, self.venueItem, self.startTime = self.preferences[0][:3]
+        # 场馆与项目标签 id 的本地索引，过期时登录后在后台重建；替身站点上应传入临时路径，见 open_venue_index()
+        self.venueIndex = open_venue_index(venueIndex)
+        # 当前所在的 (场馆, 项目) 座位表页面
+        self.page = None
+        self.loginFailure = None
         
-        # 等待页面完全加载
+        # 访问网站并等待页面完全加载
         try:
-            self.wait.until(lambda driver: driver.title == '上海交通大学体育场馆预约平台')
+            print("正在访问预约网站...")
+            with self.tracer.span('page load'):
+                self.driver.get(self.homeUrl)
+                self.waiter.until(lambda driver: driver.title == '上海交通大学体育场馆预约平台', 'page load')
             print("页面加载完成")
-        except TimeoutException:
-            print("页面加载超时，请检查网络连接")
+        except Exception as e:
+            if isinstance(e, TimeoutException):
+                print("页面加载超时，请检查网络连接")
+            # 构造失败时调用方拿不到对象，在这里关闭或归还浏览器
+            self.shutDown(discard=True)
             raise
         logging.info("SJTUSport initialize successfully")
         print("SJTUSport initialize successfully")
 
+    @traced('login')
     def login(self):
+        """
+        优先恢复保存的登录会话，失效时再走完整的 jaccount 登录
+        """
+        # 借来的浏览器保留了上一次借用时的 cookie
+        if self.browser is not None and self.browser.uses > 1:
+            if self.loggedIn():
+                print("浏览器仍处于登录状态")
+                self.refreshVenueIndex()
+                return 1
+            print("浏览器中的登录状态已失效")
+        if self.sessionStore:
+            with self.tracer.span('session restore'):
+                restored = self.sessionStore.restore(self.driver)
+            if restored:
+                if self.loggedIn():
+                    print("已恢复登录会话")
+                    self.refreshVenueIndex()
+                    return 1
+                print("恢复的会话未生效，重新登录")
+        result = self.jaccountLogin()
+        if result == 1:
+            self.loginFailure = None
+        elif self.loginFailure == 'captcha':
+            self.send_notification("登录失败：验证码多次识别错误",
+                                   f"- 账号：{self.usr}\n- 时间：{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                                   "验证码识别次数耗尽，请检查识别参数")
+        if result == 1 and self.sessionStore:
+            self.sessionStore.save(self.driver)
+        if result == 1:
+            self.refreshVenueIndex()
+        return result
+
+    def loggedIn(self, timeout=3):
+        """
+        已登录的标志：停留在平台页面上，Vue 已渲染出场馆搜索框且没有登录按钮。
+        只看登录按钮是否消失不够，jaccount 页面、浏览器错误页和渲染完成前的页面上同样没有登录按钮
+        """
+        from selenium.webdriver.common.by import By
+        def signedIn(driver):
+            return (driver.current_url.startswith(self.homeUrl)
+                    and bool(driver.find_elements(By.CSS_SELECTOR, '#app .el-input__inner'))
+                    and not driver.find_elements(By.CSS_SELECTOR, '#app #logoin button'))
+        try:
+            self.waiter.until(signedIn, 'session check', timeout=timeout)
+            return True
+        except TimeoutException:
+            return False
+
+    def refreshVenueIndex(self):
+        """
+        场馆索引过期时用当前登录的 cookie 通过接口在后台重建，不阻塞预约流程
+        """
+        if not self.venueIndex.stale():
+            return
+        cookies = self.driver.get_cookies()
+
+        def discoverAll():
+            from sport_api import SJTUSportAPI
+            api = SJTUSportAPI(baseUrl=self.homeUrl, cookies=cookies, sessionStore=False, tracer=self.tracer,
+                               venueIndex=self.venueIndex)
+            try:
+                return discover(api.call)
+            finally:
+                api.session.close()
+
+        self.venueIndex.refresh_async(discoverAll)
+
+    def jaccountLogin(self):
+        from selenium.webdriver.common.by import By
+        from captcha import CaptchaFetcher
+        from waits import any_of
+        # 失败原因：'captcha' 验证码循环耗尽 / 'credentials' 账号密码错误 / 'other'
+        self.loginFailure = 'other'
         try:
             print("等待页面加载...")
             # 等待并点击登录按钮
             try:
                 print("尝试查找登录按钮...")
                 # 使用更精确的选择器
-                login_btn = self.wait.until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, '#app #logoin button'))
-                )
+                login_btn = self.waiter.clickable((By.CSS_SELECTOR, '#app #logoin button'), 'login button')
                 print("找到登录按钮")
                 login_btn.click()
                 print("已点击登录按钮")
                 
                 # 等待跳转到 jaccount 登录页面
                 print("等待跳转到 jaccount 登录页面...")
-                self.wait.until(lambda driver: 'jaccount.sjtu.edu.cn' in driver.current_url)
+                self.waiter.url_contains(self.jaccountHost, 'jaccount redirect')
                 print("已跳转到 jaccount 登录页面")
                 
-                # 确保页面完全加载
-                sleep(2)
-                
                 max_attempts = 10  # 最大重试次数
                 for attempt in range(max_attempts):
                     try:
                         print(f"登录尝试 {attempt + 1}/{max_attempts}")
                         
                         # 等待用户名输入框
-                        userInput = self.wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, '#input-login-user'))
-                        )
+                        userInput = self.waiter.clickable((By.CSS_SELECTOR, '#input-login-user'), 'username input')
                         userInput.clear()
                         userInput.send_keys(self.usr)
                         print("已输入用户名")
                         
                         # 等待密码输入框
-                        passwdInput = self.wait.until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, '#input-login-pass'))
-                        )
+                        passwdInput = self.waiter.clickable((By.CSS_SELECTOR, '#input-login-pass'), 'password input')
                         passwdInput.clear()
                         passwdInput.send_keys(self.psw)
                         print("已输入密码")
@@ -162,85 +251,88 @@ class SJTUSport(object):
                         print("获取验证码图片...")
                         try:
                             # 等待验证码图片加载
-                            captcha_element = self.wait.until(
-                                EC.presence_of_element_located((By.ID, 'captcha-img'))
-                            )
+                            self.waiter.present((By.ID, 'captcha-img'), 'captcha image')
                             print("找到验证码图片")
+                            captchaFetcher = CaptchaFetcher(self.driver, self.waiter)
                             
                             max_captcha_attempts = 3  # 每次最多尝试3次验证码识别
                             for captcha_attempt in range(max_captcha_attempts):
-                                try:
-                                    # 等待验证码图片完全加载
-                                    sleep(1)  # 给图片加载一点时间
-                                    
-                                    # 截取验证码图片
-                                    captcha_png = captcha_element.screenshot_as_png
-                                    captcha_img = Image.open(BytesIO(captcha_png))
+                                with self.tracer.span('captcha attempt', attempt=captcha_attempt + 1):
+                                    try:
+                                        # 直接下载验证码原图，重试时先点击刷新并等待 src 变化
+                                        if captcha_attempt == 0:
+                                            captcha_png = captchaFetcher.fetch()
+                                        else:
+                                            captcha_png = captchaFetcher.refresh()
                                     
-                                    # 识别验证码
-                                    captcha_text = captcha_rec(captcha_img)
-                                    if captcha_text:
-                                        print(f"第 {captcha_attempt + 1} 次尝试识别成功")
+                                        # 识别验证码
+                                        captcha_text = captcha_rec(captcha_png, self.recognizer, batch=self.batchRecognizer, cache=self.captchaCache)
+                                        if captcha_text:
+                                            print(f"第 {captcha_attempt + 1} 次尝试识别成功")
                                         
-                                        # 输入验证码
-                                        captchaInput = self.wait.until(
-                                            EC.presence_of_element_located((By.ID, 'input-login-captcha'))
-                                        )
-                                        captchaInput.clear()
-                                        captchaInput.send_keys(captcha_text)
-                                        print("已输入验证码")
+                                            # 输入验证码
+                                            captchaInput = self.waiter.present((By.ID, 'input-login-captcha'), 'captcha input')
+                                            captchaInput.clear()
+                                            captchaInput.send_keys(captcha_text)
+                                            print("已输入验证码")
                                         
-                                        # 点击登录按钮
-                                        try:
-                                            submit_btn = self.wait.until(
-                                                EC.element_to_be_clickable((By.ID, 'submit-password-button'))
-                                            )
-                                            print("找到登录按钮")
-                                            submit_btn.click()
-                                            print("已点击登录按钮")
-                                        except Exception as e:
-                                            print(f"点击登录按钮失败: {str(e)}")
-                                            # 尝试使用 JavaScript 点击
+                                            if self.captchaCache:
+                                                self.captchaCache.submitted(captcha_png, captcha_text)
+                                        
+                                            # 点击登录按钮
                                             try:
-                                                self.driver.execute_script("document.getElementById('submit-password-button').click();")
-                                                print("通过 JavaScript 点击登录按钮")
-                                            except Exception as js_e:
-                                                print(f"JavaScript 点击也失败: {str(js_e)}")
-                                                raise
+                                                submit_btn = self.waiter.clickable((By.ID, 'submit-password-button'), 'submit button')
+                                                print("找到登录按钮")
+                                                submit_btn.click()
+                                                print("已点击登录按钮")
+                                            except Exception as e:
+                                                print(f"点击登录按钮失败: {str(e)}")
+                                                # 尝试使用 JavaScript 点击
+                                                try:
+                                                    self.driver.execute_script("document.getElementById('submit-password-button').click();")
+                                                    print("通过 JavaScript 点击登录按钮")
+                                                except Exception as js_e:
+                                                    print(f"JavaScript 点击也失败: {str(js_e)}")
+                                                    raise
                                         
-                                        # 等待一下看是否有错误提示
-                                        sleep(2)
+                                            # 等待离开 jaccount 页面或出现错误提示
+                                            try:
+                                                self.waiter.until(
+                                                    any_of(
+                                                        lambda driver: self.jaccountHost not in driver.current_url,
+                                                        lambda driver: any(e.text for e in driver.find_elements(By.CLASS_NAME, 'auth-error')),
+                                                    ),
+                                                    'login response', timeout=5
+                                                )
+                                            except TimeoutException:
+                                                pass
                                         
-                                        # 检查是否有验证码错误提示
-                                        error_elements = self.driver.find_elements(By.CLASS_NAME, 'auth-error')
-                                        if error_elements and '验证码' in error_elements[0].text:
-                                            print("验证码错误，将尝试重新识别")
-                                            # 点击验证码图片刷新
-                                            captcha_element.click()
-                                            sleep(1)  # 等待新验证码加载
-                                            continue
+                                            # 检查是否有验证码错误提示
+                                            error_elements = self.driver.find_elements(By.CLASS_NAME, 'auth-error')
+                                            if error_elements and '验证码' in error_elements[0].text:
+                                                print("验证码错误，将尝试重新识别")
+                                                if self.captchaCache:
+                                                    self.captchaCache.rejected(captcha_png, captcha_text)
+                                                continue
                                         
-                                        # 如果没有错误提示，说明验证码可能正确
-                                        break
+                                            # 如果没有错误提示，说明验证码可能正确
+                                            break
                                         
-                                    else:
-                                        print(f"第 {captcha_attempt + 1} 次验证码识别失败")
-                                        if captcha_attempt < max_captcha_attempts - 1:
-                                            print("点击刷新验证码")
-                                            captcha_element.click()
-                                            sleep(1)  # 等待新验证码加载
+                                        else:
+                                            print(f"第 {captcha_attempt + 1} 次验证码识别失败")
+                                            if captcha_attempt < max_captcha_attempts - 1:
+                                                print("点击刷新验证码")
                                             
-                                except Exception as e:
-                                    print(f"处理验证码时出错: {str(e)}")
-                                    if captcha_attempt < max_captcha_attempts - 1:
-                                        print("将尝试重新获取验证码")
-                                        captcha_element.click()
-                                        sleep(1)
-                                    else:
-                                        raise
+                                    except Exception as e:
+                                        print(f"处理验证码时出错: {str(e)}")
+                                        if captcha_attempt < max_captcha_attempts - 1:
+                                            print("将尝试重新获取验证码")
+                                        else:
+                                            raise
                             
                             else:  # 所有验证码尝试都失败
                                 print("验证码识别次数超过最大限制")
+                                self.loginFailure = 'captcha'
                                 return 0
                             
                         except TimeoutException:
@@ -254,11 +346,14 @@ class SJTUSport(object):
                         print("等待登录结果...")
                         try:
                             # 等待重定向回体育场馆预约平台
-                            self.wait.until(
-                                lambda driver: 'sports.sjtu.edu.cn' in driver.current_url and 
-                                '预约' in self.driver.title
+                            self.waiter.until(
+                                lambda driver: driver.current_url.startswith(self.homeUrl) and 
+                                '预约' in self.driver.title,
+                                'login redirect'
                             )
                             print("登录成功!")
+                            if self.captchaCache:
+                                self.captchaCache.accepted(captcha_png, captcha_text)
                             return 1
                         except TimeoutException:
                             # 检查是否有错误信息
@@ -267,9 +362,12 @@ class SJTUSport(object):
                                 error_text = error_elements[0].text
                                 if '验证码' in error_text:
                                     print("验证码错误，重试...")
+                                    if self.captchaCache:
+                                        self.captchaCache.rejected(captcha_png, captcha_text)
                                     continue
                                 elif '用户名或密码' in error_text:
                                     print("用户名或密码错误!")
+                                    self.loginFailure = 'credentials'
                                     return 0
                         
                     except Exception as e:
@@ -279,6 +377,7 @@ class SJTUSport(object):
                         continue
                         
                 print("登录失败，已达到最大重试次数")
+                self.loginFailure = 'captcha'
                 return 0
                 
             except Exception as e:
@@ -290,146 +389,250 @@ class SJTUSport(object):
             print(f"登录过程发生严重错误: {str(e)}")
             return 0
 
-    def searchAndEnterVenue(self):
+    @traced('venue search')
+    def searchAndEnterVenue(self, reload=False):
+        """
+        进入 self.venue 的场馆页面：已在该页面时不做任何事（reload 为 True 时重新打开），
+        索引中有详情页地址时直接打开，否则从首页搜索并记下地址
+        """
+        from selenium.webdriver.common.by import By
+        url = self.venueIndex.venue_url(self.venue)
+        if url and self.driver.current_url == url and not reload:
+            return
+        if url:
+            try:
+                self.driver.get(url)
+                self.waiter.until(lambda driver: driver.execute_script(TABS_JS), 'venue page direct', timeout=5)
+                return
+            except WebDriverException:
+                # 包括等待超时与地址无法打开（neterror 等）
+                print("场馆页面地址已失效，改为搜索")
+                self.venueIndex.update(self.venue, url='')
+        if self.driver.current_url.rstrip('/') != self.homeUrl.rstrip('/') or url:
+            self.driver.get(self.homeUrl)
         try:
-            venueInput = self.wait.until(
-                EC.presence_of_element_located((By.CLASS_NAME, 'el-input__inner'))
-            )
+            venueInput = self.waiter.present((By.CLASS_NAME, 'el-input__inner'), 'venue search input')
             venueInput.send_keys(self.venue)
-            btn = self.wait.until(
-                EC.element_to_be_clickable((By.CLASS_NAME, 'el-button--default'))
-            )
+            btn = self.waiter.clickable((By.CLASS_NAME, 'el-button--default'), 'venue search button')
             btn.click()
-            sleep(1)
 
-            btn = self.wait.until(
-                EC.element_to_be_clickable((By.CLASS_NAME, 'el-card__body'))
-            )
+            # 等待搜索结果卡片出现，点击后等待跳转到场馆页面
+            btn = self.waiter.clickable((By.CLASS_NAME, 'el-card__body'), 'venue card')
+            listUrl = self.driver.current_url
             btn.click()
-            sleep(1)
+            self.waiter.url_changes(listUrl, 'venue page')
+            self.venueIndex.update(self.venue, url=self.driver.current_url)
         except TimeoutException:
             print("等待场馆选择加载超时")
         except NoSuchElementException:
             print("未找到场馆选择元素，可能是页面结构已变更")
 
+    @traced('tab selection')
     def chooseVenueItemTab(self):
-        try:
-            print(f"尝试选择场地类型: {self.venueItem}")
-            self.wait.until(
-                EC.presence_of_element_located((By.ID, venueTabLists[self.venue][self.venueItem]))
-            )
-            btn = self.driver.find_element(By.ID, venueTabLists[self.venue][self.venueItem])
-            btn.click()
-            print("已选择场地类型")
-        except Exception as e:
-            print(f"选择场地类型失败: {str(e)}")
+        """
+        等项目标签渲染后一次读出页面上的全部标签；索引中的 id 不在页面上时立即按名称修正索引，
+        而不是等待一个已失效的 id 超时
+        """
+        from selenium.webdriver.common.by import By
+        print(f"尝试选择场地类型: {self.venueItem}")
+        tabs = self.waiter.until(lambda driver: driver.execute_script(TABS_JS), 'venue item tabs')
+        tabId = self.venueIndex.tab(self.venue, self.venueItem)
+        if tabs.get(self.venueItem) != tabId:
+            print("场馆索引与页面不一致，按页面更新")
+            self.venueIndex.update(self.venue, items=tabs)
+            tabId = tabs.get(self.venueItem)
+            if tabId is None:
+                raise LookupError(f"{self.venue} 没有场地类型 {self.venueItem}，可选: {', '.join(tabs)}")
+        btn = self.waiter.clickable((By.ID, tabId), 'venue item tab')
+        btn.click()
+        print("已选择场地类型")
 
+    @traced('date selection')
     def chooseDateTab(self):
+        from selenium.webdriver.common.by import By
         dateId = 'tab-' + self.targetDate.strftime('%Y-%m-%d')
-        btn = self.driver.find_element(By.ID, dateId)
+        btn = self.waiter.clickable((By.ID, dateId), 'date tab')
         btn.click()
-        sleep(1)
+        # 等待日期标签激活且座位表渲染完成
+        self.waiter.until(
+            lambda driver: 'is-active' in (driver.find_element(By.ID, dateId).get_attribute('class') or ''),
+            'date tab active'
+        )
+        self.waiter.present((By.CSS_SELECTOR, '.chart .inner-seat-wrapper'), 'seat chart')
+        self.page = (self.venue, self.venueItem)
+
+    def goTo(self, venue, venueItem):
+        """
+        切换到指定场馆与项目的目标日期座位表，已在该页面时直接返回，不需要新的浏览器或重新登录
+        """
+        if self.page == (venue, venueItem):
+            return
+        if self.page is None or self.page[0] != venue:
+            self.venue = venue
+            self.searchAndEnterVenue()
+        self.venueItem = venueItem
+        self.chooseVenueItemTab()
+        self.chooseDateTab()
 
+    @traced('seat pick')
     def chooseStartTime(self):
         """
         Start time ranges from 7 to 21
+        按优先级依次尝试 self.preferences。进入一个页面后，把从当前位置起属于该页面的偏好按优先级一起传入脚本，
+        读取座位表与点击第一个有空位的选项在同一次调用中完成；遇到其他页面上尚未确认无空位的偏好时停止，
+        保证整体优先级不变。已读到的快照显示某个偏好没有空位时直接跳过，不再访问页面。
         """
-        timeSlotId = self.startTime - 7
-        chart = self.driver.find_element(By.CLASS_NAME, 'chart')
-        chart.screenshot('chart.png')
-        wrapper = chart.find_element(By.CLASS_NAME, 'inner-seat-wrapper')
-        timeSlot = wrapper.find_elements(By.CLASS_NAME, 'clearfix')[timeSlotId]
-        seats = timeSlot.find_elements(By.CLASS_NAME, 'unselected-seat')
-        assert len(seats) > 0, "No seats left in " + self.venue + "-" +self.venueItem + " at " + str(self.startTime) +":00 on " + self.targetDate.strftime('%Y-%m-%d')
-        seat = seats[0]
-        seat.click()
+        from selenium.webdriver.common.by import By
+        if self.chartScreenshot:
+            self.driver.find_element(By.CLASS_NAME, 'chart').screenshot('chart.png')
+        snapshots = {}
+
+        def taken(pref):
+            page = (pref.venue, pref.venueItem)
+            return page in snapshots and not is_free(pref, snapshots[page].free_courts(pref.startTime))
+
+        i = 0
+        while i < len(self.preferences):
+            pref = self.preferences[i]
+            page = (pref.venue, pref.venueItem)
+            if taken(pref):
+                i += 1
+                continue
+            ranked = []
+            while i < len(self.preferences):
+                other = self.preferences[i]
+                if (other.venue, other.venueItem) == page:
+                    ranked.append(other)
+                elif not taken(other):
+                    break
+                i += 1
+            self.goTo(*page)
+            seatMap = SeatMap.read(self.driver, [(p.startTime, p.court) for p in ranked])
+            snapshots[page] = seatMap
+            if seatMap.choice is not None:
+                pref = ranked[seatMap.choice]
+                self.seatMap = seatMap
+                self.startTime = pref.startTime
+                print("已选择: " + describe(pref))
+                return pref
+        raise AssertionError("No seats left for " + ', '.join(describe(p) for p in self.preferences) + " on " + self.targetDate.strftime('%Y-%m-%d'))
 
     def send_notification(self, title, desp, short=None):
         """
-        发送Server酱通知
+        发送Server酱通知，由后台线程发送，不阻塞预约流程
         """
-        if not self.sckey:
-            print("未配置Server酱密钥，跳过通知发送")
-            return
-            
-        try:
-            url = f"https://sctapi.ftqq.com/{self.sckey}.send"
-            data = {
-                "title": title,
-                "desp": desp,
-                "short": short if short else None,
-                "noip": 1  # 隐藏IP
-            }
-            
-            response = requests.post(url, data=data)
-            if response.status_code == 200:
-                print("通知发送成功")
-                result = response.json()
-                if result.get("code") == 0:
-                    print("Server酱推送成功")
-                else:
-                    print(f"Server酱推送失败: {result.get('message')}")
-            else:
-                print(f"通知发送失败: HTTP {response.status_code}")
-                
-        except Exception as e:
-            print(f"发送通知时出错: {str(e)}")
+        from notify import notify
+        notify(self.sckey, title, desp, short)
 
     def order(self):
         try:
+            # 已在场馆页面（例如重试控制器刚导航过）时不再重复进入，只重新选择项目与日期刷新座位表
             self.searchAndEnterVenue()
             self.chooseVenueItemTab()
             self.chooseDateTab()
             self.chooseStartTime()
+            self.submitOrder()
+            return 1
+        except Exception as e:
+            logging.error(str(e))
+            print(str(e))
+            return 0
+
+    def prestage(self):
+        """
+        开放前预先进入场馆页面并选好项目，开放时只需刷新座位表
+        """
+        with self.tracer.span('prestage'):
+            self.searchAndEnterVenue()
+            self.chooseVenueItemTab()
+        logging.info("Prestaged: " + self.venue + "-" + self.venueItem)
+        print("已进入场馆页面，等待开放")
+
+    def keepAlive(self):
+        """
+        刷新场馆页面以保持登录态
+        """
+        try:
+            self.driver.refresh()
+            self.chooseVenueItemTab()
+        except Exception as e:
+            print(f"保持会话失败: {str(e)}")
 
+    def refreshSeatChart(self):
+        with self.tracer.span('seat chart refresh'):
+            self.driver.refresh()
+            self.chooseVenueItemTab()
+            self.chooseDateTab()
+
+    def strike(self):
+        """
+        在 prestage() 之后于开放时刻调用：只刷新座位表、选座并提交
+        """
+        try:
+            self.refreshSeatChart()
+            self.chooseStartTime()
+            self.submitOrder()
+            return 1
+        except Exception as e:
+            logging.error(str(e))
+            print(str(e))
+            return 0
+
+    def submitOrder(self):
+        from selenium.webdriver.common.by import By
+        with self.tracer.span('order submit'):
             # confirm order
-            btn = self.driver.find_element(By.CSS_SELECTOR, '.drawerStyle>.butMoney>.is-round')
+            btn = self.waiter.drawer_open()
             btn.click()
 
             # process notice
-            btn = self.driver.find_element(By.CSS_SELECTOR, '.dialog-footer>.tk>.el-checkbox>.el-checkbox__input>.el-checkbox__inner')
+            btn = self.waiter.clickable((By.CSS_SELECTOR, '.dialog-footer>.tk>.el-checkbox>.el-checkbox__input>.el-checkbox__inner'), 'notice checkbox')
             btn.click()
-            btn = self.driver.find_element(By.CSS_SELECTOR, '.dialog-footer>div>.el-button--primary')
+            btn = self.waiter.clickable((By.CSS_SELECTOR, '.dialog-footer>div>.el-button--primary'), 'notice confirm')
             btn.click()
-            sleep(1)
 
             # pay and commit
-            btn = self.driver.find_element(By.CSS_SELECTOR, '.placeAnOrder>.right>.el-button--primary')
+            btn = self.waiter.clickable((By.CSS_SELECTOR, '.placeAnOrder>.right>.el-button--primary'), 'place order')
             btn.click()
 
-            dialog = self.driver.find_element(By.CSS_SELECTOR, '[aria-label="提示"]')
+            dialog = self.waiter.dialog_visible('提示')
             btn = dialog.find_element(By.CSS_SELECTOR, '.dialog-footer>.el-button--primary')
             btn.click()
-            
-            # 预约成功后发送通知
-            order_info = f"{self.venue}-{self.venueItem} at {str(self.startTime)}:00 on {self.targetDate.strftime('%Y-%m-%d')}"
-            title = "场地预约成功，请及时支付！"
-            desp = f"""
+        
+        # 预约成功后发送通知
+        order_info = f"{self.venue}-{self.venueItem} at {str(self.startTime)}:00 on {self.targetDate.strftime('%Y-%m-%d')}"
+        title = "场地预约成功，请及时支付！"
+        desp = f"""
 ### 预约信息
 - 场馆：{self.venue}
 - 场地：{self.venueItem}
 - 日期：{self.targetDate.strftime('%Y-%m-%d')}
 - 时间：{str(self.startTime)}:00
-            
+        
 ### 注意事项
 1. 请在15分钟内完成支付，否则订单将自动取消
 2. 请确保账户余额充足
 3. 如需取消预约，请提前操作
-            """
-            short = f"已预约{self.venue}{self.venueItem}，请在15分钟内支付"
-            
-            self.send_notification(title, desp, short)
-            
-            logging.info('Order committed: ' + order_info)
-            print('Order committed: ' + order_info)
-            return 1
-        except Exception as e:
-            logging.error(str(e))
-            print(str(e))
-            return 0
+        """
+        short = f"已预约{self.venue}{self.venueItem}，请在15分钟内支付"
+        
+        self.send_notification(title, desp, short)
+        
+        logging.info('Order committed: ' + order_info)
+        print('Order committed: ' + order_info)
 
-    def shutDown(self):
-        self.driver.quit()
+    def shutDown(self, discard=False):
+        """
+        关闭浏览器；借来的浏览器归还给浏览器池，discard 为 True 时由池关闭并换新。重复调用不会重复关闭
+        """
+        if self.browser is not None:
+            self.browser.release(discard)
+            self.browser = None
+        elif self.driver is not None:
+            self.driver.quit()
+        self.driver = None
+        # 每次运行结束写出时间线，重复调用只保存一次
+        self.tracer.save()
 
 
 def main(argv):
@@ -448,9 +651,10 @@ def main(argv):
             print('sport.py -d <delta days from today ranging from 0 to 7> -i <venue item name> -t <startTime ranging from 7 to 21> -v <venue name>')
             print('or: sport.py --day=<delta days from today ranging from 0 to 7> --item=<venue item name> --time=<startTime ranging from 7 to 21> --venue=<venue name>')
             print('venue-venueItem list:')
-            for key in venueTabLists.keys():
+            venues = get_venue_index().venues
+            for key in venues.keys():
                 print(key,end=': { ')
-                for subkey in venueTabLists[key].keys():
+                for subkey in venues[key]['items'].keys():
                     print(subkey,end=', ')
                 print('}')
             sys.exit()
@@ -469,13 +673,15 @@ def main(argv):
         print("Login successfully!")
     else:
         sport.shutDown()
-        os._exit(0)
+        # 不用 os._exit()：要让 atexit 中的 Notifier.close() 发出或暂存尚未发送的通知
+        sys.exit()
     if sport.order() == 1:
         logging.info("Order successfully")
         print("Order successfully!")
     else:
         sport.shutDown()
-        os._exit(0)
+        sys.exit()
+    sport.waiter.report()
     sport.shutDown()
 
 if __name__ == "__main__":
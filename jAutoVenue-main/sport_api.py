@@ -0,0 +1,222 @@
+"""
+直接调用平台 JSON 接口的预约引擎
+
+注意：ENDPOINTS 中的路径取自前端页面发出的请求，但各接口的请求体与响应结构（场馆列表、
+余量查询中的 hour / court / status / fieldId / scheduleTime 字段、下单请求体）尚未与真实平台的
+请求逐一核对，目前只在按同一假设编写的 mock_platform.py 上测试过。对真实平台使用前应先抓取
+浏览器中的实际请求核对字段，不一致时修改 chooseStartTime() 与 submitOrder() 的解析与请求体。
+"""
+import datetime
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from tracing import Tracer, traced
+from session_store import SessionStore
+from preferences import Preference, describe
+from venue_index import open_venue_index
+from notify import notify
+
+BASE_URL = 'https://sports.sjtu.edu.cn'
+# 前端页面调用的 JSON 接口路径，平台改版时只需更新这里；请求与响应字段尚未与真实平台核对，见模块说明
+ENDPOINTS = {
+    'venues': '/manage/venue/listOrderCount',
+    'venue': '/manage/venue/queryVenueById',
+    'seats': '/manage/fieldDetail/queryFieldSituation',
+    'order': '/venue/personal/ConfirmOrder',
+}
+
+
+class APIError(Exception):
+    pass
+
+
+class SJTUSportAPI(object):
+    """
+    直接调用平台 JSON 接口的预约引擎，接口与 SJTUSport 相同
+
+    只有登录需要浏览器：cookie 来自 SessionStore，没有可用会话时启动一次
+    SJTUSport 完成 jaccount 登录并保存 cookie，之后的查询和下单都走连接池化的 requests.Session。
+    """
+    def __init__(self, deltaDays=7, venue='学生服务中心', venueItem='健身房', startTime=17, sckey=None,
+                 tracer=None, sessionStore=True, baseUrl=BASE_URL, cookies=None, timeout=5, preferences=None, venueIndex=None):
+        self.tracer = tracer or Tracer()
+        self.baseUrl = baseUrl.rstrip('/')
+        self.sessionStore = SessionStore(baseUrl=self.baseUrl) if sessionStore is True else (sessionStore or None)
+        self.timeout = timeout
+        self.targetDate = datetime.datetime.now() + datetime.timedelta(deltaDays)
+        self.preferences = list(preferences) if preferences else [Preference(venue, venueItem, startTime)]
+        self.venue, self.venueItem, self.startTime = self.preferences[0][:3]
+        self.sckey = sckey
+        self.venueId = None
+        self.motionId = None
+        # 场馆 -> venueId 与 (场馆, 项目) -> motionId，同一会话内只查询一次
+        self.venueIds = {}
+        self.motionIds = {}
+        # 跨运行缓存的 venueId，与浏览器引擎共用；venueIndex 参数同 SJTUSport
+        self.venueIndex = open_venue_index(venueIndex)
+        self.seats = None
+        self.seat = None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Content-Type'] = 'application/json'
+        if cookies:
+            self.setCookies(cookies)
+
+    def setCookies(self, cookies):
+        for c in cookies:
+            self.session.cookies.set(c['name'], c['value'], domain=c.get('domain', ''), path=c.get('path', '/'))
+
+    def call(self, name, payload):
+        response = self.session.post(self.baseUrl + ENDPOINTS[name], json=payload, timeout=self.timeout)
+        if response.status_code in (301, 302, 401):
+            raise APIError("登录会话已失效")
+        response.raise_for_status()
+        result = response.json()
+        if result.get('code') != 0:
+            raise APIError(result.get('msg') or f"{name} 调用失败: {result}")
+        return result.get('data')
+
+    @traced('login')
+    def login(self):
+        """
+        复用保存的 cookie；没有有效会话时用浏览器登录一次并保存
+        """
+        if self.session.cookies:
+            return 1
+        if self.sessionStore:
+            cookies = self.sessionStore.load()
+            if cookies and self.sessionStore.validate(cookies):
+                self.setCookies(cookies)
+                return 1
+        from sport import SJTUSport
+        sport = SJTUSport(venue=self.venue, venueItem=self.venueItem, startTime=self.startTime,
+                          sckey=self.sckey, tracer=self.tracer, sessionStore=self.sessionStore,
+                          venueIndex=self.venueIndex, homeUrl=self.baseUrl)
+        try:
+            if sport.login() != 1:
+                return 0
+            self.setCookies(sport.driver.get_cookies())
+            return 1
+        finally:
+            sport.shutDown()
+
+    @traced('venue search')
+    def searchAndEnterVenue(self, reload=False):
+        """
+        venueId 依次取自本次会话、场馆索引，都没有（或 reload 为 True）时才搜索，结果写回索引
+        """
+        if not reload:
+            venueId = self.venueIds.get(self.venue) or self.venueIndex.venue_id(self.venue)
+            if venueId:
+                self.venueId = self.venueIds[self.venue] = venueId
+                return
+        venues = self.call('venues', {'venueName': self.venue})
+        for v in venues:
+            if v['venueName'] == self.venue:
+                self.venueId = self.venueIds[self.venue] = v['id']
+                self.venueIndex.update(self.venue, venueId=v['id'])
+                return
+        raise APIError("未找到场馆: " + self.venue)
+
+    @traced('tab selection')
+    def chooseVenueItemTab(self):
+        self.searchAndEnterVenue()
+        if (self.venue, self.venueItem) in self.motionIds:
+            self.motionId = self.motionIds[(self.venue, self.venueItem)]
+            return
+        try:
+            venue = self.call('venue', {'id': self.venueId})
+        except APIError as e:
+            if '登录' in str(e):
+                raise
+            # 缓存的 venueId 已失效，重新搜索一次
+            self.searchAndEnterVenue(reload=True)
+            venue = self.call('venue', {'id': self.venueId})
+        for motion in venue['motionTypes']:
+            if motion['name'] == self.venueItem:
+                self.motionId = self.motionIds[(self.venue, self.venueItem)] = motion['id']
+                return
+        raise APIError("未找到场地类型: " + self.venueItem)
+
+    @traced('date selection')
+    def chooseDateTab(self):
+        if self.motionId is None:
+            self.chooseVenueItemTab()
+        self.seats = self.call('seats', {
+            'venueId': self.venueId,
+            'motionId': self.motionId,
+            'date': self.targetDate.strftime('%Y-%m-%d'),
+        })
+
+    @traced('seat pick')
+    def chooseStartTime(self):
+        """
+        Start time ranges from 7 to 21
+        按优先级依次尝试 self.preferences，每个 (场馆, 项目) 的余量只查询一次
+        """
+        snapshots = {}
+        if self.seats is not None:
+            snapshots[(self.venue, self.venueItem)] = self.seats
+        for pref in self.preferences:
+            page = (pref.venue, pref.venueItem)
+            if page not in snapshots:
+                self.venue, self.venueItem = page
+                self.chooseVenueItemTab()
+                self.chooseDateTab()
+                snapshots[page] = self.seats
+            free = [s for s in snapshots[page] if s['hour'] == pref.startTime and s['status'] == 0
+                    and (pref.court is None or s['court'] == pref.court)]
+            if free:
+                self.venue, self.venueItem = page
+                self.chooseVenueItemTab()
+                self.seats = snapshots[page]
+                self.startTime = pref.startTime
+                self.seat = free[0]
+                return pref
+        raise AssertionError("No seats left for " + ', '.join(describe(p) for p in self.preferences) + " on " + self.targetDate.strftime('%Y-%m-%d'))
+
+    def submitOrder(self):
+        with self.tracer.span('order submit'):
+            data = self.call('order', {
+                'venueId': self.venueId,
+                'motionId': self.motionId,
+                'date': self.targetDate.strftime('%Y-%m-%d'),
+                'fieldId': self.seat['fieldId'],
+                'court': self.seat['court'],
+                'hour': self.seat['hour'],
+                'scheduleTime': self.seat['scheduleTime'],
+            })
+        order_info = f"{self.venue}-{self.venueItem} at {str(self.startTime)}:00 on {self.targetDate.strftime('%Y-%m-%d')}"
+        self.send_notification(
+            "场地预约成功，请及时支付！",
+            f"- 场馆：{self.venue}\n- 场地：{self.venueItem}\n- 日期：{self.targetDate.strftime('%Y-%m-%d')}\n- 时间：{str(self.startTime)}:00",
+            f"已预约{self.venue}{self.venueItem}，请在15分钟内支付"
+        )
+        logging.info('Order committed: ' + order_info + ' (' + str(data.get('orderId')) + ')')
+        print('Order committed: ' + order_info)
+        return data
+
+    def order(self):
+        try:
+            # 已经查询过的场馆与项目 ID 不再重复查询，余量每次下单前重新查询
+            self.venue, self.venueItem = self.preferences[0][:2]
+            self.chooseVenueItemTab()
+            self.chooseDateTab()
+            self.chooseStartTime()
+            self.submitOrder()
+            return 1
+        except Exception as e:
+            logging.error(str(e))
+            print(str(e))
+            return 0
+
+    def send_notification(self, title, desp, short=None):
+        notify(self.sckey, title, desp, short)
+
+    def shutDown(self, discard=False):
+        # discard 与 SJTUSport.shutDown() 保持一致，HTTP 会话总是直接关闭
+        self.session.close()
+        self.tracer.save()
@@ -0,0 +1,23 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def mock_server():
+    """
+    mock_server(**kwargs) 启动一个替身服务器并返回 (platform, base_url)，测试结束时关闭
+    """
+    from mock_platform import start_mock_platform
+    servers = []
+
+    def start(**kwargs):
+        server, platform, base_url = start_mock_platform(**kwargs)
+        servers.append(server)
+        return platform, base_url
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,121 @@
+import datetime
+import pytest
+from jobs import parse_jobs
+from venue_index import VenueIndex
+
+RELEASE = datetime.datetime(2026, 10, 19, 12, 0)
+
+
+class FakeClock(object):
+    """
+    以 t 为服务器时间的 ReleaseScheduler 替身，等待只推进 t
+    """
+    def __init__(self, t):
+        self.t = t
+        self.fired = []
+
+    def server_now(self):
+        return self.t
+
+    def wait_until(self, target, **kwargs):
+        self.t = max(self.t, target)
+
+    def fire(self, target, action, **kwargs):
+        self.wait_until(target)
+        self.fired.append(self.t)
+        return action()
+
+
+class FakeWaiter(object):
+    def report(self):
+        pass
+
+
+class FakeSport(object):
+    waiter = FakeWaiter()
+
+    def __init__(self, logins, prestages=(), strikes=(1,)):
+        self.logins = list(logins)
+        self.prestages = list(prestages)
+        self.strikes = list(strikes)
+        self.loginFailure = None
+        self.driver = None
+        self.venue, self.venueItem, self.startTime = '学生服务中心', '台球', 17
+        self.closed = False
+
+    def login(self):
+        result = self.logins.pop(0)
+        if result != 1:
+            self.loginFailure = result
+            return 0
+        return 1
+
+    def prestage(self):
+        if self.prestages:
+            raise self.prestages.pop(0)
+
+    def strike(self):
+        return self.strikes.pop(0)
+
+    def keepAlive(self):
+        pass
+
+    def shutDown(self, discard=False):
+        self.closed = True
+
+
+@pytest.fixture
+def auto_booking(monkeypatch, tmp_path):
+    # auto_booking 导入时在当前目录创建日志文件
+    monkeypatch.chdir(tmp_path)
+    import auto_booking
+    import jobs
+    monkeypatch.setattr(jobs, 'get_venue_index', lambda: VenueIndex(path=None))
+    return auto_booking
+
+
+@pytest.fixture
+def job(auto_booking):
+    return parse_jobs({'jobs': [{'name': 'gym', 'venue': '学生服务中心', 'item': '台球',
+                                 'weekdays': ['mon'], 'hours': [17]}]}).jobs[0]
+
+
+def setup(monkeypatch, auto_booking, clock, sports):
+    handed = []
+    monkeypatch.setattr(auto_booking, 'new_sport', lambda job, release: sports.pop(0))
+    monkeypatch.setattr(auto_booking.time, 'sleep', lambda seconds: setattr(clock, 't', clock.t + seconds))
+    monkeypatch.setattr(auto_booking, 'book_venue',
+                        lambda job, release, sport=None, level=None: handed.append((clock.t, sport, level)))
+    return handed
+
+
+def test_prestage_retries_login_until_ready(monkeypatch, auto_booking, job):
+    clock = FakeClock(RELEASE.timestamp() - 300)
+    sport = FakeSport(['captcha', 'captcha', 1], prestages=[TimeoutError('venue card')])
+    handed = setup(monkeypatch, auto_booking, clock, [sport])
+    auto_booking.prestage_booking(job, RELEASE, clock)
+    assert clock.fired == [RELEASE.timestamp()]
+    assert handed == [] and sport.closed
+
+
+def test_failed_prestage_hands_off_only_at_release(monkeypatch, auto_booking, job):
+    clock = FakeClock(RELEASE.timestamp() - 300)
+    sport = FakeSport(['captcha'] * 1000)
+    handed = setup(monkeypatch, auto_booking, clock, [sport])
+    auto_booking.prestage_booking(job, RELEASE, clock)
+    assert clock.fired == []
+    assert handed == [(RELEASE.timestamp(), sport, auto_booking.LOGIN)]
+
+
+def test_bad_credentials_stop_prestage_retries(monkeypatch, auto_booking, job):
+    clock = FakeClock(RELEASE.timestamp() - 300)
+    sport = FakeSport(['credentials'])
+    handed = setup(monkeypatch, auto_booking, clock, [sport])
+    auto_booking.prestage_booking(job, RELEASE, clock)
+    assert handed == [(RELEASE.timestamp(), sport, auto_booking.LOGIN)]
+
+
+def test_target_date_follows_release_across_midnight(auto_booking, job):
+    # 23:55 预热、00:00 开放的任务预约的是开放当天之后 lead_days 天
+    midnight = datetime.datetime(2026, 10, 20, 0, 0)
+    assert auto_booking.target_date(job, midnight).date() == datetime.date(2026, 10, 27)
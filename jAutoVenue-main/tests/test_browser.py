@@ -0,0 +1,203 @@
+import types
+import pytest
+import browser
+from browser import BrowserPool
+
+
+class FakeDriver(object):
+    """
+    模拟 Firefox WebDriver：记录打开的标签页、访问的地址，rss 为进程树内存（字节）
+    """
+    def __init__(self, pid):
+        self.service = types.SimpleNamespace(process=types.SimpleNamespace(pid=pid))
+        self.current_window_handle = 'main'
+        self.tabs = ['main']
+        self.current = 'main'
+        self.switch_to = types.SimpleNamespace(window=self.switch)
+        self.dead = False
+        self.broken = False
+        self.quits = 0
+        self.urls = []
+        self.scripts = []
+        self.rss = 0
+
+    @property
+    def window_handles(self):
+        return list(self.tabs)
+
+    def switch(self, handle):
+        self.current = handle
+
+    def close(self):
+        self.tabs.remove(self.current)
+
+    def execute_script(self, script):
+        if self.dead:
+            raise RuntimeError('invalid session id')
+        self.scripts.append(script)
+        return 1
+
+    def get(self, url):
+        if self.broken:
+            raise RuntimeError('page crashed')
+        self.urls.append(url)
+
+    def quit(self):
+        self.quits += 1
+
+
+@pytest.fixture
+def drivers(monkeypatch):
+    """
+    start_browser 返回的 FakeDriver，按启动顺序排列；启动时记录 (profile, profileDir)
+    """
+    started = []
+
+    def start_browser(profile=None, profileDir=None):
+        driver = FakeDriver(pid=len(started) + 1)
+        driver.profile = (profile, profileDir)
+        started.append(driver)
+        return driver, None
+    monkeypatch.setattr(browser, 'start_browser', start_browser)
+    monkeypatch.setattr(browser, 'tree_rss', lambda pid: started[pid - 1].rss)
+    return started
+
+
+def settle(pool):
+    """
+    等待后台补足线程结束
+    """
+    if pool._filling:
+        pool._filling.join(5)
+
+
+def test_lease_starts_on_demand_and_reuses_released_browser(drivers):
+    pool = BrowserPool(size=1, profileDir='/tmp/profile')
+    first = pool.lease()
+    assert len(drivers) == 1 and first.uses == 1 and first.leased
+    first.release()
+    assert pool.idle == [first]
+    second = pool.lease()
+    assert second is first and second.uses == 2 and len(drivers) == 1
+    assert drivers[0].profile == (None, '/tmp/profile')
+
+
+def test_fill_uses_separate_profile_dirs(drivers):
+    pool = BrowserPool(size=3, profile='lean', profileDir='/tmp/profile')
+    assert pool.fill() == 3
+    assert pool.fill() == 0
+    assert [d.profile for d in drivers] == [('lean', '/tmp/profile'), ('lean', '/tmp/profile-1'),
+                                            ('lean', '/tmp/profile-2')]
+
+
+def test_dead_browser_is_replaced_on_lease(drivers):
+    pool = BrowserPool(size=1)
+    pool.fill()
+    drivers[0].dead = True
+    leased = pool.lease()
+    assert leased.driver is drivers[1]
+    assert drivers[0].quits == 1 and pool.recycled == 1
+    assert pool.slots == {0: leased}
+
+
+def test_release_closes_extra_tabs_and_keeps_cookies(drivers):
+    pool = BrowserPool(size=1)
+    leased = pool.lease()
+    driver = drivers[0]
+    driver.tabs += ['popup', 'payment']
+    leased.release()
+    assert driver.tabs == ['main'] and driver.current == 'main'
+    assert driver.urls == ['about:blank']
+    assert 'sessionStorage.clear()' in driver.scripts[-1]
+    # 重复归还被忽略
+    leased.release()
+    assert pool.idle == [leased] and driver.urls == ['about:blank']
+
+
+def test_failed_reset_recycles(drivers):
+    pool = BrowserPool(size=1)
+    leased = pool.lease()
+    drivers[0].broken = True
+    leased.release()
+    settle(pool)
+    assert drivers[0].quits == 1 and pool.recycled == 1
+    assert len(drivers) == 2 and pool.idle[0].driver is drivers[1]
+
+
+def test_recycled_after_max_uses(drivers):
+    pool = BrowserPool(size=1, max_uses=2)
+    pool.lease().release()
+    leased = pool.lease()
+    assert leased.uses == 2
+    leased.release()
+    settle(pool)
+    assert drivers[0].quits == 1
+    assert pool.lease().driver is drivers[1]
+
+
+def test_recycled_when_rss_exceeds_limit(drivers):
+    pool = BrowserPool(size=1, max_rss_mb=100)
+    leased = pool.lease()
+    drivers[0].rss = 50 * 2 ** 20
+    leased.release()
+    assert pool.idle == [leased]
+    leased = pool.lease()
+    drivers[0].rss = 200 * 2 ** 20
+    leased.release()
+    settle(pool)
+    assert drivers[0].quits == 1 and pool.idle[0].driver is drivers[1]
+
+
+def test_discard_restarts_in_background(drivers):
+    pool = BrowserPool(size=1)
+    pool.lease().release(discard=True)
+    settle(pool)
+    assert drivers[0].quits == 1 and len(pool.idle) == 1 and pool.started == 2
+
+
+def test_lease_times_out_when_pool_is_exhausted(drivers):
+    pool = BrowserPool(size=1, timeout=0.05)
+    pool.lease()
+    with pytest.raises(TimeoutError):
+        pool.lease()
+    assert len(drivers) == 1
+
+
+def test_maintain_recycles_dead_and_overweight_idle_browsers(drivers):
+    pool = BrowserPool(size=3, max_rss_mb=100)
+    pool.fill()
+    drivers[0].dead = True
+    drivers[1].rss = 200 * 2 ** 20
+    pool.maintain()
+    settle(pool)
+    assert [d.quits for d in drivers[:3]] == [1, 1, 0]
+    assert len(pool.idle) == 3 and len(drivers) == 5
+    assert pool.recycled == 2
+
+
+def test_shrunk_pool_closes_extra_browsers(drivers):
+    pool = BrowserPool(size=2)
+    pool.fill()
+    leased = pool.lease()
+    pool.resize(1)
+    settle(pool)
+    leased.release()
+    assert leased.driver.quits == 1 and len(pool.slots) == 1
+    pool.resize(3)
+    settle(pool)
+    pool.resize()
+    pool.maintain()
+    settle(pool)
+    assert len(pool.slots) == len(pool.idle) == 2
+
+
+def test_close_quits_idle_browsers(drivers):
+    pool = BrowserPool(size=2)
+    pool.fill()
+    leased = pool.lease()
+    pool.close()
+    assert pool.slots == {leased.slot: leased}
+    leased.release()
+    assert all(d.quits == 1 for d in drivers) and pool.slots == {}
+    with pytest.raises(RuntimeError):
+        pool.lease()
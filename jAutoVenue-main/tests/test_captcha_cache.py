@@ -0,0 +1,35 @@
+import os
+from captcha_cache import CaptchaCache, ACCEPTED, PENDING, REJECTED
+from mock_platform import render_captcha
+
+
+def make_cache(tmp_path):
+    return CaptchaCache(path=str(tmp_path / 'cache.bin'), record_dir=str(tmp_path / 'record'))
+
+
+def test_cache_hit_resubmission_stays_accepted(tmp_path):
+    cache = make_cache(tmp_path)
+    img = render_captcha('ab3d')
+    cache.submitted(img, 'ab3d')
+    assert cache.lookup(img) == ('ab3d', PENDING)
+    cache.accepted(img, 'ab3d')
+    # 命中缓存后登录流程会再次调用 submitted() 与 accepted()
+    cache.submitted(img, 'ab3d')
+    assert cache.lookup(img) == ('ab3d', ACCEPTED)
+    cache.accepted(img, 'ab3d')
+    assert len(os.listdir(tmp_path / 'record')) == 1
+
+
+def test_different_answer_replaces_state(tmp_path):
+    cache = make_cache(tmp_path)
+    img = render_captcha('ab3d')
+    cache.accepted(img, 'ab3d')
+    cache.rejected(img, 'xxxx')
+    assert cache.lookup(img) == ('xxxx', REJECTED)
+
+
+def test_persists_across_instances(tmp_path):
+    img = render_captcha('k7pq')
+    make_cache(tmp_path).accepted(img, 'k7pq')
+    assert make_cache(tmp_path).lookup(img) == ('k7pq', ACCEPTED)
+    assert make_cache(tmp_path).lookup(render_captcha('zz9x')) == (None, None)
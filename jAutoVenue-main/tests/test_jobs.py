@@ -0,0 +1,119 @@
+import os
+import datetime
+import pytest
+import jobs
+from jobs import parse_jobs, JobFile, JobConfigError
+from venue_index import VenueIndex
+
+
+@pytest.fixture(autouse=True)
+def seeded_index(monkeypatch):
+    # 只使用 SJTUVenueTabLists 中的初始数据，不读取本地的 venue_index.json
+    monkeypatch.setattr(jobs, 'get_venue_index', lambda: VenueIndex(path=None))
+
+
+def job(**overrides):
+    entry = {'name': 'gym', 'venue': '学生服务中心', 'item': '台球', 'weekdays': ['mon'], 'hours': [17, 18]}
+    entry.update(overrides)
+    return entry
+
+
+def test_parse_defaults():
+    config = parse_jobs({'jobs': [job()]})
+    assert config.releaseTime == datetime.time(12, 0)
+    assert config.prestageMinutes == 0
+    assert config.maxConcurrency is None
+    parsed = config.jobs[0]
+    assert parsed.weekdays == [0]
+    assert [p.startTime for p in parsed.preferences] == [17, 18]
+    assert parsed.retry == {'max_attempts': 10, 'deadline': 180.0}
+    assert parsed.engine == 'browser'
+
+
+def test_fallbacks_follow_primary_hours():
+    config = parse_jobs({'jobs': [job(court=2, fallbacks=[{'venue': '气膜体育中心', 'item': '羽毛球', 'hours': 19}])]})
+    prefs = config.jobs[0].preferences
+    assert [(p.venue, p.startTime, p.court) for p in prefs] == [
+        ('学生服务中心', 17, 1), ('学生服务中心', 18, 1), ('气膜体育中心', 19, None)]
+
+
+def test_retry_values():
+    config = parse_jobs({'jobs': [job(retry={'max_attempts': 3, 'deadline': 30})]})
+    assert config.jobs[0].retry == {'max_attempts': 3, 'deadline': 30.0}
+
+
+@pytest.mark.parametrize('retry', [
+    'fast',
+    ['max_attempts', 3],
+    {'max_attempts': 'ten'},
+    {'max_attempts': 0},
+    {'max_attempts': 2.5},
+    {'deadline': None},
+    {'deadline': 'soon'},
+    {'deadline': 0},
+    {'deadline': -5},
+])
+def test_invalid_retry(retry):
+    with pytest.raises(JobConfigError):
+        parse_jobs({'jobs': [job(retry=retry)]})
+
+
+@pytest.mark.parametrize('data', [
+    None,
+    {'jobs': []},
+    {'jobs': ['gym']},
+    {'release_time': '25:00', 'jobs': [job()]},
+    {'prestage_minutes': -1, 'jobs': [job()]},
+    {'max_concurrency': 0, 'jobs': [job()]},
+    {'jobs': [job(), job()]},
+    {'jobs': [job(weekdays=[])]},
+    {'jobs': [job(weekdays=3)]},
+    {'jobs': [job(weekdays=['someday'])]},
+    {'jobs': [job(lead_days=9)]},
+    {'jobs': [job(venue='不存在的场馆')]},
+    {'jobs': [job(item='冰球')]},
+    {'jobs': [job(hours=[6])]},
+    {'jobs': [job(hours=[])]},
+    {'jobs': [job(court=0)]},
+    {'jobs': [job(fallbacks='气膜体育中心')]},
+    {'jobs': [job(fallbacks=['气膜体育中心'])]},
+    {'jobs': [job(engine='carrier pigeon')]},
+])
+def test_invalid_config(data):
+    with pytest.raises(JobConfigError):
+        parse_jobs(data)
+
+
+def test_next_fire_skips_days_not_booked():
+    parsed = parse_jobs({'jobs': [job(weekdays=['sun'], lead_days=7)]}).jobs[0]
+    # 2026-10-18 是周日，开放日应为前 7 天的周日
+    now = datetime.datetime(2026, 10, 12, 13, 0)
+    assert parsed.next_fire(now, datetime.time(12, 0)) == datetime.datetime(2026, 10, 18, 12, 0)
+    assert parsed.next_fire(now, datetime.time(12, 0)).weekday() == 6
+
+
+@pytest.mark.parametrize('now, release', [
+    # 进入预热时间后启动或重新加载，仍执行今天的开放
+    (datetime.datetime(2026, 10, 19, 11, 56), datetime.datetime(2026, 10, 19, 12, 0)),
+    (datetime.datetime(2026, 10, 19, 11, 59, 30), datetime.datetime(2026, 10, 19, 12, 0)),
+    # 开放之后由 catch_up() 补做，计划中是下一次开放
+    (datetime.datetime(2026, 10, 19, 12, 0, 30), datetime.datetime(2026, 10, 26, 12, 0)),
+])
+def test_schedule_keeps_release_inside_prestage_window(now, release):
+    # 2026-10-19 是周一，提前 7 天预约下周一
+    config = parse_jobs({'prestage_minutes': 5, 'jobs': [job(weekdays=['mon'])]})
+    assert config.schedule(now) == [(release, config.jobs[0])]
+
+
+def test_job_file_keeps_previous_config_on_bad_edit(tmp_path):
+    path = tmp_path / 'jobs.yaml'
+    path.write_text("jobs:\n  - {name: a, venue: 学生服务中心, item: 台球, weekdays: [mon], hours: [17]}\n",
+                    encoding='utf-8')
+    jobFile = JobFile(str(path))
+    first = jobFile.get()
+    path.write_text("jobs:\n  - {name: a, venue: 学生服务中心, item: 台球, weekdays: [mon], hours: [17],"
+                    " retry: {max_attempts: many}}\n", encoding='utf-8')
+    # 保证修改时间变化
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert jobFile.get() is first
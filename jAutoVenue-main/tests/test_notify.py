@@ -0,0 +1,43 @@
+import json
+from mock_platform import mock_notify_url
+from notify import Notifier
+
+
+def make_notifier(base_url, tmp_path, retries=3):
+    return Notifier(url=mock_notify_url(base_url), retries=retries, backoff=0.01, timeout=2,
+                    outbox=str(tmp_path / 'outbox.jsonl'))
+
+
+def test_retries_until_delivered(mock_server, tmp_path):
+    platform, base_url = mock_server(notify_failures=2)
+    notifier = make_notifier(base_url, tmp_path)
+    assert notifier.send('SCT123', '预约成功', '- 时间：17:00')
+    assert notifier.flush(5)
+    notifier.close()
+    assert notifier.sent == 1 and notifier.spilled == 0
+    assert [(n['sckey'], n['title']) for n in platform.notifications] == [('SCT123', '预约成功')]
+
+
+def test_spills_after_retries_and_replays_on_next_start(mock_server, tmp_path):
+    platform, base_url = mock_server(notify_failures=10)
+    notifier = make_notifier(base_url, tmp_path, retries=1)
+    notifier.send('SCT123', '验证码识别失败', '请手动登录')
+    assert notifier.flush(5)
+    notifier.close()
+    assert notifier.sent == 0 and notifier.spilled == 1
+    with open(tmp_path / 'outbox.jsonl', encoding='utf-8') as f:
+        assert [json.loads(line)['title'] for line in f] == ['验证码识别失败']
+
+    platform.notify_failures = 0
+    replay = make_notifier(base_url, tmp_path).start()
+    assert replay.flush(5)
+    replay.close()
+    assert replay.sent == 1
+    assert [n['title'] for n in platform.notifications] == ['验证码识别失败']
+    assert not (tmp_path / 'outbox.jsonl').exists()
+
+
+def test_missing_key_is_skipped(tmp_path):
+    notifier = Notifier(outbox=str(tmp_path / 'outbox.jsonl'))
+    assert notifier.send('', '预约成功', '') is False
+    assert notifier._thread is None
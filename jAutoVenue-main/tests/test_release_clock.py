@@ -0,0 +1,18 @@
+import pytest
+from release_clock import ClockSync, ReleaseScheduler
+
+
+@pytest.mark.parametrize('skew', [-2.7, 4.3])
+def test_clock_sync_measures_server_skew(mock_server, skew):
+    platform, base_url = mock_server(clock_skew=skew)
+    clock = ClockSync(url=base_url + '/', samples=5)
+    offset, uncertainty, rtt = clock.sync()
+    # Date 头只有秒级精度，逐次把请求安排在整秒跳变附近，5 个样本后误差应远小于 1 秒
+    assert uncertainty < 0.1
+    assert abs(offset - skew) <= uncertainty + 0.02
+    clock.session.close()
+
+
+def test_scheduler_falls_back_to_local_time_when_unreachable():
+    scheduler = ReleaseScheduler(ClockSync(url='http://127.0.0.1:9/', samples=2, timeout=0.2))
+    assert scheduler.sync() == 0.0
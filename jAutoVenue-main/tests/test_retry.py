@@ -0,0 +1,58 @@
+import pytest
+from selenium.common.exceptions import (TimeoutException, NoSuchElementException,
+                                        StaleElementReferenceException, WebDriverException)
+from retry import (classify, backoff, LoginFailed, SEAT_TAKEN, DOM_TIMEOUT, SESSION_EXPIRED,
+                   CAPTCHA_EXHAUSTED, BAD_CREDENTIALS, BROWSER_DEAD, UNKNOWN)
+from sport_api import APIError
+
+
+class FakeDriver(object):
+    def __init__(self, url='https://sports.sjtu.edu.cn/'):
+        self.url = url
+
+    @property
+    def current_url(self):
+        if isinstance(self.url, Exception):
+            raise self.url
+        return self.url
+
+
+class FakeSport(object):
+    jaccountHost = 'jaccount.sjtu.edu.cn'
+
+    def __init__(self, driver):
+        self.driver = driver
+
+
+@pytest.mark.parametrize('error, kind', [
+    (LoginFailed('credentials'), BAD_CREDENTIALS),
+    (LoginFailed('captcha'), CAPTCHA_EXHAUSTED),
+    (LoginFailed('other'), CAPTCHA_EXHAUSTED),
+    (AssertionError('No seats left'), SEAT_TAKEN),
+    (WebDriverException('Message: invalid session id'), BROWSER_DEAD),
+    (WebDriverException('Tried to run command without establishing a connection'), BROWSER_DEAD),
+    (TimeoutException('venue card'), DOM_TIMEOUT),
+    (NoSuchElementException('chart'), DOM_TIMEOUT),
+    (StaleElementReferenceException('seat'), DOM_TIMEOUT),
+    (APIError('登录会话已失效'), SESSION_EXPIRED),
+    (RuntimeError('boom'), UNKNOWN),
+])
+def test_classify_without_sport(error, kind):
+    assert classify(error) == kind
+
+
+def test_classify_checks_the_page():
+    on_jaccount = FakeSport(FakeDriver('https://jaccount.sjtu.edu.cn/jaccount/login'))
+    assert classify(TimeoutException('venue card'), on_jaccount) == SESSION_EXPIRED
+    on_platform = FakeSport(FakeDriver())
+    assert classify(TimeoutException('venue card'), on_platform) == DOM_TIMEOUT
+    # 连当前地址都读不出时浏览器已不可用
+    unreachable = FakeSport(FakeDriver(WebDriverException('Failed to decode response')))
+    assert classify(RuntimeError('boom'), unreachable) == BROWSER_DEAD
+    # 登录失败的原因优先于页面状态
+    assert classify(LoginFailed('credentials'), on_jaccount) == BAD_CREDENTIALS
+
+
+def test_backoff_stays_under_cap():
+    assert all(0 <= backoff(n) <= 1.0 for n in range(10))
+    assert all(0 <= backoff(n, base=1.0, cap=5) <= 5 for n in range(10))
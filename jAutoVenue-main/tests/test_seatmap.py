@@ -0,0 +1,91 @@
+import json
+import shutil
+import subprocess
+import pytest
+from seatmap import SeatMap, SEATMAP_JS
+
+GRID = [['taken', 'free', 'selected'], ['taken', 'taken', 'taken'], ['free', 'taken', 'free']]
+
+# 最小的 DOM 替身：.chart 下每个 .clearfix 行包含若干座位，座位内嵌一个同样带 seat 类名的图标，
+# 被点击的座位记入 clicks；结果与点击记录以 JSON 输出
+DOM_JS = """
+const grid = %s, choices = %s, clicks = [];
+const CLASSES = {free: 'seat unselected-seat', taken: 'seat sold-seat', selected: 'seat selected-seat'};
+function element(className, parent, children) {
+    const el = {className: className, parentElement: parent, children: children || []};
+    el.classList = {contains: name => className.split(' ').indexOf(name) >= 0};
+    el.querySelectorAll = () => {
+        const all = [];
+        const walk = node => node.children.forEach(child => { all.push(child); walk(child); });
+        walk(el);
+        return all;
+    };
+    return el;
+}
+const rows = (grid || []).map((states, r) => {
+    const row = element('clearfix', null);
+    row.children = states.map((state, c) => {
+        const seat = element(CLASSES[state], row);
+        seat.children = [element('seat-icon', seat)];
+        seat.click = () => clicks.push([r, c]);
+        return seat;
+    });
+    return row;
+});
+const chart = grid === null ? null : {querySelectorAll: () => rows};
+const document = {querySelector: () => chart};
+const result = (function () { %s }).apply(null, [choices]);
+console.log(JSON.stringify({result: result, clicks: clicks}));
+"""
+
+
+def run_seatmap_js(grid, choices):
+    script = DOM_JS % (json.dumps(grid), json.dumps(choices), SEATMAP_JS)
+    output = subprocess.run(['node', '-e', script], capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+class FakeDriver(object):
+    def __init__(self, result):
+        self.result = result
+        self.calls = []
+
+    def execute_script(self, script, choices):
+        self.calls.append((script, choices))
+        return self.result
+
+
+def test_read_passes_ranked_choices_as_rows():
+    driver = FakeDriver({'grid': GRID, 'choice': 1, 'clicked': 0})
+    seatMap = SeatMap.read(driver, [(8, 2), (9, None), (7, 1)])
+    assert driver.calls == [(SEATMAP_JS, [[1, 2], [2, -1], [0, 1]])]
+    assert (seatMap.choice, seatMap.clickedHour, seatMap.clicked) == (1, 9, 0)
+    assert seatMap.free_courts(9) == [0, 2] and seatMap.free_courts(6) == []
+    assert seatMap.free_slots() == [(7, 1), (9, 0), (9, 2)]
+    assert seatMap.state(7, 2) == 'selected'
+
+
+def test_read_without_free_choice_or_chart():
+    seatMap = SeatMap.read(FakeDriver({'grid': GRID, 'choice': None, 'clicked': None}), [(8, None)])
+    assert seatMap.choice is None and seatMap.clicked is None and seatMap.grid == GRID
+    with pytest.raises(LookupError):
+        SeatMap.read(FakeDriver(None))
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='需要 node 运行 SEATMAP_JS')
+def test_seatmap_js_clicks_first_free_choice():
+    # 8 点无空位、7 点指定的场地 0 已被占，按优先级落到 9 点任意场地中的第一个空位
+    output = run_seatmap_js(GRID, [[1, -1], [0, 0], [2, -1], [0, 1]])
+    assert output['result'] == {'grid': GRID, 'choice': 2, 'clicked': 0}
+    assert output['clicks'] == [[2, 0]]
+    # 行号或场地超出座位表时视为无空位
+    output = run_seatmap_js(GRID, [[5, -1], [2, 7], [2, 2]])
+    assert output['result']['choice'] == 2 and output['clicks'] == [[2, 2]]
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='需要 node 运行 SEATMAP_JS')
+def test_seatmap_js_reads_without_clicking():
+    output = run_seatmap_js(GRID, [[1, -1], [0, 2]])
+    assert output['result'] == {'grid': GRID, 'choice': None, 'clicked': None}
+    assert output['clicks'] == []
+    assert run_seatmap_js(None, [[0, -1]])['result'] is None
@@ -0,0 +1,88 @@
+import sys
+import time
+from mock_platform import mock_cookies, SESSION_COOKIE
+from session_store import SessionStore, MAGIC
+
+
+class FakeDriver(object):
+    def __init__(self, cookies=()):
+        self.cookies = list(cookies)
+        self.added = []
+        self.refreshed = 0
+
+    def get_cookies(self):
+        return self.cookies
+
+    def add_cookie(self, cookie):
+        self.added.append(cookie)
+
+    def refresh(self):
+        self.refreshed += 1
+
+
+def make_store(tmp_path, password='secret', base_url='https://sports.sjtu.edu.cn'):
+    return SessionStore(path=str(tmp_path / 'session.bin'), username='student', password=password,
+                        baseUrl=base_url)
+
+
+def test_round_trip_is_encrypted(tmp_path):
+    cookies = [{'name': 'JSESSIONID', 'value': 'abc123', 'path': '/'}]
+    store = make_store(tmp_path)
+    store.save(FakeDriver(cookies))
+    data = (tmp_path / 'session.bin').read_bytes()
+    assert data.startswith(MAGIC) and b'abc123' not in data
+    assert make_store(tmp_path).load() == cookies
+
+
+def test_expired_cookies_are_dropped(tmp_path):
+    now = time.time()
+    cookies = [{'name': 'old', 'value': '1', 'expiry': int(now - 60)},
+               {'name': 'fresh', 'value': '2', 'expiry': int(now + 3600)},
+               {'name': 'session', 'value': '3'}]
+    make_store(tmp_path).save(FakeDriver(cookies))
+    assert [c['name'] for c in make_store(tmp_path).load()] == ['fresh', 'session']
+
+
+def test_wrong_key_or_corrupt_file_loads_nothing(tmp_path):
+    make_store(tmp_path).save(FakeDriver([{'name': 'a', 'value': 'b'}]))
+    # 修改密码后旧文件无法解密
+    assert make_store(tmp_path, password='changed').load() is None
+    path = tmp_path / 'session.bin'
+    data = path.read_bytes()
+    path.write_bytes(data[:-5] + b'xxxxx')
+    assert make_store(tmp_path).load() is None
+    path.write_bytes(b'not a session file')
+    assert make_store(tmp_path).load() is None
+    assert make_store(tmp_path / 'missing').load() is None
+
+
+def test_without_cryptography(tmp_path, monkeypatch):
+    store = make_store(tmp_path)
+    store.save(FakeDriver([{'name': 'a', 'value': 'b'}]))
+    # 导入 cryptography.fernet 时抛出 ImportError
+    monkeypatch.setitem(sys.modules, 'cryptography.fernet', None)
+    assert store.load() is None
+    store.clear()
+    store.save(FakeDriver([{'name': 'a', 'value': 'b'}]))
+    assert not (tmp_path / 'session.bin').exists()
+
+
+def test_validates_against_engine_base_url(tmp_path, mock_server):
+    platform, base_url = mock_server()
+    store = make_store(tmp_path, base_url=base_url)
+    assert store.validate_url == base_url + '/system/user/currentUser'
+    assert store.validate(mock_cookies())
+    assert not store.validate([{'name': SESSION_COOKIE, 'value': 'stale', 'path': '/'}])
+
+
+def test_restore_injects_valid_cookies_and_clears_stale_ones(tmp_path, mock_server):
+    platform, base_url = mock_server()
+    store = make_store(tmp_path, base_url=base_url)
+    store.save(FakeDriver(mock_cookies()))
+    driver = FakeDriver()
+    assert store.restore(driver)
+    assert [c['name'] for c in driver.added] == [SESSION_COOKIE] and driver.refreshed == 1
+
+    store.save(FakeDriver([{'name': SESSION_COOKIE, 'value': 'stale', 'path': '/'}]))
+    assert not store.restore(FakeDriver())
+    assert not (tmp_path / 'session.bin').exists()
@@ -0,0 +1,86 @@
+import datetime
+import pytest
+from sport import SJTUSport
+from preferences import Preference
+from tracing import Tracer
+
+A = ('学生服务中心', '台球')
+B = ('徐汇校区体育馆', '羽毛球')
+
+
+class FakeDriver(object):
+    """
+    当前页面的座位表取自 grids，按 SEATMAP_JS 的规则点击 choices 中第一个有空位的选项
+    """
+    def __init__(self, grids):
+        self.grids = grids
+        self.page = None
+        self.calls = []
+
+    def execute_script(self, script, choices):
+        self.calls.append((self.page, choices))
+        grid = self.grids[self.page]
+        for i, (row, court) in enumerate(choices):
+            states = grid[row] if row < len(grid) else []
+            c = (states.index('free') if 'free' in states else -1) if court < 0 else \
+                (court if court < len(states) and states[court] == 'free' else -1)
+            if c >= 0:
+                return {'grid': grid, 'choice': i, 'clicked': c}
+        return {'grid': grid, 'choice': None, 'clicked': None}
+
+
+def make_sport(preferences, grids):
+    sport = object.__new__(SJTUSport)
+    sport.preferences = [Preference(*page, hour, court) for page, hour, court in preferences]
+    sport.driver = FakeDriver(grids)
+    sport.chartScreenshot = False
+    sport.targetDate = datetime.date(2026, 10, 25)
+    sport.tracer = Tracer(directory=None)
+    sport.visits = []
+
+    def goTo(venue, venueItem):
+        sport.visits.append((venue, venueItem))
+        sport.driver.page = (venue, venueItem)
+    sport.goTo = goTo
+    return sport
+
+
+def test_same_page_preferences_go_in_one_call():
+    sport = make_sport([(A, 7, None), (A, 8, 1), (A, 9, None)],
+                       {A: [['taken'], ['free', 'taken'], ['taken', 'free']]})
+    assert sport.chooseStartTime() == sport.preferences[2]
+    assert sport.driver.calls == [(A, [[0, -1], [1, 1], [2, -1]])]
+    assert (sport.startTime, sport.seatMap.clicked) == (9, 1)
+
+
+def test_alternating_pages_keep_priority():
+    # A 页面 8 点有空位，但 B 页面 7 点排在前面，应选中 B 的 7 点
+    sport = make_sport([(A, 7, None), (B, 7, None), (A, 8, None), (B, 8, None)],
+                       {A: [['taken'], ['free']], B: [['free'], ['free']]})
+    assert sport.chooseStartTime() == sport.preferences[1]
+    assert sport.driver.calls == [(A, [[0, -1]]), (B, [[0, -1]])]
+    assert sport.startTime == 7
+
+
+def test_alternating_pages_return_to_earlier_page():
+    sport = make_sport([(A, 7, None), (B, 7, None), (A, 8, None), (B, 8, None)],
+                       {A: [['taken'], ['free']], B: [['taken'], ['free']]})
+    assert sport.chooseStartTime() == sport.preferences[2]
+    assert sport.visits == [A, B, A]
+    assert sport.driver.calls[-1] == (A, [[1, -1]])
+
+
+def test_preferences_known_taken_are_skipped():
+    # 读到 A 的快照后 A 8 点已知无空位，不再回到 A，B 的两个偏好合并为一次调用
+    sport = make_sport([(A, 7, None), (B, 7, 0), (A, 8, None), (B, 9, None)],
+                       {A: [['taken'], ['taken']], B: [['taken', 'free'], ['taken'], ['free']]})
+    assert sport.chooseStartTime() == sport.preferences[3]
+    assert sport.driver.calls == [(A, [[0, -1]]), (B, [[0, 0], [2, -1]])]
+
+
+def test_no_free_preference_raises():
+    sport = make_sport([(A, 7, None), (B, 7, None), (A, 8, 0)],
+                       {A: [['taken'], ['taken', 'free']], B: [['taken']]})
+    with pytest.raises(AssertionError, match='2026-10-25'):
+        sport.chooseStartTime()
+    assert sport.visits == [A, B]
@@ -0,0 +1,88 @@
+import sys
+import types
+import pytest
+from mock_platform import mock_cookies
+from preferences import Preference
+from retry import classify, SESSION_EXPIRED
+from sport_api import SJTUSportAPI, APIError
+from tracing import Tracer
+from venue_index import VenueIndex
+
+
+@pytest.fixture
+def make_api(tmp_path):
+    index = VenueIndex(str(tmp_path / 'venue_index.json'))
+    apis = []
+
+    def make(base_url, preferences, cookies=True):
+        api = SJTUSportAPI(preferences=preferences, sessionStore=False, baseUrl=base_url,
+                           cookies=mock_cookies() if cookies else None,
+                           tracer=Tracer(directory=str(tmp_path)), venueIndex=index)
+        apis.append(api)
+        return api
+    yield make
+    for api in apis:
+        api.shutDown()
+
+
+def test_order_books_first_free_preference(mock_server, make_api):
+    platform, base_url = mock_server(courts=2, taken_ratio=0.0)
+    api = make_api(base_url, [Preference('学生服务中心', '学生中心健身房', 17, None)])
+    assert api.order() == 1
+    assert [(o['court'], o['hour']) for o in platform.orders] == [(0, 17)]
+    # venueId 写入了传入的索引，而不是默认的 venue_index.json
+    assert api.venueIndex.venue_id('学生服务中心') == api.venueId
+
+
+def test_order_falls_back_when_hour_is_taken(mock_server, make_api):
+    platform, base_url = mock_server(courts=2, taken_ratio=0.0)
+    prefs = [Preference('学生服务中心', '学生中心健身房', 17, None), Preference('学生服务中心', '台球', 19, 1)]
+    first = make_api(base_url, prefs[:1])
+    assert first.order() == 1 and first.order() == 1
+    api = make_api(base_url, prefs)
+    assert api.order() == 1
+    assert (api.venueItem, api.startTime, api.seat['court']) == ('台球', 19, 1)
+    assert len(platform.orders) == 3
+
+
+def test_order_fails_when_no_preference_is_free(mock_server, make_api):
+    platform, base_url = mock_server(courts=2, taken_ratio=1.0)
+    api = make_api(base_url, [Preference('学生服务中心', '学生中心健身房', 17, None)])
+    assert api.order() == 0
+    assert platform.orders == []
+    with pytest.raises(AssertionError):
+        api.chooseStartTime()
+
+
+def test_expired_session_is_classified(mock_server, make_api):
+    platform, base_url = mock_server()
+    api = make_api(base_url, [Preference('学生服务中心', '学生中心健身房', 17, None)], cookies=False)
+    with pytest.raises(APIError) as error:
+        api.chooseVenueItemTab()
+    assert classify(error.value, api) == SESSION_EXPIRED
+
+
+def test_browser_login_uses_engine_base_url(monkeypatch, mock_server, make_api):
+    platform, base_url = mock_server()
+    created = []
+
+    class FakeDriver(object):
+        def get_cookies(self):
+            return mock_cookies()
+
+    class FakeSport(object):
+        def __init__(self, **kwargs):
+            created.append(kwargs)
+            self.driver = FakeDriver()
+
+        def login(self):
+            return 1
+
+        def shutDown(self):
+            pass
+
+    monkeypatch.setitem(sys.modules, 'sport', types.SimpleNamespace(SJTUSport=FakeSport))
+    api = make_api(base_url, [Preference('学生服务中心', '学生中心健身房', 17, None)], cookies=False)
+    assert api.login() == 1
+    assert created[0]['homeUrl'] == base_url
+    assert api.order() == 1
@@ -0,0 +1,229 @@
+import json
+import time
+import threading
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from SJTUVenueTabLists import venueTabLists
+from venue_index import VenueIndex, INDEX_VERSION, discover, open_venue_index
+from sport import SJTUSport
+from tracing import Tracer
+
+TAB = 'tab-417dc5ed-aba7-4abb-bbdc-efef8446dbdb'
+HOME = 'https://sports.sjtu.edu.cn'
+PAGE = HOME + '/pc/venue/3b10ff47'
+
+
+def make_index(tmp_path, **kwargs):
+    return VenueIndex(path=str(tmp_path / 'venue_index.json'), **kwargs)
+
+
+def test_missing_file_seeds_from_static_table_and_is_stale(tmp_path):
+    index = make_index(tmp_path)
+    assert index.tab('学生服务中心', '台球') == TAB
+    assert set(index.venues) == set(venueTabLists)
+    assert index.venue_id('学生服务中心') is None and index.venue_url('学生服务中心') is None
+    assert index.builtAt == 0 and index.stale()
+    assert index.tab('不存在的场馆', '台球') is None
+    # 只读取，不写文件
+    assert not (tmp_path / 'venue_index.json').exists()
+
+
+def test_version_mismatch_or_corrupt_file_falls_back(tmp_path):
+    path = tmp_path / 'venue_index.json'
+    venues = {'学生服务中心': {'id': 'v1', 'url': None, 'items': {'台球': 'tab-new'}}}
+    path.write_text(json.dumps({'version': INDEX_VERSION + 1, 'built_at': time.time(), 'venues': venues}),
+                    encoding='utf-8')
+    assert make_index(tmp_path).tab('学生服务中心', '台球') == TAB
+    path.write_text('{"version": 1, "venues": ', encoding='utf-8')
+    index = make_index(tmp_path)
+    assert index.tab('学生服务中心', '台球') == TAB and index.stale()
+
+
+def test_ttl_staleness(tmp_path):
+    index = make_index(tmp_path, ttl=3600)
+    index.replace({'学生服务中心': {'id': 'v1', 'items': {'台球': 'tab-new'}}})
+    now = index.builtAt
+    assert not index.stale(now + 3599)
+    assert index.stale(now + 3601)
+    loaded = make_index(tmp_path, ttl=3600)
+    assert loaded.builtAt == now and not loaded.stale(now + 60)
+
+
+def test_update_fixes_one_venue_and_persists(tmp_path):
+    index = make_index(tmp_path)
+    index.update('学生服务中心', items={'台球': 'tab-new', '乒乓球': 'tab-pp'}, venueId='v1')
+    index.update('新场馆', items={'羽毛球': 'tab-yu'})
+    loaded = make_index(tmp_path)
+    assert loaded.tab('学生服务中心', '台球') == 'tab-new' and loaded.venue_id('学生服务中心') == 'v1'
+    assert loaded.tab('新场馆', '羽毛球') == 'tab-yu'
+    assert loaded.venues['徐汇校区体育馆'] == index.venues['徐汇校区体育馆']
+    # 单个场馆的修正不影响有效期
+    assert loaded.builtAt == 0 and loaded.stale()
+    index.update('学生服务中心', venueId='v2')
+    assert make_index(tmp_path).tab('学生服务中心', '台球') == 'tab-new'
+
+
+def test_refresh_async_rebuilds_in_background(tmp_path):
+    index = make_index(tmp_path)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_discover():
+        started.set()
+        release.wait(5)
+        return {'学生服务中心': {'id': 'v1', 'items': {'台球': 'tab-new'}}}
+    thread = index.refresh_async(slow_discover)
+    started.wait(5)
+    # 重建期间查找立即返回旧数据，也不会再启动第二个重建
+    assert index.tab('学生服务中心', '台球') == TAB
+    assert index.refresh_async(slow_discover) is None
+    release.set()
+    thread.join(5)
+    assert index.tab('学生服务中心', '台球') == 'tab-new' and not index.stale()
+    assert list(make_index(tmp_path).venues) == ['学生服务中心']
+    # 未过期时不重建
+    assert index.refresh_async(slow_discover) is None
+
+
+def test_failed_or_empty_rebuild_keeps_current_data(tmp_path):
+    index = make_index(tmp_path)
+
+    def failing():
+        raise ConnectionError('network down')
+    index.refresh_async(failing).join(5)
+    index.refresh_async(dict).join(5)
+    assert index.tab('学生服务中心', '台球') == TAB and index.stale()
+    assert not (tmp_path / 'venue_index.json').exists()
+
+
+def test_discover_builds_tab_ids_from_api():
+    responses = {
+        'venues': [{'id': 'v1', 'venueName': '学生服务中心'}],
+        'venue': {'motionTypes': [{'id': '417d', 'name': '台球'}, {'id': '7d46', 'name': '学生中心健身房'}]},
+    }
+    calls = []
+
+    def call(name, params):
+        calls.append((name, params))
+        return responses[name]
+    assert discover(call) == {'学生服务中心': {'id': 'v1', 'items': {'台球': 'tab-417d', '学生中心健身房': 'tab-7d46'}}}
+    assert calls == [('venues', {'venueName': ''}), ('venue', {'id': 'v1'})]
+
+
+def test_open_venue_index(tmp_path):
+    index = make_index(tmp_path)
+    assert open_venue_index(index) is index
+    opened = open_venue_index(str(tmp_path / 'other.json'))
+    assert opened.path == str(tmp_path / 'other.json') and opened is not index
+
+
+class FakeElement(object):
+    def __init__(self, driver, name):
+        self.driver = driver
+        self.name = name
+
+    def send_keys(self, text):
+        pass
+
+    def click(self):
+        # 点击搜索结果卡片后跳转到场馆详情页
+        if self.name == 'venue card':
+            self.driver.current_url = self.driver.venuePage
+
+
+class FakeDriver(object):
+    """
+    首页搜索后跳转到 venuePage；dead 中的地址无法打开，场馆页面上 TABS_JS 返回 tabs
+    """
+    def __init__(self, venuePage, dead=(), current_url='about:blank'):
+        self.venuePage = venuePage
+        self.dead = set(dead)
+        self.current_url = current_url
+        self.gets = []
+
+    def get(self, url):
+        self.gets.append(url)
+        if url in self.dead:
+            raise WebDriverException('Reached error page: about:neterror')
+        self.current_url = url
+
+    def execute_script(self, script):
+        return {'台球': TAB} if self.current_url == self.venuePage else None
+
+
+class FakeWaiter(object):
+    def __init__(self, driver):
+        self.driver = driver
+
+    def until(self, condition, name='wait', timeout=None):
+        result = condition(self.driver)
+        if not result:
+            raise TimeoutException(name)
+        return result
+
+    def present(self, locator, name=None):
+        return FakeElement(self.driver, name)
+
+    clickable = present
+
+    def url_changes(self, old_url, name='url change'):
+        return self.until(lambda driver: driver.current_url != old_url, name)
+
+
+def make_sport(index, driver):
+    sport = object.__new__(SJTUSport)
+    sport.venue = '学生服务中心'
+    sport.homeUrl = HOME
+    sport.venueIndex = index
+    sport.driver = driver
+    sport.waiter = FakeWaiter(driver)
+    sport.tracer = Tracer(directory=None)
+    return sport
+
+
+def test_url_update_and_invalidation_persist(tmp_path):
+    index = make_index(tmp_path)
+    index.update('学生服务中心', url=PAGE)
+    assert make_index(tmp_path).venue_url('学生服务中心') == PAGE
+    # '' 表示地址已失效，其余字段不变
+    index.update('学生服务中心', url='')
+    loaded = make_index(tmp_path)
+    assert loaded.venue_url('学生服务中心') is None and loaded.tab('学生服务中心', '台球') == TAB
+
+
+def test_rebuild_keeps_known_urls(tmp_path):
+    index = make_index(tmp_path)
+    index.update('学生服务中心', url=PAGE)
+    index.replace({'学生服务中心': {'id': 'v1', 'items': {'台球': TAB}},
+                   '新场馆': {'id': 'v2', 'items': {}}})
+    loaded = make_index(tmp_path)
+    assert loaded.venue_url('学生服务中心') == PAGE and loaded.venue_url('新场馆') is None
+
+
+def test_search_records_venue_url(tmp_path):
+    index = make_index(tmp_path)
+    driver = FakeDriver(PAGE)
+    make_sport(index, driver).searchAndEnterVenue()
+    assert driver.gets == [HOME] and driver.current_url == PAGE
+    assert make_index(tmp_path).venue_url('学生服务中心') == PAGE
+
+
+def test_saved_url_is_opened_directly(tmp_path):
+    index = make_index(tmp_path)
+    index.update('学生服务中心', url=PAGE)
+    driver = FakeDriver(PAGE)
+    sport = make_sport(index, driver)
+    sport.searchAndEnterVenue()
+    assert driver.gets == [PAGE]
+    # 已在该页面时不再导航，reload 时重新打开
+    sport.searchAndEnterVenue()
+    assert driver.gets == [PAGE]
+    sport.searchAndEnterVenue(reload=True)
+    assert driver.gets == [PAGE, PAGE]
+
+
+def test_dead_url_is_invalidated_and_replaced_by_search(tmp_path):
+    index = make_index(tmp_path)
+    index.update('学生服务中心', url=HOME + '/venue/old')
+    driver = FakeDriver(PAGE, dead=[HOME + '/venue/old'])
+    make_sport(index, driver).searchAndEnterVenue()
+    assert driver.gets == [HOME + '/venue/old', HOME] and driver.current_url == PAGE
+    assert make_index(tmp_path).venue_url('学生服务中心') == PAGE
@@ -0,0 +1,162 @@
+import datetime
+import pytest
+import watch
+from watch import SeatWatcher, WatchTarget, newly_free
+from seatmap import SeatMap
+from preferences import Preference
+from retry import LoginFailed
+from selenium.common.exceptions import WebDriverException
+
+DATE = datetime.date(2026, 10, 25)
+TARGET = WatchTarget(DATE, Preference('学生服务中心', '台球', 7, None))
+
+
+class FakeDriver(object):
+    """
+    依次返回 grids 中的座位表，并按 SEATMAP_JS 的规则点击 choices 中第一个有空位的选项
+    """
+    def __init__(self, grids):
+        self.grids = list(grids)
+        self.calls = []
+
+    def execute_script(self, script, choices=()):
+        self.calls.append(choices)
+        grid = self.grids.pop(0) if len(self.grids) > 1 else self.grids[0]
+        if isinstance(grid, Exception):
+            raise grid
+        for i, (row, court) in enumerate(choices):
+            states = grid[row] if row < len(grid) else []
+            c = (states.index('free') if 'free' in states else -1) if court < 0 else \
+                (court if court < len(states) and states[court] == 'free' else -1)
+            if c >= 0:
+                return {'grid': grid, 'choice': i, 'clicked': c}
+        return {'grid': grid, 'choice': None, 'clicked': None}
+
+
+class FakeSport(object):
+    def __init__(self, logins, grids, submits=()):
+        self.logins = list(logins)
+        self.submits = list(submits)
+        self.driver = FakeDriver(grids)
+        self.page = None
+        self.loginFailure = None
+        self.orders = 0
+
+    def login(self):
+        result = self.logins.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        if result != 1:
+            self.loginFailure = result
+            return 0
+        return 1
+
+    def goTo(self, venue, venueItem):
+        self.page = (venue, venueItem)
+
+    def refreshSeatChart(self):
+        pass
+
+    def submitOrder(self):
+        if self.submits:
+            raise self.submits.pop(0)
+        self.orders += 1
+
+    def shutDown(self):
+        pass
+
+
+def factory_of(*results):
+    """
+    依次返回 results 中的 FakeSport，遇到异常时抛出
+    """
+    results = list(results)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    factory.calls = calls
+    return factory
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(watch, 'sleep', lambda seconds: None)
+
+
+def test_start_failures_are_retried_until_login():
+    sport = FakeSport(['captcha', 'captcha', 1], [[['taken']], [['free']]])
+    factory = factory_of(RuntimeError('geckodriver 启动失败'), sport)
+    watcher = SeatWatcher(factory, [TARGET], interval=0, max_per_minute=6000)
+    assert watcher.run() == [TARGET]
+    assert len(factory.calls) == 2
+    assert sport.orders == 1
+
+
+def test_bad_credentials_stop_the_watch():
+    watcher = SeatWatcher(factory_of(FakeSport(['credentials'], [[['taken']]])), [TARGET],
+                          interval=0, max_per_minute=6000)
+    with pytest.raises(LoginFailed):
+        watcher.run()
+
+
+def test_browser_crash_rebuilds_after_failed_restart():
+    dead = FakeSport([1], [WebDriverException('invalid session id')])
+    rebuilt = FakeSport([1], [[['free']]])
+    factory = factory_of(dead, RuntimeError('geckodriver 启动失败'), rebuilt)
+    watcher = SeatWatcher(factory, [TARGET], interval=0, max_per_minute=6000)
+    assert watcher.run() == [TARGET]
+    assert watcher.sport is rebuilt
+    assert rebuilt.orders == 1
+
+
+def test_deadline_ends_failed_restarts():
+    failures = [RuntimeError('geckodriver 启动失败')] * 3
+    watcher = SeatWatcher(factory_of(*failures), [TARGET], interval=0, max_per_minute=6000, deadline=0)
+    assert watcher.run() == []
+    assert watcher.sport is None
+
+
+def test_newly_free_compares_with_previous_snapshot():
+    previous = SeatMap([['taken', 'free'], ['taken', 'taken']])
+    current = SeatMap([['free', 'free'], ['taken', 'free']])
+    assert newly_free(None, current) == {(7, 0), (7, 1), (8, 1)}
+    assert newly_free(previous, current) == {(7, 0), (8, 1)}
+    assert newly_free(current, previous) == set()
+
+
+def test_matching_respects_page_hour_and_court():
+    other_date = WatchTarget(DATE + datetime.timedelta(1), Preference('学生服务中心', '台球', 7, None))
+    court_two = WatchTarget(DATE, Preference('学生服务中心', '台球', 8, 1))
+    court_one = WatchTarget(DATE, Preference('学生服务中心', '台球', 8, 0))
+    watcher = SeatWatcher(None, [TARGET, other_date, court_two, court_one])
+    page = ('学生服务中心', '台球', DATE)
+    assert watcher.matching(page, {(8, 1)}) == [court_two]
+    assert watcher.matching(page, {(7, 3), (8, 0)}) == [TARGET, court_one]
+    assert watcher.pages() == [page, ('学生服务中心', '台球', other_date.date)]
+
+
+def test_freed_seat_is_clicked_in_the_detecting_poll():
+    court_two = WatchTarget(DATE, Preference('学生服务中心', '台球', 8, 1))
+    sport = FakeSport([1], [[['taken', 'taken'], ['taken', 'taken']],
+                            [['free', 'taken'], ['taken', 'free']]])
+    watcher = SeatWatcher(factory_of(sport), [court_two, TARGET], interval=0, max_per_minute=6000)
+    watcher.start()
+    page = ('学生服务中心', '台球', DATE)
+    assert watcher.poll(page) is None
+    # 两个目标同时空出时按目标顺序选中，点击与读取是同一次脚本调用，随后直接提交
+    assert watcher.poll(page) == court_two
+    assert sport.driver.calls == [[[1, 1], [0, -1]]] * 2
+    assert sport.orders == 1 and sport.seatMap.clicked == 1
+    assert watcher.targets == [TARGET]
+
+
+def test_failed_submit_keeps_watching():
+    sport = FakeSport([1], [[['free']]], submits=[TimeoutError('place order')])
+    watcher = SeatWatcher(factory_of(sport), [TARGET], interval=0, max_per_minute=6000)
+    assert watcher.run() == [TARGET]
+    assert sport.orders == 1 and len(sport.driver.calls) == 2
@@ -0,0 +1,112 @@
+import os
+import sys
+import math
+import csv
+import json
+import glob
+import functools
+import datetime
+from time import perf_counter_ns
+from contextlib import contextmanager
+
+tracesPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces')
+
+
+class Tracer(object):
+    """
+    记录一次预约运行中各阶段的耗时，时间取自单调高精度时钟
+
+    每个 span 记录相对运行开始的起点与持续时间（毫秒），save() 写出 JSON 与 CSV 时间线。
+    """
+    def __init__(self, run_id=None, directory=tracesPath):
+        now = datetime.datetime.now()
+        self.run_id = run_id or now.strftime('%Y%m%d-%H%M%S-%f')
+        self.started_at = now.isoformat()
+        self.directory = directory
+        self.spans = []
+        self.saved = False
+        self._origin = perf_counter_ns()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        record = {'name': name, 'start_ms': 0.0, 'duration_ms': 0.0, 'ok': True, 'attrs': attrs}
+        start = perf_counter_ns()
+        record['start_ms'] = (start - self._origin) / 1e6
+        try:
+            yield attrs
+        except BaseException:
+            record['ok'] = False
+            raise
+        finally:
+            record['duration_ms'] = (perf_counter_ns() - start) / 1e6
+            self.spans.append(record)
+
+    def save(self):
+        if self.saved or not self.spans:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, self.run_id)
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump({'run_id': self.run_id, 'started_at': self.started_at, 'spans': self.spans},
+                      f, ensure_ascii=False, indent=2)
+        with open(base + '.csv', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'start_ms', 'duration_ms', 'ok'])
+            for span in self.spans:
+                writer.writerow([span['name'], f"{span['start_ms']:.3f}", f"{span['duration_ms']:.3f}", int(span['ok'])])
+        self.saved = True
+        return base + '.json'
+
+
+def traced(name):
+    """
+    用 self.tracer 记录方法耗时，返回值记入 span 的 result 属性
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.tracer.span(name) as attrs:
+                result = func(self, *args, **kwargs)
+                if result is not None:
+                    attrs['result'] = result
+                return result
+        return wrapper
+    return decorator
+
+
+def percentile(values, p):
+    """
+    最近秩百分位数：排序后第 ceil(p% * n) 个值
+    """
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def summarize(directory=tracesPath):
+    """
+    汇总目录下所有运行：{name: (次数, p50, p95)}，单位毫秒
+    """
+    durations = {}
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        with open(path, encoding='utf-8') as f:
+            for span in json.load(f)['spans']:
+                durations.setdefault(span['name'], []).append(span['duration_ms'])
+    return {name: (len(values), percentile(values, 50), percentile(values, 95))
+            for name, values in durations.items()}
+
+
+def main(argv):
+    directory = argv[0] if argv else tracesPath
+    summary = summarize(directory)
+    if not summary:
+        print(f"{directory} 中没有运行记录")
+        return
+    print(f"{'step':<20}{'n':>6}{'p50(ms)':>12}{'p95(ms)':>12}")
+    for name, (count, p50, p95) in sorted(summary.items(), key=lambda kv: -kv[1][1]):
+        print(f"{name:<20}{count:>6}{p50:>12.1f}{p95:>12.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import threading
+from SJTUVenueTabLists import venueTabLists
+
+currentPath = os.path.dirname(os.path.abspath(__file__))
+venueIndexPath = os.path.join(currentPath, 'venue_index.json')
+
+# 索引结构变化时递增，旧版本文件视为无效并重建
+INDEX_VERSION = 1
+DEFAULT_TTL = 7 * 24 * 3600
+
+# 一次读出场馆页面上的全部项目标签 {名称: id}，日期标签 (tab-YYYY-MM-DD) 除外
+TABS_JS = """
+const tabs = {};
+document.querySelectorAll('.el-tabs__item[id^="tab-"]').forEach(el => {
+    if (!/^tab-\\d{4}-\\d{2}-\\d{2}$/.test(el.id)) tabs[el.textContent.trim()] = el.id;
+});
+return Object.keys(tabs).length ? tabs : null;
+"""
+
+
+class VenueIndex(object):
+    """
+    场馆 -> (venueId, 详情页地址, {项目: 标签 id}) 的本地索引，带版本号与有效期
+
+    启动时只读取并校验 JSON 文件；文件缺失或版本不符时以 SJTUVenueTabLists 为初始数据并标记为过期。
+    查找总是立即返回当前数据，过期时由 refresh_async() 在后台整体重建，
+    页面上找不到索引中的 ID 时由调用方用页面数据 update() 单个场馆。
+    """
+    def __init__(self, path=venueIndexPath, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.builtAt = 0
+        self.venues = {}
+        self._lock = threading.Lock()
+        self._refreshing = None
+        if not self.load():
+            self.venues = {venue: {'id': None, 'url': None, 'items': dict(items)} for venue, items in venueTabLists.items()}
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION or not isinstance(data.get('venues'), dict):
+                print("场馆索引版本不符，将重建")
+                return False
+            self.venues = {name: {'id': v.get('id'), 'url': v.get('url'), 'items': dict(v['items'])}
+                           for name, v in data['venues'].items()}
+            self.builtAt = float(data.get('built_at', 0))
+            return True
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"读取场馆索引失败: {str(e)}")
+            return False
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({'version': INDEX_VERSION, 'built_at': self.builtAt, 'venues': self.venues},
+                              ensure_ascii=False, indent=2)
+        tmp = self.path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"保存场馆索引失败: {str(e)}")
+
+    def stale(self, now=None):
+        return (now or time.time()) - self.builtAt > self.ttl
+
+    def tab(self, venue, item):
+        return self.venues.get(venue, {}).get('items', {}).get(item)
+
+    def venue_id(self, venue):
+        return self.venues.get(venue, {}).get('id')
+
+    def venue_url(self, venue):
+        return self.venues.get(venue, {}).get('url') or None
+
+    def update(self, venue, items=None, venueId=None, url=None):
+        """
+        用页面或接口上读到的数据修正单个场馆，不影响其他场馆与有效期；url 传 '' 表示地址已失效
+        """
+        with self._lock:
+            entry = self.venues.setdefault(venue, {'id': None, 'url': None, 'items': {}})
+            if venueId is not None:
+                entry['id'] = venueId
+            if url is not None:
+                entry['url'] = url or None
+            if items is not None:
+                entry['items'] = dict(items)
+        self.save()
+
+    def replace(self, venues):
+        """
+        整体重建；接口拿不到的详情页地址沿用旧索引
+        """
+        with self._lock:
+            for name, entry in venues.items():
+                entry.setdefault('url', self.venues.get(name, {}).get('url'))
+            self.venues = venues
+            self.builtAt = time.time()
+        self.save()
+
+    def refresh_async(self, discover):
+        """
+        索引过期时在后台线程调用 discover() 重建，不阻塞当前查找；同一时间只有一个重建
+        """
+        if not self.stale() or (self._refreshing and self._refreshing.is_alive()):
+            return None
+
+        def run():
+            try:
+                venues = discover()
+                if venues:
+                    self.replace(venues)
+                    print(f"场馆索引已更新: {len(venues)} 个场馆")
+            except Exception as e:
+                print(f"更新场馆索引失败: {str(e)}")
+
+        self._refreshing = threading.Thread(target=run, daemon=True)
+        self._refreshing.start()
+        return self._refreshing
+
+
+def discover(call):
+    """
+    通过平台 JSON 接口一次抓取全部场馆、项目与标签 id，call 为 SJTUSportAPI.call。
+    标签 id 与前端相同，为 'tab-' + 项目 id
+    """
+    venues = {}
+    for v in call('venues', {'venueName': ''}):
+        detail = call('venue', {'id': v['id']})
+        venues[v['venueName']] = {
+            'id': v['id'],
+            'items': {m['name']: 'tab-' + m['id'] for m in detail.get('motionTypes', [])},
+        }
+    return venues
+
+
+_index = None
+
+
+def get_venue_index():
+    global _index
+    if _index is None:
+        _index = VenueIndex()
+    return _index
+
+
+def open_venue_index(venueIndex=None):
+    """
+    引擎的 venueIndex 参数：None 使用默认位置的共享索引，也可传入 VenueIndex 实例或索引文件路径
+    """
+    if venueIndex is None:
+        return get_venue_index()
+    if isinstance(venueIndex, VenueIndex):
+        return venueIndex
+    return VenueIndex(venueIndex)
+
+
+def main(argv):
+    index = VenueIndex(argv[0]) if argv else get_venue_index()
+    age = '从未构建' if not index.builtAt else f"{(time.time() - index.builtAt) / 3600:.1f} 小时前构建"
+    print(f"场馆索引 v{INDEX_VERSION}，{age}{'，已过期' if index.stale() else ''}")
+    for venue, entry in index.venues.items():
+        print(f"{venue}: {', '.join(entry['items'])}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
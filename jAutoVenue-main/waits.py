@@ -0,0 +1,120 @@
+from time import perf_counter
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+
+
+def url_contains(fragment):
+    return lambda driver: fragment in driver.current_url
+
+
+def url_changes(old_url):
+    return lambda driver: driver.current_url != old_url
+
+
+def attribute_changes(locator, name, old_value):
+    """
+    locator 对应元素的属性变为与 old_value 不同的非空值时返回新值
+    """
+    def condition(driver):
+        try:
+            value = driver.find_element(*locator).get_attribute(name)
+        except StaleElementReferenceException:
+            return False
+        return value if value and value != old_value else False
+    return condition
+
+
+def src_changes(locator, old_src=None):
+    return attribute_changes(locator, 'src', old_src)
+
+
+def drawer_open(css='.drawerStyle>.butMoney>.is-round'):
+    """
+    右侧订单抽屉滑出且确认按钮可点击
+    """
+    return EC.element_to_be_clickable((By.CSS_SELECTOR, css))
+
+
+def dialog_visible(label='提示'):
+    return EC.visibility_of_element_located((By.CSS_SELECTOR, f'[aria-label="{label}"]'))
+
+
+def any_of(*conditions):
+    def condition(driver):
+        for cond in conditions:
+            try:
+                result = cond(driver)
+            except StaleElementReferenceException:
+                result = False
+            if result:
+                return result
+        return False
+    return condition
+
+
+class Waiter(object):
+    """
+    WebDriverWait 的封装，按名称记录每次等待的实际耗时
+
+    records 中每一项为 (name, seconds, ok)，用于定位流程中时间花在哪里。
+    """
+    def __init__(self, driver, timeout=20, poll=0.1):
+        self.driver = driver
+        self.timeout = timeout
+        self.poll = poll
+        self.records = []
+
+    def until(self, condition, name='wait', timeout=None, poll=None):
+        wait = WebDriverWait(
+            self.driver,
+            self.timeout if timeout is None else timeout,
+            poll_frequency=self.poll if poll is None else poll,
+        )
+        start = perf_counter()
+        try:
+            result = wait.until(condition)
+        except TimeoutException:
+            self.records.append((name, perf_counter() - start, False))
+            raise
+        self.records.append((name, perf_counter() - start, True))
+        return result
+
+    def present(self, locator, name=None, **kwargs):
+        return self.until(EC.presence_of_element_located(locator), name or f'present {locator[1]}', **kwargs)
+
+    def clickable(self, locator, name=None, **kwargs):
+        return self.until(EC.element_to_be_clickable(locator), name or f'clickable {locator[1]}', **kwargs)
+
+    def visible(self, locator, name=None, **kwargs):
+        return self.until(EC.visibility_of_element_located(locator), name or f'visible {locator[1]}', **kwargs)
+
+    def url_contains(self, fragment, name=None, **kwargs):
+        return self.until(url_contains(fragment), name or f'url contains {fragment}', **kwargs)
+
+    def url_changes(self, old_url, name='url change', **kwargs):
+        return self.until(url_changes(old_url), name, **kwargs)
+
+    def src_changes(self, locator, old_src=None, name=None, **kwargs):
+        return self.until(src_changes(locator, old_src), name or f'src change {locator[1]}', **kwargs)
+
+    def drawer_open(self, name='drawer open', **kwargs):
+        return self.until(drawer_open(), name, **kwargs)
+
+    def dialog_visible(self, label='提示', name=None, **kwargs):
+        return self.until(dialog_visible(label), name or f'dialog {label}', **kwargs)
+
+    def summary(self):
+        """
+        按名称汇总：{name: (次数, 总耗时, 最大耗时)}
+        """
+        result = {}
+        for name, seconds, ok in self.records:
+            count, total, worst = result.get(name, (0, 0.0, 0.0))
+            result[name] = (count + 1, total + seconds, max(worst, seconds))
+        return result
+
+    def report(self):
+        for name, (count, total, worst) in sorted(self.summary().items(), key=lambda kv: -kv[1][1]):
+            print(f"{name}: {count} 次, 共 {total * 1000:.0f}ms, 最长 {worst * 1000:.0f}ms")
@@ -0,0 +1,271 @@
+import sys
+import getopt
+import random
+import logging
+import datetime
+from time import sleep, monotonic
+from collections import namedtuple
+from seatmap import SeatMap
+from preferences import describe, parse_preference, is_free
+from retry import classify, backoff, SESSION_EXPIRED, CAPTCHA_EXHAUSTED, BAD_CREDENTIALS, BROWSER_DEAD, LoginFailed
+
+# 要蹲守的 (日期, Preference)，日期为 datetime.date
+WatchTarget = namedtuple('WatchTarget', ['date', 'preference'])
+
+
+def newly_free(previous, current):
+    """
+    这一次快照中是空位、上一次不是的 (hour, court)；没有上一次快照时全部空位都算
+    """
+    slots = set(current.free_slots())
+    if previous is None:
+        return slots
+    return slots - set(previous.free_slots())
+
+
+class SeatWatcher(object):
+    """
+    蹲守退订：按带抖动的间隔轮询目标页面的座位表，与内存中的上一次快照比较，
+    读取座位表的同一次脚本调用中就点击按优先级第一个有空位的目标，随后直接提交订单
+
+    同一登录会话内复用一个 SJTUSport，只刷新座位表；每分钟读取页面不超过 max_per_minute 次。
+    会话失效时重新登录，浏览器崩溃时用 factory() 重建；登录或启动浏览器失败时退避后重试，只有账号密码错误才结束。
+    预约成功的目标不再蹲守，全部成功或超过 deadline 秒后结束。
+    """
+    def __init__(self, factory, targets, interval=20, jitter=0.3, max_per_minute=12, deadline=None, sport=None):
+        self.factory = factory
+        self.targets = list(targets)
+        self.interval = interval
+        self.jitter = jitter
+        self.minGap = 60.0 / max_per_minute
+        self.deadline = deadline
+        self.sport = sport
+        self.snapshots = {}
+        self.booked = []
+        self.polls = 0
+        self._lastRead = None
+        self._begin = None
+
+    def pages(self):
+        """
+        目标涉及的 (场馆, 项目, 日期)，保持首次出现的顺序
+        """
+        seen = []
+        for target in self.targets:
+            page = (target.preference.venue, target.preference.venueItem, target.date)
+            if page not in seen:
+                seen.append(page)
+        return seen
+
+    def start(self):
+        if self.sport is None:
+            self.sport = self.factory()
+        if self.sport.login() != 1:
+            raise LoginFailed(getattr(self.sport, 'loginFailure', None) or 'other')
+
+    def expired(self):
+        return self.deadline is not None and self._begin is not None and monotonic() - self._begin > self.deadline
+
+    def restart(self, failures=0):
+        """
+        start() 直到成功：验证码循环耗尽、浏览器启动失败等按退避间隔（不超过轮询间隔）重试，
+        账号密码错误时抛出 LoginFailed；超过 deadline 时直接返回，由 run() 结束蹲守
+        """
+        while True:
+            try:
+                self.start()
+                return
+            except Exception as e:
+                kind = classify(e, self.sport)
+                if kind == BAD_CREDENTIALS:
+                    raise
+                failures += 1
+                msg = f"蹲守登录失败 [{kind}]: {str(e).strip()[:200]}"
+                logging.error(msg)
+                print(msg)
+                # 登录流程中途出错时浏览器状态未知，下次用 factory() 重建
+                if not isinstance(e, LoginFailed):
+                    self.shutDown()
+                    self.snapshots.clear()
+                if self.expired():
+                    return
+                sleep(backoff(failures, base=1.0, cap=self.interval))
+
+    def _pace(self):
+        if self._lastRead is not None:
+            wait = self.minGap - (monotonic() - self._lastRead)
+            if wait > 0:
+                sleep(wait)
+        self._lastRead = monotonic()
+
+    def read(self, page, choices=()):
+        """
+        刷新并读取 page 的座位表；choices 为按优先级排列的 (hour, court)，有空位时在同一次调用中点击
+        """
+        venue, venueItem, date = page
+        self._pace()
+        sport = self.sport
+        sport.targetDate = datetime.datetime.combine(date, datetime.time())
+        if sport.page == (venue, venueItem):
+            sport.refreshSeatChart()
+        else:
+            sport.goTo(venue, venueItem)
+        self.polls += 1
+        return SeatMap.read(sport.driver, choices)
+
+    def matching(self, page, slots):
+        matched = []
+        for target in self.targets:
+            pref = target.preference
+            if (pref.venue, pref.venueItem, target.date) != page:
+                continue
+            if is_free(pref, [court for hour, court in slots if hour == pref.startTime]):
+                matched.append(target)
+        return matched
+
+    def book(self, page, target, seatMap):
+        """
+        座位已在读取座位表时点击选中，直接提交订单，成功返回 target
+        """
+        sport = self.sport
+        sport.preferences = [target.preference]
+        sport.venue, sport.venueItem, sport.startTime = target.preference[:3]
+        sport.targetDate = datetime.datetime.combine(page[2], datetime.time())
+        sport.seatMap = seatMap
+        try:
+            sport.submitOrder()
+            return target
+        except Exception as e:
+            msg = f"提交预约失败，继续蹲守: {str(e).strip()[:200]}"
+            logging.error(msg)
+            print(msg)
+            # 下单对话框的状态未知，下次轮询重新进入页面
+            sport.page = None
+            return None
+
+    def poll(self, page):
+        targets = [t for t in self.targets if (t.preference.venue, t.preference.venueItem, t.date) == page]
+        current = self.read(page, [(t.preference.startTime, t.preference.court) for t in targets])
+        slots = newly_free(self.snapshots.get(page), current)
+        self.snapshots[page] = current
+        if current.choice is None:
+            return None
+        # 目标时段空出时，上一次快照中它不是空位（空位一出现就会被点击提交），因此脚本选中的就是刚空出的目标
+        target = targets[current.choice]
+        freed = self.matching(page, slots) or [target]
+        print(f"{page[2]} {', '.join(describe(t.preference) for t in freed)} 出现空位，已选中 {describe(target.preference)}")
+        logging.info("Seat freed: " + ', '.join(describe(t.preference) for t in freed) + f" on {page[2]}")
+        target = self.book(page, target, current)
+        # 预约成功与否都以新快照为准，下一次轮询重新比较
+        self.snapshots.pop(page, None)
+        if target is not None:
+            self.targets.remove(target)
+            self.booked.append(target)
+        return target
+
+    def recover(self, error, failures):
+        kind = classify(error, self.sport)
+        msg = f"蹲守轮询失败 [{kind}]: {str(error).strip()[:200]}"
+        logging.error(msg)
+        print(msg)
+        if kind == BROWSER_DEAD or self.sport is None:
+            self.shutDown()
+            self.snapshots.clear()
+            self.restart(failures)
+        elif kind in (SESSION_EXPIRED, CAPTCHA_EXHAUSTED):
+            self.sport.page = None
+            self.restart(failures)
+        else:
+            self.sport.page = None
+            sleep(backoff(failures))
+
+    def run(self):
+        """
+        蹲守直到所有目标预约成功或超时，返回成功的目标列表
+        """
+        self._begin = monotonic()
+        self.restart()
+        failures = 0
+        while self.targets:
+            for page in self.pages():
+                if self.expired():
+                    break
+                try:
+                    self.poll(page)
+                    failures = 0
+                except Exception as e:
+                    failures += 1
+                    self.recover(e, failures)
+                if not self.targets:
+                    break
+            if self.expired():
+                print("蹲守时间已到")
+                break
+            if self.targets:
+                sleep(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+        return self.booked
+
+    def shutDown(self):
+        if self.sport is not None:
+            try:
+                self.sport.shutDown()
+            except Exception as e:
+                print(f"关闭浏览器出错: {str(e)}")
+            self.sport = None
+
+
+def parse_date(text, today=None):
+    """
+    'YYYY-MM-DD' 或 '+N'（今天之后 N 天）
+    """
+    today = today or datetime.date.today()
+    if text.startswith('+'):
+        return today + datetime.timedelta(int(text[1:]))
+    return datetime.date.fromisoformat(text)
+
+
+def main(argv):
+    usage = ('watch.py -d <日期 YYYY-MM-DD 或 +N，可重复> [-i 轮询间隔秒] [-j 抖动比例] [-r 每分钟最多读取次数] '
+             '[-t 最长蹲守小时] 场馆/项目/开始小时[/场地序号] ...')
+    try:
+        opts, args = getopt.getopt(argv, 'd:i:j:r:t:h')
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    dates, interval, jitter, rate, deadline = [], 20, 0.3, 12, None
+    for opt, arg in opts:
+        if opt == '-h':
+            print(usage)
+            sys.exit()
+        elif opt == '-d':
+            dates.append(parse_date(arg))
+        elif opt == '-i':
+            interval = float(arg)
+        elif opt == '-j':
+            jitter = float(arg)
+        elif opt == '-r':
+            rate = float(arg)
+        elif opt == '-t':
+            deadline = float(arg) * 3600
+    if not dates or not args:
+        print(usage)
+        sys.exit(2)
+    preferences = [parse_preference(a) for a in args]
+    targets = [WatchTarget(date, pref) for date in dates for pref in preferences]
+
+    from sport import SJTUSport
+    from config import account
+    logging.basicConfig(filename='watch.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    watcher = SeatWatcher(lambda: SJTUSport(deltaDays=0, preferences=preferences, sckey=account.get('sckey')),
+                          targets, interval=interval, jitter=jitter, max_per_minute=rate, deadline=deadline)
+    print(f"开始蹲守 {len(targets)} 个目标，间隔约 {interval} 秒")
+    try:
+        booked = watcher.run()
+    finally:
+        watcher.shutDown()
+    for target in booked:
+        print(f"已预约: {target.date} {describe(target.preference)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])